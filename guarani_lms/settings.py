@@ -58,9 +58,25 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(BASE_DIR / "db.sqlite3"),
+        # File-backed test database: threaded tests (learning/tests) need real SQLite locking
+        "TEST": {"NAME": str(BASE_DIR / "test_db.sqlite3")},
     }
 }
 
+# Cache (SRS queues and other derived data). LocMem is per-process; point this
+# at Redis/Memcached in production so every worker shares the same queues.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "guarani-lms"),
+    }
+}
+if CACHES["default"]["BACKEND"].endswith(".LocMemCache"):
+    # Django's default of 300 keys is a few dozen active decks (queue, retrievability
+    # index, forecast and their generation counters each): past it LocMem drops the
+    # least recently used third of its keys and queues are rebuilt over and over
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "20000"))}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator", "OPTIONS": {"min_length": 8}},
@@ -99,6 +115,24 @@ GOOGLE_PROJECT_ID = os.getenv("GOOGLE_PROJECT_ID", "")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 SITE_URL = os.getenv("SITE_URL", "http://localhost:8000")
 
+# Write-behind exercise results (learning/services/result_queue.py)
+RESULT_WRITE_BEHIND = os.getenv("RESULT_WRITE_BEHIND", "False") == "True"
+RESULT_WRITE_BEHIND_JOURNAL = os.getenv("RESULT_WRITE_BEHIND_JOURNAL", "")   # directory; "" = no journal
+RESULT_WRITE_BEHIND_FSYNC = os.getenv("RESULT_WRITE_BEHIND_FSYNC", "False") == "True"
+
+# Answer scoring (learning/services/scoring.py): ignore the nasal tilde (ã = a, g̃ = g) when comparing
+ANSWER_FOLD_NASAL = os.getenv("ANSWER_FOLD_NASAL", "False") == "True"
+
+# espeak-ng worker pool (learning/services/tts.py). Without libespeak-ng the workers still
+# fork the espeak-ng executable per job (bounded and timed out, but no faster); the speed-up
+# was measured with a stand-in library, not with libespeak-ng itself.
+ESPEAK_NG_LIBRARY = os.getenv("ESPEAK_NG_LIBRARY", "")   # libespeak-ng path; "" = search the library path
+ESPEAK_NG_DATA = os.getenv("ESPEAK_NG_DATA", "") or None  # directory holding espeak-ng-data; None = built-in
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "8"))          # jobs waiting for a worker before 503
+TTS_JOB_TIMEOUT = float(os.getenv("TTS_JOB_TIMEOUT", "10"))     # seconds, queue wait included
+TTS_WORKER_MAX_JOBS = int(os.getenv("TTS_WORKER_MAX_JOBS", "500"))
+
 # TTS Configuration for espeak-ng
 TTS_ESPEAK_CONFIG = {
     "default": {
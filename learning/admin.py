@@ -83,8 +83,8 @@ class GlossaryEntryAdmin(admin.ModelAdmin):
 
 @admin.register(UserExerciseResult)
 class UserExerciseResultAdmin(admin.ModelAdmin):
-    list_display = ("user", "content_type", "object_id", "score", "is_correct", "attempts", "last_submitted")
-    list_filter = ("user", "content_type")
+    list_display = ("user", "lesson", "exercise_type", "object_id", "score", "is_correct", "attempts", "last_submitted")
+    list_filter = ("user", "exercise_type", "lesson")
 
 @admin.register(PronunciationAttempt)
 class PronunciationAttemptAdmin(admin.ModelAdmin):
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class LearningConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "learning"
-    verbose_name = "Guaraní Learning"
\ No newline at end of file
+    verbose_name = "Guaraní Learning"
+
+    def ready(self):
+        from . import signals  # noqa: F401
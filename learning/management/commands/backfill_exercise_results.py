@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from learning.models import UserExerciseResult
+from learning.services.lesson_progress import tag_results
+
+
+class Command(BaseCommand):
+    help = ("Fill UserExerciseResult.lesson / exercise_type from the exercise rows, in id chunks "
+            "(migration 0019 does this once; rerun after raw imports or to repair drift). Resumable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Results per UPDATE batch")
+        parser.add_argument("--after-id", type=int, default=0, help="Resume: skip results with id <= this")
+        parser.add_argument("--untagged-only", action="store_true", help="Only rows without an exercise_type")
+
+    def handle(self, *args, **opts):
+        rows = UserExerciseResult.objects.filter(id__gt=opts["after_id"])
+        if opts["untagged_only"]:
+            rows = rows.filter(exercise_type="")
+        total = rows.count()
+        self.stdout.write(self.style.NOTICE(f"Tagging {total} results in chunks of {opts['chunk_size']}"))
+
+        started = time.monotonic()
+        done = updated = 0
+        cursor = opts["after_id"]
+        while True:
+            ids = list(rows.filter(id__gt=cursor).order_by("id").values_list("id", flat=True)[:opts["chunk_size"]])
+            if not ids:
+                break
+            updated += tag_results(ids[0], ids[-1])
+            done += len(ids)
+            cursor = ids[-1]
+            self.stdout.write(f"[{done}/{total}] updated={updated} (resume with --after-id {cursor})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Rows updated: {updated}"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from learning.models import SRSDeck
+from learning.services.glossary_sync import backfill_deck, sync_deck
+
+
+class Command(BaseCommand):
+    help = "One-off: hash/link existing flashcards to their GlossaryEntry and set each deck's sync high-water mark."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only backfill decks of this username")
+        parser.add_argument("--force", action="store_true", help="Also re-run decks that already have a high-water mark")
+
+    def handle(self, *args, **opts):
+        decks = SRSDeck.objects.select_related("user").order_by("id")
+        if opts["user"]:
+            decks = decks.filter(user__username=opts["user"])
+        if not opts["force"]:
+            decks = decks.filter(glossary_synced_at__isnull=True)
+
+        totals = {"decks": 0, "keyed": 0, "linked": 0, "duplicates": 0, "created": 0}
+        for deck in decks.iterator():
+            stats = backfill_deck(deck)
+            deck.glossary_synced_at = None  # full scan once, then incremental from here on
+            created = sync_deck(deck, force=True)
+            totals["decks"] += 1
+            totals["created"] += created
+            for k in ("keyed", "linked", "duplicates"):
+                totals[k] += stats[k]
+            self.stdout.write(
+                f"{deck}: keyed={stats['keyed']} linked={stats['linked']} "
+                f"duplicates={stats['duplicates']} created={created}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Decks: {totals['decks']}, keyed: {totals['keyed']}, linked: {totals['linked']}, "
+            f"duplicates left unkeyed: {totals['duplicates']}, cards created: {totals['created']}"
+        ))
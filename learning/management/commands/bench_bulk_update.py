@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from learning.models import UserExerciseResult, UserLessonProgress
+from learning.services.lesson_progress import CHUNK_SIZE, DERIVED_FIELDS, STAT_FIELDS, _bulk_update
+
+# Field lists of the real callers: recompute_users / recompute_pairs, save_results
+CASES = (
+    (UserLessonProgress, STAT_FIELDS + DERIVED_FIELDS + ["stats_synced_at"]),
+    (UserExerciseResult, ["score", "is_correct", "attempts", "last_submitted", "lesson", "exercise_type"]),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Microbenchmark of the progress bulk writes: lesson_progress._bulk_update (executemany) against "
+            "Model.objects.bulk_update, on existing rows. Every run is rolled back: nothing is written.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Rows per model (the first ones by id)")
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE, help="bulk_update batch_size")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def _time(self, write, rows, fields, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            try:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    write(rows, fields)
+                    best = min(best, time.perf_counter() - started)
+                    raise Rollback
+            except Rollback:
+                pass
+        return best
+
+    def handle(self, *args, **opts):
+        if min(opts["rows"], opts["batch_size"], opts["repeat"]) < 1:
+            raise CommandError("--rows, --batch-size and --repeat must be positive")
+        for model, fields in CASES:
+            rows = list(model.objects.order_by("id")[:opts["rows"]])
+            if not rows:
+                self.stdout.write(self.style.WARNING(f"{model.__name__}: no rows, skipped"))
+                continue
+            ours = self._time(_bulk_update, rows, fields, opts["repeat"])
+            django = self._time(
+                lambda rows, fields: model.objects.bulk_update(rows, fields, batch_size=opts["batch_size"]),
+                rows, fields, opts["repeat"],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{model.__name__}, {len(rows)} rows x {len(fields)} fields: executemany {ours * 1e3:,.0f} ms, "
+                f"bulk_update {django * 1e3:,.0f} ms ({django / ours:.0f}x)"
+            ))
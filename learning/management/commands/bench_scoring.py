@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.services.scoring import best_ratio, levenshtein_ratio, reference_ratio
+
+LETTERS = "aeiouyãẽĩõũỹñgjkmnprstvh' "
+
+
+class Command(BaseCommand):
+    help = ("Microbenchmark of answer scoring: the bit-parallel levenshtein_ratio / best_ratio "
+            "against the original full-matrix implementation (scoring.reference_ratio).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--length", type=int, default=100, help="Characters per answer")
+        parser.add_argument("--candidates", type=int, default=16, help="Accepted answers for the batch case")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def _time(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    def _report(self, label, before, after):
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: matrix {before * 1e6:,.0f} us, bit-parallel {after * 1e6:,.0f} us ({before / after:.0f}x)"
+        ))
+
+    def handle(self, *args, **opts):
+        if min(opts["length"], opts["candidates"], opts["repeat"]) < 1:
+            raise CommandError("--length, --candidates and --repeat must be positive")
+        rng = random.Random(opts["seed"])
+        n, repeat = opts["length"], opts["repeat"]
+
+        def text():
+            return "".join(rng.choice(LETTERS) for _ in range(n))
+
+        def typo(s):
+            chars = list(s)
+            for _ in range(max(1, n // 20)):
+                chars[rng.randrange(len(chars))] = rng.choice(LETTERS)
+            return "".join(chars)
+
+        answer = text()
+        similar, unrelated = typo(answer), text()
+        candidates = [typo(answer) for _ in range(opts["candidates"] - 1)] + [unrelated]
+        for a, b in ((answer, similar), (answer, unrelated)):
+            if levenshtein_ratio(a, b) != reference_ratio(a, b):
+                raise CommandError("bit-parallel and matrix ratios differ")
+
+        self.stdout.write(self.style.NOTICE(f"{n}-character answers, best of {repeat} runs"))
+        self._report("similar pair", self._time(lambda: reference_ratio(answer, similar), repeat),
+                     self._time(lambda: levenshtein_ratio(answer, similar), repeat))
+        before = self._time(lambda: reference_ratio(answer, unrelated), repeat)
+        self._report("unrelated pair", before, self._time(lambda: levenshtein_ratio(answer, unrelated), repeat))
+        self._report("unrelated pair, cutoff 90", before,
+                     self._time(lambda: levenshtein_ratio(answer, unrelated, score_cutoff=90.0), repeat))
+        self._report(f"one answer vs {len(candidates)} candidates",
+                     self._time(lambda: max(reference_ratio(similar, c) for c in candidates), repeat),
+                     self._time(lambda: best_ratio(similar, candidates), repeat))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.services import srs_priors
+from learning.services.parallel import chunked, run_sharded
+from learning.services.review_archive import user_ids_with_reviews
+
+
+class Command(BaseCommand):
+    help = ("Aggregate every learner's reviews per ES/GN pair into SRSItemPrior rows "
+            "(starting difficulty / half-life for new cards). Multi-process, sharded by user id.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (reads only; each holds a database connection and its shard in memory)")
+        parser.add_argument("--shard-size", type=int, default=500, help="Users per task")
+        parser.add_argument("--min-learners", type=int, default=srs_priors.MIN_LEARNERS,
+                            help="Only store items reviewed by at least this many learners")
+        parser.add_argument("--dry-run", action="store_true", help="Aggregate and report, write nothing")
+
+    def handle(self, *args, **opts):
+        if opts["min_learners"] < 1:
+            raise CommandError("--min-learners must be >= 1")
+        shards = chunked(user_ids_with_reviews(), opts["shard_size"])
+        self.stdout.write(self.style.NOTICE(
+            f"Aggregating reviews of {sum(len(s) for s in shards)} users in {len(shards)} shards "
+            f"with {opts['workers']} worker(s)" + (" (dry run)" if opts["dry_run"] else "")
+        ))
+
+        started = time.monotonic()
+        totals = {}
+        for done, part in enumerate(run_sharded(srs_priors.aggregate_users, shards, opts["workers"]), 1):
+            srs_priors.merge(totals, part)
+            self.stdout.write(f"[{done}/{len(shards)}] items so far: {len(totals)}")
+
+        eligible = sum(1 for sums in totals.values() if sums[3] >= opts["min_learners"])
+        written = 0 if opts["dry_run"] else srs_priors.write(totals, opts["min_learners"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Items: {len(totals)}, "
+            f"with >= {opts['min_learners']} learners: {eligible}, priors written: {written}"
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.services.review_archive import CHUNK_SIZE, compact, cutoff_for
+
+
+class Command(BaseCommand):
+    help = ("Roll ReviewLog rows older than --older-than-days into packed per-card ReviewArchive records. "
+            "Chunked (one short transaction per chunk of cards) and resumable: re-run, or pass --after-card.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=180, help="Keep this many days of reviews as rows")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Cards per transaction")
+        parser.add_argument("--after-card", type=int, default=0, help="Resume after this card id")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks (live databases)")
+        parser.add_argument("--max-chunks", type=int, default=None, help="Stop after this many chunks")
+
+    def handle(self, *args, **opts):
+        if opts["older_than_days"] < 0:
+            raise CommandError("--older-than-days must be >= 0")
+        cutoff = cutoff_for(opts["older_than_days"])
+        self.stdout.write(self.style.NOTICE(
+            f"Compacting reviews before {cutoff:%Y-%m-%d %H:%M} UTC, {opts['chunk_size']} cards per chunk"
+        ))
+
+        started = time.monotonic()
+        cards = reviews = chunks = 0
+        last_card_id = opts["after_card"]
+        for stats in compact(cutoff, opts["after_card"], opts["chunk_size"]):
+            chunks += 1
+            cards += stats["cards"]
+            reviews += stats["reviews"]
+            last_card_id = stats["last_card_id"]
+            self.stdout.write(f"[chunk {chunks}] cards={cards} reviews={reviews} last card id={last_card_id}")
+            if opts["max_chunks"] and chunks >= opts["max_chunks"]:
+                self.stdout.write(self.style.WARNING(f"Stopped early; resume with --after-card {last_card_id}"))
+                break
+            if opts["pause"]:
+                time.sleep(opts["pause"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Archived {reviews} reviews of {cards} cards."
+        ))
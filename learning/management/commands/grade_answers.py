@@ -0,0 +1,162 @@
+import csv
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from learning.services import answer_keys
+from learning.services.grading import KINDS, Chunk, score_chunk
+from learning.services.lesson_progress import apply_deltas, save_results
+from learning.services.parallel import run_sharded
+
+User = get_user_model()
+
+MAX_REPORTED = 20         # rejected rows printed one by one
+
+
+def guess_delimiter(sample: str) -> str:
+    for d in [",", ";", "\t", "|"]:
+        if d in sample:
+            return d
+    return ","
+
+
+class Command(BaseCommand):
+    help = ("Score an answer sheet CSV (student,exercise_id,answer[,type]) with the same rules as the submit "
+            "endpoints and store the results as submissions; each chunk's results and the progress they move "
+            "commit together. Streams the file, scores in worker processes, resumable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", type=str, help="Path to CSV (UTF-8 or UTF-8-SIG) with a header row")
+        parser.add_argument("--type", default="fillblank", choices=KINDS,
+                            help="Exercise type of rows without a 'type' column (default: fillblank)")
+        parser.add_argument("--student-field", default="username", choices=["username", "email", "id"],
+                            help="What the 'student' column holds (default: username)")
+        parser.add_argument("--delimiter", default=None, help="Optional delimiter (, ; \\t |). If not set, tries to guess.")
+        parser.add_argument("--workers", type=int, default=1, help="Scoring processes (only the parent writes)")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per scoring task and per bulk write")
+        parser.add_argument("--after-line", type=int, default=0, help="Resume: skip data rows up to this line")
+        parser.add_argument("--dry-run", action="store_true", help="Score and report, write nothing")
+
+    def handle(self, *args, **opts):
+        csv_path = Path(opts["csv_file"]).expanduser().resolve()
+        if not csv_path.exists():
+            raise CommandError(f"CSV not found: {csv_path}")
+
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            delimiter = opts["delimiter"] or guess_delimiter(f.readline())
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter=delimiter)
+            missing = {"student", "exercise_id", "answer"} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+            self.stdout.write(self.style.NOTICE(
+                f"Grading {csv_path.name} in chunks of {opts['chunk_size']} with {opts['workers']} worker(s)"
+                + (" (dry run)" if opts["dry_run"] else "")
+            ))
+            self._grade(reader, opts)
+
+    def _grade(self, reader, opts):
+        started = time.monotonic()
+        self.users = {}          # student cell -> user id (None: unknown)
+        self.rejected = 0
+        self.blank = 0
+        totals = {"rows": 0, "correct": 0, "stored": 0}
+        # Chunks finish out of order with several workers: the resume point is
+        # the last line of the longest run of finished chunks from the start.
+        self.chunk_end = []
+        finished = set()
+        resume_at = opts["after_line"]
+        results = run_sharded(
+            score_chunk, self._chunks(reader, opts), opts["workers"], max_pending=2 * max(1, opts["workers"]),
+        )
+        for done, result in enumerate(results, 1):
+            updates = result["updates"]
+            if not opts["dry_run"] and updates:
+                # Progress moves with the results it reflects: a run stopped between chunks and
+                # resumed with --after-line leaves no learner's progress behind
+                with transaction.atomic():
+                    apply_deltas(save_results(updates))
+                totals["stored"] += len(updates)
+            totals["rows"] += len(updates)
+            totals["correct"] += result["correct"]
+            finished.add(result["last_line"])
+            while self.chunk_end and self.chunk_end[0] in finished:
+                resume_at = self.chunk_end.pop(0)
+            self.stdout.write(
+                f"[{done}] scored={totals['rows']} correct={totals['correct']} rejected={self.rejected} "
+                f"(resume with --after-line {resume_at})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Scored: {totals['rows']}, correct: {totals['correct']}, "
+            f"stored: {totals['stored']}, blank: {self.blank}, rejected: {self.rejected}"
+            + (" (dry run, nothing written)" if opts["dry_run"] else "")
+        ))
+
+    def _reject(self, line, message):
+        self.rejected += 1
+        if self.rejected <= MAX_REPORTED:
+            self.stderr.write(self.style.WARNING(f"Line {line}: {message}"))
+        elif self.rejected == MAX_REPORTED + 1:
+            self.stderr.write(self.style.WARNING("... more rejected rows, only counted from here on"))
+
+    def _resolve_users(self, names, field):
+        names = [n for n in names if n not in self.users]
+        if not names:
+            return
+        if field == "id":
+            lookup = {str(pk): pk for pk in User.objects.filter(
+                pk__in=[int(n) for n in names if n.isdigit()]
+            ).values_list("pk", flat=True)}
+        else:
+            lookup = dict(User.objects.filter(**{f"{field}__in": names}).values_list(field, "pk"))
+        for name in names:
+            self.users[name] = lookup.get(name)
+
+    def _chunks(self, reader, opts):
+        """Chunks of resolved rows; read lazily, as the pool asks for more."""
+        raw = []
+        for line, row in enumerate(reader, 2):          # line 1 is the header
+            if line <= opts["after_line"]:
+                continue
+            raw.append((line, row))
+            if len(raw) >= opts["chunk_size"]:
+                yield self._chunk(raw, opts)
+                raw = []
+        if raw:
+            yield self._chunk(raw, opts)
+
+    def _chunk(self, raw, opts) -> Chunk:
+        self._resolve_users({(row["student"] or "").strip() for _, row in raw}, opts["student_field"])
+        rows, keys = [], {}
+        for line, row in raw:
+            student = (row["student"] or "").strip()
+            kind = (row.get("type") or "").strip().lower() or opts["type"]
+            exercise_id = (row["exercise_id"] or "").strip()
+            answer = row["answer"] or ""
+            user_id = self.users.get(student)
+            if user_id is None:
+                self._reject(line, f"unknown student {student!r}")
+                continue
+            if kind not in KINDS:
+                self._reject(line, f"unknown exercise type {kind!r}")
+                continue
+            if not exercise_id.isdigit():
+                self._reject(line, f"bad exercise_id {exercise_id!r}")
+                continue
+            if not answer.strip():
+                self.blank += 1
+                continue
+            exercise_id = int(exercise_id)
+            if (kind, exercise_id) not in keys:
+                key = answer_keys.get(kind, exercise_id)
+                if key is None:
+                    self._reject(line, f"unknown {kind} exercise {exercise_id}")
+                    continue
+                keys[(kind, exercise_id)] = key
+            rows.append((line, user_id, kind, exercise_id, answer))
+        self.chunk_end.append(raw[-1][0])
+        return Chunk(raw[0][0], raw[-1][0], rows, keys)
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from learning.models import GlossaryEntry, SRSDeck, Flashcard
+from learning.services.glossary_sync import backfill_deck, create_cards
 
 User = get_user_model()
 
@@ -37,6 +38,8 @@ class Command(BaseCommand):
 
         deck, _ = SRSDeck.objects.get_or_create(user=user, name=opts["deck"])
         self.stdout.write(self.style.NOTICE(f"Using deck: {deck.name}"))
+        if deck.glossary_synced_at is None:
+            backfill_deck(deck)  # key legacy cards so the content_key lookup below is reliable
 
         # Read CSV
         with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
@@ -60,8 +63,8 @@ class Command(BaseCommand):
 
             created_entries = 0
             updated_entries = 0
-            created_cards = 0
             skipped = 0
+            candidates = {}
 
             for row in reader:
                 es = (row.get(col_es) or "").strip()
@@ -78,19 +81,15 @@ class Command(BaseCommand):
                 if made:
                     created_entries += 1
                 else:
-                    if opts["update-notes"] and notes:
+                    if opts["update_notes"] and notes:
                         ge.notes = notes
                         ge.save(update_fields=["notes"])
                         updated_entries += 1
 
-                # Ensure card exists
-                if not Flashcard.objects.filter(user=user, deck=deck, front_text_es=es, back_text_gn=gn).exists():
-                    Flashcard.objects.create(
-                        user=user, deck=deck,
-                        front_text_es=es, back_text_gn=gn, notes=notes,
-                        due_at=timezone.now()
-                    )
-                    created_cards += 1
+                # Cards are created in bulk after the loop (seeded from the item priors)
+                candidates.setdefault(Flashcard.make_content_key(es, gn), (ge.id, es, gn, notes))
+
+        created_cards = create_cards(deck, candidates, timezone.now())
 
         self.stdout.write(self.style.SUCCESS(
             f"Done. Glossary: +{created_entries} created, {updated_entries} updated, {skipped} skipped. "
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from learning.models import DragDropExercise, FillBlankExercise, MatchingPair, TranslationExercise, normalize_fields
+from learning.services import lesson_content
+
+# Models with stored normalized answer forms -> path to their lesson id
+MODELS = {
+    FillBlankExercise: "lesson_id",
+    MatchingPair: "exercise__lesson_id",
+    DragDropExercise: "lesson_id",
+    TranslationExercise: "lesson_id",
+}
+
+
+class Command(BaseCommand):
+    help = ("Recompute the stored normalized answer forms (correct_answer_normalized, ...) from their sources "
+            "and write the rows that differ. save() keeps them; run this after bulk_create, bulk_update or "
+            "queryset.update of answer fields, or after normalize_answer changed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per read and bulk_update")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the stale rows")
+
+    def handle(self, *args, **opts):
+        started = time.monotonic()
+        lessons = set()
+        total = 0
+        for model, lesson_path in MODELS.items():
+            targets = [target for target, _, _ in model.NORMALIZED_FIELDS]
+            sources = [source for _, source, _ in model.NORMALIZED_FIELDS]
+            rows = model.objects.order_by("id").only("id", *targets, *sources)
+            stale = cursor = 0
+            while True:
+                chunk = list(rows.filter(id__gt=cursor)[:opts["chunk_size"]])
+                if not chunk:
+                    break
+                cursor = chunk[-1].id
+                changed = []
+                for row in chunk:
+                    before = [getattr(row, name) for name in targets]
+                    normalize_fields(row)
+                    if [getattr(row, name) for name in targets] != before:
+                        changed.append(row)
+                stale += len(changed)
+                if changed:
+                    lessons.update(model.objects.filter(id__in=[row.id for row in changed])
+                                   .values_list(lesson_path, flat=True).distinct())
+                    if not opts["dry_run"]:
+                        model.objects.bulk_update(changed, targets)
+            total += stale
+            self.stdout.write(f"{model.__name__}: {stale} stale row(s)")
+
+        if not opts["dry_run"]:
+            # Cached answer keys were built from the old forms
+            for lesson_id in lessons:
+                lesson_content.invalidate(lesson_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Stale rows: {total} in {len(lessons)} lesson(s)"
+            + (" (dry run, nothing written)" if opts["dry_run"] else "")
+        ))
@@ -0,0 +1,65 @@
+import csv
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.management.commands.import_glossary import guess_delimiter
+from learning.models import GlossaryEntry
+from learning.services.shared_decks import publish
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Create or extend a shared SRS deck that learners subscribe to (content stored once). "
+            "Source: a CSV (es,gn[,notes]) or the glossary of an existing user.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", required=True, help="Username that owns the shared deck")
+        parser.add_argument("--name", required=True, help="Deck name")
+        parser.add_argument("--description", default="", help="Deck description")
+        parser.add_argument("--convert-existing", action="store_true",
+                            help="Publish the owner's existing personal deck of this name (its cards stay private)")
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--csv", dest="csv_file", help="Path to CSV (UTF-8 or UTF-8-SIG), headers es,gn[,notes]")
+        source.add_argument("--from-glossary", help="Copy the glossary of this username")
+
+    def handle(self, *args, **opts):
+        try:
+            owner = User.objects.get(username=opts["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"User not found: {opts['owner']}")
+
+        if opts["csv_file"]:
+            rows = self._read_csv(opts["csv_file"])
+        else:
+            entries = GlossaryEntry.objects.filter(user__username=opts["from_glossary"])
+            if not entries.exists():
+                raise CommandError(f"No glossary entries for: {opts['from_glossary']}")
+            rows = list(entries.order_by("id").values_list("source_text_es", "translated_text_gn", "notes"))
+
+        try:
+            result = publish(owner, opts["name"], rows, opts["description"], convert=opts["convert_existing"])
+        except ValueError as exc:
+            raise CommandError(f"{exc} (--convert-existing)")
+        deck = result["deck"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Shared deck #{deck.id} '{deck.name}': +{result['created']} notes, {deck.note_count} total"
+        ))
+
+    def _read_csv(self, path):
+        csv_path = Path(path).expanduser().resolve()
+        if not csv_path.exists():
+            raise CommandError(f"CSV not found: {csv_path}")
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter=guess_delimiter(sample))
+            fields = {(h or "").strip().lower(): h for h in (reader.fieldnames or [])}
+            if "es" not in fields or "gn" not in fields:
+                raise CommandError("CSV must contain headers es,gn[,notes]")
+            return [
+                (row.get(fields["es"]) or "", row.get(fields["gn"]) or "", row.get(fields.get("notes", "")) or "")
+                for row in reader
+            ]
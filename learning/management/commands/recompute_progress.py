@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from learning.models import PronunciationAttempt, UserExerciseResult, UserLessonProgress
+from learning.services.lesson_progress import recompute_users
+from learning.services.parallel import chunked, run_sharded
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Rebuild UserLessonProgress for every (user, lesson) from the result tables, e.g. after a scoring "
+            "weight change or a scoring fix. Grouped queries per shard of users, multi-process, resumable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only recompute this username")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (keep 1 on SQLite to avoid writer-lock contention)")
+        parser.add_argument("--shard-size", type=int, default=200, help="Users per task (one transaction each)")
+        parser.add_argument("--after-user", type=int, default=0, help="Resume: skip users with id <= this")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+
+    def handle(self, *args, **opts):
+        if opts["user"]:
+            try:
+                user_ids = [User.objects.get(username=opts["user"]).id]
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {opts['user']}")
+        else:
+            user_ids = set()
+            for model in (UserExerciseResult, PronunciationAttempt, UserLessonProgress):
+                user_ids.update(
+                    model.objects.filter(user_id__gt=opts["after_user"]).values_list("user_id", flat=True).distinct()
+                )
+            user_ids = sorted(user_ids)
+        shards = chunked(user_ids, opts["shard_size"])
+        self.stdout.write(self.style.NOTICE(
+            f"Recomputing progress of {len(user_ids)} users in {len(shards)} shards with {opts['workers']} worker(s)"
+            + (" (dry run)" if opts["dry_run"] else "")
+        ))
+
+        started = time.monotonic()
+        totals = {"users": 0, "pairs": 0, "updated": 0, "created": 0}
+        # Shards finish out of order with several workers: the resume point is
+        # the last user of the longest run of finished shards from the start.
+        shard_end = [shard[-1] for shard in shards]
+        finished = set()
+        resume_at = opts["after_user"]
+        results = run_sharded(recompute_users, shards, opts["workers"], opts["dry_run"])
+        for done, stats in enumerate(results, 1):
+            for k in totals:
+                totals[k] += stats[k]
+            finished.add(stats["last_user_id"])
+            while shard_end and shard_end[0] in finished:
+                resume_at = shard_end.pop(0)
+            self.stdout.write(
+                f"[{done}/{len(shards)}] users={totals['users']} pairs={totals['pairs']} "
+                f"updated={totals['updated']} created={totals['created']} (resume with --after-user {resume_at})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Users: {totals['users']}, pairs: {totals['pairs']}, "
+            f"updated: {totals['updated']}, created: {totals['created']}"
+            + (" (dry run, nothing written)" if opts["dry_run"] else "")
+        ))
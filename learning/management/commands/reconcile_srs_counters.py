@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from learning.models import SRSUserState
+from learning.services.parallel import chunked, run_sharded
+from learning.services.srs_counters import reconcile_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Recount the denormalized SRS counters (new/review/suspended, due histogram) of every deck "
+            "and fix drift. Safe to run periodically (e.g. nightly cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only reconcile this username")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (keep 1 on SQLite to avoid writer-lock contention)")
+        parser.add_argument("--shard-size", type=int, default=200, help="Users per task")
+
+    def handle(self, *args, **opts):
+        user_ids = SRSUserState.objects.values_list("user_id", flat=True).distinct().order_by("user_id")
+        if opts["user"]:
+            try:
+                user_ids = [User.objects.get(username=opts["user"]).id]
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {opts['user']}")
+        shards = chunked(user_ids, opts["shard_size"])
+        self.stdout.write(self.style.NOTICE(
+            f"Reconciling {sum(len(s) for s in shards)} users in {len(shards)} shards "
+            f"with {opts['workers']} worker(s)"
+        ))
+
+        started = time.monotonic()
+        totals = {"users": 0, "decks": 0, "drifted": 0}
+        for done, stats in enumerate(run_sharded(reconcile_users, shards, opts["workers"]), 1):
+            for k in totals:
+                totals[k] += stats[k]
+            self.stdout.write(f"[{done}/{len(shards)}] decks={totals['decks']} drifted={totals['drifted']}")
+
+        style = self.style.WARNING if totals["drifted"] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Done in {time.monotonic() - started:.1f}s. Users: {totals['users']}, decks: {totals['decks']}, "
+            f"corrected: {totals['drifted']}"
+        ))
@@ -0,0 +1,64 @@
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from learning.services.parallel import chunked, run_sharded
+from learning.services.review_archive import user_ids_with_reviews
+from learning.services.srs_trainer import refit_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Replay ReviewLog history to refit theta, ai_difficulty and half_life_days, then reschedule the "
+            "refitted cards' due dates (vectorized, multi-process).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only refit this username")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (keep 1 on SQLite to avoid writer-lock contention)")
+        parser.add_argument("--shard-size", type=int, default=200, help="Users per task")
+        parser.add_argument("--iterations", type=int, default=300, help="Gradient steps per shard")
+        parser.add_argument("--l2", type=float, default=0.01, help="L2 pull towards theta=0, d=0, scale=1")
+        parser.add_argument("--dry-run", action="store_true", help="Only report log-loss, write nothing")
+
+    def handle(self, *args, **opts):
+        user_ids = user_ids_with_reviews()
+        if opts["user"]:
+            try:
+                user_ids = [User.objects.get(username=opts["user"]).id]
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {opts['user']}")
+        shards = chunked(user_ids, opts["shard_size"])
+        self.stdout.write(self.style.NOTICE(
+            f"Refitting {sum(len(s) for s in shards)} users in {len(shards)} shards with {opts['workers']} worker(s)"
+            + (" (dry run)" if opts["dry_run"] else "")
+        ))
+
+        started = time.monotonic()
+        reviews = cards = rescheduled = 0
+        loss_before = loss_after = 0.0
+        results = run_sharded(refit_users, shards, opts["workers"], opts["iterations"], opts["l2"], opts["dry_run"])
+        for done, stats in enumerate(results, 1):
+            reviews += stats["reviews"]
+            cards += stats["cards"]
+            rescheduled += stats["rescheduled"]
+            loss_before += stats["loss_before"] * stats["reviews"]
+            loss_after += stats["loss_after"] * stats["reviews"]
+            self.stdout.write(
+                f"[{done}/{len(shards)}] reviews={stats['reviews']} "
+                f"log-loss {stats['loss_before']:.4f} -> {stats['loss_after']:.4f}"
+            )
+
+        elapsed = time.monotonic() - started
+        if reviews:
+            loss_before /= reviews
+            loss_after /= reviews
+        else:
+            loss_before = loss_after = math.nan
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s ({reviews / max(elapsed, 1e-9):.0f} reviews/s). Reviews: {reviews}, cards: {cards}, "
+            f"rescheduled: {rescheduled}. Log-loss before: {loss_before:.4f}, after: {loss_after:.4f}"
+        ))
@@ -0,0 +1,36 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.services import result_queue
+
+
+class Command(BaseCommand):
+    help = ("Store exercise results left in write-behind journals by processes that are gone "
+            "(RESULT_WRITE_BEHIND_JOURNAL). Journals of running processes are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Journal directory (default: RESULT_WRITE_BEHIND_JOURNAL)")
+        parser.add_argument("--failed", action="store_true",
+                            help="Also retry failed-<pid>.jsonl (updates a flush could not store)")
+
+    def handle(self, *args, **opts):
+        journal_dir = opts["dir"] or getattr(settings, "RESULT_WRITE_BEHIND_JOURNAL", "")
+        if not journal_dir or not os.path.isdir(journal_dir):
+            raise CommandError(f"Journal directory not found: {journal_dir!r}")
+
+        stored = result_queue.recover(journal_dir)
+        self.stdout.write(f"Journals: {stored} updates stored")
+
+        if opts["failed"]:
+            for path in sorted(glob.glob(os.path.join(journal_dir, "failed-*.jsonl"))):
+                updates = result_queue.read_journal(path)
+                os.remove(path)
+                failed = result_queue.store(updates)
+                if failed:
+                    result_queue.append_journal(path, failed)
+                self.stdout.write(f"{os.path.basename(path)}: {len(updates) - len(failed)} stored, {len(failed)} failed")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,62 @@
+import time
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from learning.models import SRSUserState
+from learning.services.ai_srs import CFG
+from learning.services.ai_srs_batch import reschedule_users
+from learning.services.parallel import chunked, run_sharded
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reschedule every graded SRS card of every user after an AISRSConfig change (vectorized, multi-process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only reschedule this username")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (keep 1 on SQLite to avoid writer-lock contention)")
+        parser.add_argument("--shard-size", type=int, default=50, help="Users per task")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per bulk_update")
+        # Optional overrides on top of ai_srs.CFG
+        parser.add_argument("--target-recall", type=float, default=None)
+        parser.add_argument("--min-interval", type=int, default=None)
+        parser.add_argument("--max-interval", type=int, default=None)
+        parser.add_argument("--min-half-life", type=float, default=None)
+        parser.add_argument("--max-half-life", type=float, default=None)
+
+    def handle(self, *args, **opts):
+        overrides = {
+            k: opts[k] for k in ("target_recall", "min_interval", "max_interval", "min_half_life", "max_half_life")
+            if opts[k] is not None
+        }
+        cfg = replace(CFG, **overrides)
+        if not 0.0 < cfg.target_recall < 1.0:
+            raise CommandError("--target-recall must be between 0 and 1")
+
+        user_ids = SRSUserState.objects.values_list("user_id", flat=True).distinct().order_by("user_id")
+        if opts["user"]:
+            try:
+                user_ids = [User.objects.get(username=opts["user"]).id]
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {opts['user']}")
+        shards = chunked(user_ids, opts["shard_size"])
+        self.stdout.write(self.style.NOTICE(
+            f"Rescheduling {sum(len(s) for s in shards)} users in {len(shards)} shards "
+            f"with {opts['workers']} worker(s); config: {cfg}"
+        ))
+
+        started = time.monotonic()
+        totals = {"users": 0, "decks": 0, "cards": 0}
+        for done, stats in enumerate(run_sharded(reschedule_users, shards, opts["workers"], cfg, opts["chunk_size"]), 1):
+            for k in totals:
+                totals[k] += stats[k]
+            self.stdout.write(f"[{done}/{len(shards)}] users={totals['users']} cards updated={totals['cards']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s. Users: {totals['users']}, decks: {totals['decks']}, "
+            f"cards updated: {totals['cards']}"
+        ))
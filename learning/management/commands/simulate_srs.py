@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from learning.services.srs_simulator import SimConfig, format_stats, run
+
+
+class Command(BaseCommand):
+    help = ("Run synthetic learners through the AI-SRS scheduler and report throughput "
+            "(reviews/sec, DB statements per review) and achieved vs. target recall.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", choices=["memory", "db", "both"], default="memory",
+                            help="memory: no database (microbenchmark); db: real rows in a throwaway test database")
+        parser.add_argument("--path", choices=["scalar", "batch", "both"], default="both",
+                            help="scalar: one grade at a time; batch: batched/vectorized grading")
+        parser.add_argument("--learners", type=int, default=1000)
+        parser.add_argument("--cards", type=int, default=2000, help="Cards per learner")
+        parser.add_argument("--days", type=int, default=30, help="Simulated days")
+        parser.add_argument("--new-per-day", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true", help="db engine: use the configured database and keep the synthetic data")
+
+    def handle(self, *args, **opts):
+        if min(opts["learners"], opts["cards"], opts["days"]) < 1:
+            raise CommandError("--learners, --cards and --days must be positive")
+        cfg = SimConfig(
+            learners=opts["learners"], cards=opts["cards"], days=opts["days"],
+            new_per_day=opts["new_per_day"], seed=opts["seed"],
+        )
+        engines = ["memory", "db"] if opts["engine"] == "both" else [opts["engine"]]
+        paths = ["scalar", "batch"] if opts["path"] == "both" else [opts["path"]]
+        self.stdout.write(self.style.NOTICE(
+            f"{cfg.learners} learners x {cfg.cards} cards, {cfg.days} days, {cfg.new_per_day} new/day, seed {cfg.seed}"
+        ))
+        for engine in engines:
+            for path in paths:
+                stats = run(cfg, engine, path, keep=opts["keep"])
+                self.stdout.write(self.style.SUCCESS(format_stats(stats)))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from learning.models import SRSDeck
+from learning.services import srs_queue
+
+
+class Command(BaseCommand):
+    help = "Compare cached SRS queues with the Flashcard (user, deck, due_at) index and optionally repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Only check decks of this username")
+        parser.add_argument("--repair", action="store_true", help="Replace inconsistent queues with a fresh build")
+
+    def handle(self, *args, **opts):
+        decks = SRSDeck.objects.select_related("user").order_by("id")
+        if opts["user"]:
+            decks = decks.filter(user__username=opts["user"])
+
+        checked = inconsistent = 0
+        for deck in decks.iterator():
+            report = srs_queue.check_queue(deck.user_id, deck.id, repair=opts["repair"])
+            if not report["cached"]:
+                continue
+            checked += 1
+            problems = {k: v for k, v in report.items() if k != "cached" and v}
+            if problems:
+                inconsistent += 1
+                self.stdout.write(self.style.WARNING(f"{deck}: {problems}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Cached queues checked: {checked}, inconsistent: {inconsistent}"
+            + (" (repaired)" if opts["repair"] and inconsistent else "")
+        ))
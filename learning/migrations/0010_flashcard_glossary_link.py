@@ -0,0 +1,38 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0009_add_chatbot_conversations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='content_key',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='glossary_entry',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flashcards', to='learning.glossaryentry'),
+        ),
+        migrations.AddField(
+            model_name='srsdeck',
+            name='glossary_dirty',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='srsdeck',
+            name='glossary_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='flashcard',
+            constraint=models.UniqueConstraint(fields=('deck', 'content_key'), name='uniq_flashcard_deck_content_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0011_reviewlog_reviewed_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='priority',
+            field=models.CharField(choices=[('due', 'Oldest due first'), ('retrievability', 'Lowest predicted recall first')], default='due', max_length=16),
+        ),
+    ]
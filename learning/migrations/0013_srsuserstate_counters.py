@@ -0,0 +1,38 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0012_srsuserstate_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='counters_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='due_histogram',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='new_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='suspended_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('learning', '0013_srsuserstate_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reviewlog',
+            index=models.Index(fields=['card', 'reviewed_at'], name='learning_re_card_id_09ee42_idx'),
+        ),
+        migrations.AddField(
+            model_name='reviewarchive',
+            name='card',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_archive', to='learning.flashcard'),
+        ),
+        migrations.AddField(
+            model_name='reviewarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='srs_review_archives', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
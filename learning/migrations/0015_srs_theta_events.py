@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0014_review_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srsuserstate',
+            name='theta_event_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SRSThetaEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('correct', models.BooleanField()),
+                ('difficulty', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('state', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='theta_events', to='learning.srsuserstate')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0015_srs_theta_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRSItemPrior',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('learners', models.PositiveIntegerField(default=0)),
+                ('ai_difficulty', models.FloatField(default=0.0)),
+                ('half_life_days', models.FloatField(default=1.5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
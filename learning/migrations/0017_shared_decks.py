@@ -0,0 +1,78 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('learning', '0016_srs_item_priors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedNote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('front_text_es', models.CharField(max_length=255)),
+                ('back_text_gn', models.CharField(blank=True, max_length=255)),
+                ('notes', models.TextField(blank=True)),
+                ('content_key', models.CharField(editable=False, max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SRSSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_cursor', models.PositiveBigIntegerField(default=0)),
+                ('materialized', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='srsdeck',
+            name='is_shared',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='srsdeck',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='srssubscription',
+            name='deck',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='learning.srsdeck'),
+        ),
+        migrations.AddField(
+            model_name='srssubscription',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='srs_subscriptions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='sharednote',
+            name='deck',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shared_notes', to='learning.srsdeck'),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='note',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='learning.sharednote'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='srssubscription',
+            unique_together={('user', 'deck')},
+        ),
+        migrations.AddConstraint(
+            model_name='sharednote',
+            constraint=models.UniqueConstraint(fields=('deck', 'content_key'), name='uniq_sharednote_deck_content_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='flashcard',
+            constraint=models.UniqueConstraint(fields=('user', 'note'), name='uniq_flashcard_user_note'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0017_shared_decks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlessonprogress',
+            name='pronunciation_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='userlessonprogress',
+            name='stats_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userlessonprogress',
+            name='written_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userlessonprogress',
+            name='written_sum',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.13 on 2026-10-17 02:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+CHUNK_SIZE = 5000
+EXERCISE_MODELS = {
+    "fillblank": "fillblankexercise",
+    "mcq": "multiplechoiceexercise",
+    "matching": "matchingexercise",
+    "dragdrop": "dragdropexercise",
+    "listening": "listeningexercise",
+    "translation": "translationexercise",
+}
+
+
+def tag_results(apps, schema_editor):
+    # Same as services/lesson_progress.tag_results, with the historical models, in id chunks
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    UserExerciseResult = apps.get_model("learning", "UserExerciseResult")
+    types = []
+    for kind, model_name in EXERCISE_MODELS.items():
+        ct = ContentType.objects.filter(app_label="learning", model=model_name).first()
+        if ct is not None:
+            types.append((kind, ct, apps.get_model("learning", model_name)))
+    cursor = 0
+    while True:
+        ids = list(UserExerciseResult.objects.filter(id__gt=cursor).order_by("id").values_list("id", flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        for kind, ct, model in types:
+            UserExerciseResult.objects.filter(id__gte=ids[0], id__lte=ids[-1], content_type=ct).update(
+                exercise_type=kind,
+                lesson_id=Subquery(model.objects.filter(pk=OuterRef("object_id")).values("lesson_id")[:1]),
+            )
+        cursor = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('learning', '0018_lesson_progress_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexerciseresult',
+            name='exercise_type',
+            field=models.CharField(blank=True, choices=[('fillblank', 'Fill in the blank'), ('mcq', 'Multiple choice'), ('matching', 'Matching'), ('dragdrop', 'Drag & drop'), ('listening', 'Listening'), ('translation', 'Translation')], default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='userexerciseresult',
+            name='lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='learning.lesson'),
+        ),
+        migrations.AddIndex(
+            model_name='userexerciseresult',
+            index=models.Index(fields=['user', 'lesson'], name='learning_us_user_id_f178c7_idx'),
+        ),
+        migrations.RunPython(tag_results, migrations.RunPython.noop),
+    ]
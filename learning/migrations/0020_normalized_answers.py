@@ -0,0 +1,75 @@
+# Generated by Django 4.2.13 on 2026-10-17 03:20
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# normalize_answer as of this migration (services/scoring.py), frozen so that
+# later changes to the live function cannot change what this migration wrote;
+# the normalize_exercises command re-normalizes with the current one.
+_PUSO_TABLE = str.maketrans({c: "'" for c in "\u2019\u2018\u02bc\u02bb\u0060\u00b4\u2032\ua78c\u02b9"})
+_PUNCTUATION = re.compile(r"[^\w\s'\u0300-\u036f]+")
+
+
+def normalize_answer(text):
+    text = unicodedata.normalize("NFC", text or "").translate(_PUSO_TABLE)
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+# model -> ((normalized field, source field, is a list), ...), as computed by the models' save()
+NORMALIZED = {
+    "fillblankexercise": (("correct_answer_normalized", "correct_answer", False),),
+    "matchingpair": (("left_normalized", "left_text", False), ("right_normalized", "right_text", False)),
+    "dragdropexercise": (("correct_tokens_normalized", "correct_tokens", True),),
+    "translationexercise": (("acceptable_answers_normalized", "acceptable_answers", True),),
+}
+
+
+def normalize_existing(apps, schema_editor):
+    for model_name, fields in NORMALIZED.items():
+        model = apps.get_model("learning", model_name)
+        rows = list(model.objects.only("id", *(source for _, source, _ in fields)))
+        for row in rows:
+            for target, source, is_list in fields:
+                value = getattr(row, source)
+                setattr(row, target, [normalize_answer(v) for v in (value or [])] if is_list else normalize_answer(value))
+        model.objects.bulk_update(rows, [target for target, _, _ in fields], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0019_exercise_result_lesson'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dragdropexercise',
+            name='correct_tokens_normalized',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='fillblankexercise',
+            name='correct_answer_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='matchingpair',
+            name='left_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='matchingpair',
+            name='right_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='translationexercise',
+            name='acceptable_answers_normalized',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(normalize_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.13 on 2026-10-17 03:42
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def copy_histograms(apps, schema_editor):
+    # Counted states keep their histogram; never-counted ones are rebuilt by their first reconcile
+    SRSUserState = apps.get_model("learning", "SRSUserState")
+    SRSDueDay = apps.get_model("learning", "SRSDueDay")
+    rows = [
+        SRSDueDay(user_id=user_id, deck_id=deck_id, day=date.fromisoformat(day), count=n)
+        for user_id, deck_id, histogram in SRSUserState.objects.filter(counters_synced_at__isnull=False)
+        .values_list("user_id", "deck_id", "due_histogram").iterator()
+        for day, n in (histogram or {}).items() if n > 0
+    ]
+    SRSDueDay.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('learning', '0020_normalized_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRSDueDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='due_days', to='learning.srsdeck')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='srs_due_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'deck', 'day')},
+            },
+        ),
+        migrations.RunPython(copy_histograms, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='srsuserstate',
+            name='due_histogram',
+        ),
+    ]
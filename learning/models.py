@@ -1,10 +1,14 @@
 # learning/models.py
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils import timezone
 
+from .services.scoring import normalize_answer
+
 User = get_user_model()
 
 
@@ -39,18 +43,59 @@ class LessonSection(models.Model):
 
 # ---------- Written exercises ----------
 
+def _with_fields(kwargs, *fields):
+    """save() kwargs with `fields` added to update_fields (when the caller restricted them)."""
+    if kwargs.get("update_fields") is not None:
+        kwargs["update_fields"] = {*kwargs["update_fields"], *fields}
+    return kwargs
+
+
+def normalize_fields(obj) -> list:
+    """
+    Fill obj's normalized answer forms (NORMALIZED_FIELDS: (target, source,
+    is a list), ...) from their sources; returns the target names. save()
+    calls it; bulk_create / bulk_update / queryset.update do not, the
+    normalize_exercises command catches those rows up.
+    """
+    for target, source, is_list in obj.NORMALIZED_FIELDS:
+        value = getattr(obj, source)
+        setattr(obj, target, [normalize_answer(v) for v in (value or [])] if is_list else normalize_answer(value))
+    return [target for target, _, _ in obj.NORMALIZED_FIELDS]
+
+
+def normalize_choices(data):
+    """[{"key", "text"}, ...] from the choice formats found in choices_json."""
+    result = []
+    for i, item in enumerate(data or []):
+        if isinstance(item, dict):
+            key = str(item.get("key") or item.get("value") or chr(65 + i))
+            text = str(item.get("text") or item.get("label") or item.get("option") or "")
+        else:
+            key = chr(65 + i)
+            text = str(item)
+        result.append({"key": key, "text": text})
+    return result
+
+
 class FillBlankExercise(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="fillblanks")
     prompt_text = models.TextField(help_text="Usa '____' para indicar el espacio en blanco.")
     correct_answer = models.CharField(max_length=255)
+    # normalize_answer(correct_answer), kept by save(): the form submissions are compared with
+    correct_answer_normalized = models.CharField(max_length=255, blank=True, default="", editable=False)
     order = models.PositiveIntegerField(default=0)
 
+    NORMALIZED_FIELDS = (("correct_answer_normalized", "correct_answer", False),)
+
     class Meta:
         ordering = ["order", "id"]
 
     def __str__(self):
         return f"FillBlank #{self.id} - Lesson {self.lesson_id}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_with_fields(kwargs, *normalize_fields(self)))
+
 
 class MultipleChoiceExercise(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="mcqs")
@@ -68,17 +113,7 @@ class MultipleChoiceExercise(models.Model):
 
     @property
     def normalized_choices(self):
-        data = self.choices_json or []
-        result = []
-        for i, item in enumerate(data):
-            if isinstance(item, dict):
-                key = str(item.get("key") or item.get("value") or chr(65 + i))
-                text = str(item.get("text") or item.get("label") or item.get("option") or "")
-            else:
-                key = chr(65 + i)
-                text = str(item)
-            result.append({"key": key, "text": text})
-        return result
+        return normalize_choices(self.choices_json)
 
 
 class MatchingExercise(models.Model):
@@ -97,10 +132,17 @@ class MatchingPair(models.Model):
     exercise = models.ForeignKey(MatchingExercise, on_delete=models.CASCADE, related_name="pairs")
     left_text = models.CharField(max_length=255)
     right_text = models.CharField(max_length=255)
+    left_normalized = models.CharField(max_length=255, blank=True, default="", editable=False)
+    right_normalized = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    NORMALIZED_FIELDS = (("left_normalized", "left_text", False), ("right_normalized", "right_text", False))
 
     def __str__(self):
         return f"{self.left_text} ↔ {self.right_text}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_with_fields(kwargs, *normalize_fields(self)))
+
 
 # ---------- Pronunciation ----------
 
@@ -196,7 +238,7 @@ class GlossaryEntry(models.Model):
         return f"{self.user} - {self.source_text_es} → {self.translated_text_gn}"
 
     def save(self, *args, **kwargs):
-        if not self.share_token and self.is_public:
+        if self.is_public and not getattr(self, "share_token", None):
             # Generate unique share token
             import secrets
             self.share_token = secrets.token_urlsafe(32)
@@ -299,11 +341,25 @@ class GlossaryEntry(models.Model):
 # ---------- User results / progress ----------
 
 class UserExerciseResult(models.Model):
+    EXERCISE_TYPES = (
+        ("fillblank", "Fill in the blank"),
+        ("mcq", "Multiple choice"),
+        ("matching", "Matching"),
+        ("dragdrop", "Drag & drop"),
+        ("listening", "Listening"),
+        ("translation", "Translation"),
+    )
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="exercise_results")
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     exercise_object = GenericForeignKey("content_type", "object_id")
 
+    # Denormalized from the exercise so per-lesson aggregates are one indexed query.
+    # NULL lesson: the exercise was deleted (or the row predates the backfill).
+    lesson = models.ForeignKey(Lesson, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    exercise_type = models.CharField(max_length=12, choices=EXERCISE_TYPES, blank=True, default="")
+
     score = models.FloatField(default=0.0)
     is_correct = models.BooleanField(default=False)
     attempts = models.PositiveIntegerField(default=1)
@@ -311,6 +367,18 @@ class UserExerciseResult(models.Model):
 
     class Meta:
         unique_together = [("user", "content_type", "object_id")]
+        indexes = [models.Index(fields=["user", "lesson"])]
+
+
+class AppliedResultSegment(models.Model):
+    """
+    A write-behind journal segment (services/result_queue.py) whose results
+    are stored, marked in the same transaction: a segment replayed after a
+    crash between that commit and the file's removal is skipped instead of
+    adding its attempts twice. The mark goes once the file is gone.
+    """
+    segment = models.CharField(max_length=100, unique=True)  # file name without .jsonl
+    applied_at = models.DateTimeField(auto_now_add=True)
 
 
 class PronunciationAttempt(models.Model):
@@ -334,6 +402,12 @@ class UserLessonProgress(models.Model):
     completed = models.BooleanField(default=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Running aggregates (see services/lesson_progress.py); NULL synced_at = never aggregated
+    written_sum = models.FloatField(default=0.0)                       # sum of best written scores
+    written_count = models.PositiveIntegerField(default=0)             # written results counted
+    pronunciation_stats = models.JSONField(default=dict, blank=True)   # {"<exercise id>": [sum accuracy, attempts]}
+    stats_synced_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         unique_together = [("user", "lesson")]
 
@@ -349,6 +423,14 @@ class SRSDeck(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Glossary → flashcard sync bookkeeping (see services/glossary_sync.py)
+    glossary_dirty = models.BooleanField(default=True)               # set by GlossaryEntry signals
+    glossary_synced_at = models.DateTimeField(null=True, blank=True)  # high-water mark on GlossaryEntry.updated_at
+
+    # Shared decks (see services/shared_decks.py): content lives in SharedNote, learners subscribe
+    is_shared = models.BooleanField(default=False)
+    note_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         unique_together = [("user", "name")]
 
@@ -356,12 +438,55 @@ class SRSDeck(models.Model):
         return f"{self.user} — {self.name}"
 
 
+class SharedNote(models.Model):
+    """Card content of a shared deck, stored once for every subscriber."""
+    deck = models.ForeignKey(SRSDeck, on_delete=models.CASCADE, related_name="shared_notes")
+    front_text_es = models.CharField(max_length=255)
+    back_text_gn = models.CharField(max_length=255, blank=True)
+    notes = models.TextField(blank=True)
+    content_key = models.CharField(max_length=40, editable=False)  # Flashcard.make_content_key
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["deck", "content_key"], name="uniq_sharednote_deck_content_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.front_text_es} → {self.back_text_gn}"
+
+
+class SRSSubscription(models.Model):
+    """
+    A learner following a shared deck. Their Flashcard rows (scheduling only,
+    linked to the note) are created lazily, in note id order, up to note_cursor.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="srs_subscriptions")
+    deck = models.ForeignKey(SRSDeck, on_delete=models.CASCADE, related_name="subscriptions")
+    note_cursor = models.PositiveBigIntegerField(default=0)   # last SharedNote id materialized
+    materialized = models.PositiveIntegerField(default=0)     # cards created so far
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("user", "deck")]
+
+    def __str__(self):
+        return f"{self.user} ⇢ {self.deck.name}"
+
+
 class Flashcard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="flashcards")
     deck = models.ForeignKey(SRSDeck, on_delete=models.CASCADE, related_name="cards")
+    glossary_entry = models.ForeignKey(
+        GlossaryEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name="flashcards"
+    )
+    # Cards of a shared deck keep no text of their own: it comes from the note
+    note = models.ForeignKey(SharedNote, on_delete=models.CASCADE, null=True, blank=True, related_name="cards")
     front_text_es = models.CharField(max_length=255)
     back_text_gn = models.CharField(max_length=255, blank=True)
     notes = models.TextField(blank=True)
+    # sha1 of the (front, back) pair, unique per deck; NULL on legacy rows until backfilled
+    content_key = models.CharField(max_length=40, null=True, blank=True, editable=False)
 
     # Classic SRS fields
     due_at = models.DateTimeField(default=timezone.now)
@@ -380,21 +505,91 @@ class Flashcard(models.Model):
 
     class Meta:
         indexes = [models.Index(fields=["user", "deck", "due_at"])]
+        constraints = [
+            models.UniqueConstraint(fields=["deck", "content_key"], name="uniq_flashcard_deck_content_key"),
+            models.UniqueConstraint(fields=["user", "note"], name="uniq_flashcard_user_note"),
+        ]
 
     def __str__(self):
-        return f"{self.front_text_es} → {self.back_text_gn}"
+        front, back, _ = self.texts()
+        return f"{front} → {back}"
+
+    def texts(self):
+        """(front_text_es, back_text_gn, notes), from the shared note when there is one."""
+        src = self.note if self.note_id else self
+        return src.front_text_es, src.back_text_gn, src.notes
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Counter slot as loaded, so post_save can move it (services/srs_counters.py)
+        if {"repetitions", "suspended", "due_at"} <= set(field_names):
+            instance._srs_bucket = cls.counter_bucket(instance.repetitions, instance.suspended, instance.due_at)
+        return instance
+
+    @staticmethod
+    def counter_bucket(repetitions, suspended, due_at) -> tuple:
+        """("suspended",), ("new",) or ("review", "YYYY-MM-DD" of due_at in UTC)."""
+        if suspended:
+            return ("suspended",)
+        if not repetitions:
+            return ("new",)
+        return ("review", due_at.date().isoformat())
+
+    @staticmethod
+    def make_content_key(front_text_es: str, back_text_gn: str) -> str:
+        raw = f"{(front_text_es or '').strip()}\x1f{(back_text_gn or '').strip()}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 class ReviewLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="srs_reviews")
     card = models.ForeignKey(Flashcard, on_delete=models.CASCADE, related_name="reviews")
     rating = models.PositiveSmallIntegerField()  # 0..5
-    reviewed_at = models.DateTimeField(auto_now_add=True)
+    reviewed_at = models.DateTimeField(default=timezone.now)  # client time for batched grades
     interval_before = models.PositiveIntegerField(default=0)
     interval_after = models.PositiveIntegerField(default=0)
     ef_before = models.FloatField(default=2.5)
     ef_after = models.FloatField(default=2.5)
 
+    class Meta:
+        indexes = [models.Index(fields=["card", "reviewed_at"])]
+
+
+class ReviewArchive(models.Model):
+    """
+    Compacted ReviewLog rows of one card: packed (seconds since previous
+    review, rating, interval_after) records, oldest first. Written by the
+    compact_reviewlog command; read through services/review_archive.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="srs_review_archives")
+    card = models.OneToOneField(Flashcard, on_delete=models.CASCADE, related_name="review_archive")
+    count = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()   # time of the first packed review (base of the deltas)
+    last_at = models.DateTimeField()    # time of the newest packed review
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.card_id} — {self.count} reviews until {self.last_at:%Y-%m-%d}"
+
+
+class SRSItemPrior(models.Model):
+    """
+    Starting ai_difficulty / half_life_days for new cards of one ES/GN pair,
+    aggregated over every learner's reviews of it (build_srs_priors command,
+    services/srs_priors.py). key = srs_priors.item_key(front, back).
+    """
+    key = models.CharField(max_length=40, unique=True)
+    reviews = models.PositiveIntegerField(default=0)
+    learners = models.PositiveIntegerField(default=0)
+    ai_difficulty = models.FloatField(default=0.0)
+    half_life_days = models.FloatField(default=1.5)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key[:8]} — d={self.ai_difficulty:.2f} h={self.half_life_days:.1f} ({self.learners} learners)"
+
 
 class SRSUserState(models.Model):
     MODE_CHOICES = [
@@ -402,17 +597,29 @@ class SRSUserState(models.Model):
         ("comfortable", "Comfortable"),
         ("aggressive", "Aggressive"),
     ]
+    PRIORITY_CHOICES = [
+        ("due", "Oldest due first"),
+        ("retrievability", "Lowest predicted recall first"),
+    ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="srs_states")
     deck = models.ForeignKey(SRSDeck, on_delete=models.CASCADE, related_name="states")
-    theta = models.FloatField(default=0.0)  # learner ability (logit)
+    theta = models.FloatField(default=0.0)  # learner ability (logit), folded up to theta_event_id
+    theta_event_id = models.PositiveBigIntegerField(default=0)  # last SRSThetaEvent folded into theta
 
     # Study-mode fields
     mode = models.CharField(max_length=16, choices=MODE_CHOICES, default="comfortable")
+    priority = models.CharField(max_length=16, choices=PRIORITY_CHOICES, default="due")  # review ordering
     new_limit = models.PositiveIntegerField(default=15)   # cap of new cards per day
     new_shown_on = models.DateField(null=True, blank=True)
     new_shown_count = models.PositiveIntegerField(default=0)
 
+    # Denormalized card counters (see services/srs_counters.py)
+    new_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    suspended_count = models.PositiveIntegerField(default=0)
+    counters_synced_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -421,21 +628,55 @@ class SRSUserState(models.Model):
 
     def __str__(self):
         return f"{self.user} — {self.deck} — θ={self.theta:.2f} — mode={self.mode}"
-    
+
+
+class SRSDueDay(models.Model):
+    """
+    Review cards of one (user, deck) due on one UTC day: the due-date
+    histogram of services/srs_counters.py, one row per day so grades move it
+    with UPDATE ... SET count = count + n instead of rewriting a JSON blob.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="srs_due_days")
+    deck = models.ForeignKey(SRSDeck, on_delete=models.CASCADE, related_name="due_days")
+    day = models.DateField()
+    count = models.IntegerField(default=0)  # may reach 0 between reconciles; readers skip rows <= 0
+
+    class Meta:
+        unique_together = [("user", "deck", "day")]
+
+
+class SRSThetaEvent(models.Model):
+    """
+    Append-only input of one theta update (see services/srs_theta.py): grades
+    insert these instead of rewriting SRSUserState.theta, and folds replay
+    them in id order.
+    """
+    state = models.ForeignKey(SRSUserState, on_delete=models.CASCADE, related_name="theta_events")
+    correct = models.BooleanField()
+    difficulty = models.FloatField()  # card ai_difficulty before the grade
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
 # --- Nuevos ejercicios ---
 
 class DragDropExercise(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="dragdrops")
     prompt_text = models.CharField(max_length=255, help_text="Ej: Ordena la oración.")
     correct_tokens = models.JSONField(help_text="Lista de tokens en orden correcto, p.ej. ['Che','héra','María']")
+    correct_tokens_normalized = models.JSONField(default=list, blank=True, editable=False)
     order = models.PositiveIntegerField(default=0)
 
+    NORMALIZED_FIELDS = (("correct_tokens_normalized", "correct_tokens", True),)
+
     class Meta:
         ordering = ["order", "id"]
 
     def __str__(self):
         return f"DragDrop #{self.id} - L{self.lesson_id}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_with_fields(kwargs, *normalize_fields(self)))
+
 class ListeningExercise(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="listenings")
     prompt_text = models.CharField(max_length=255, blank=True, default="")
@@ -450,6 +691,11 @@ class ListeningExercise(models.Model):
     def __str__(self):
         return f"Listening #{self.id} - L{self.lesson_id}"
 
+    @property
+    def normalized_choices(self):
+        return normalize_choices(self.choices_json)
+
+
 class TranslationExercise(models.Model):
     DIRECTION = (
         ("es_gn", "Español → Guaraní"),
@@ -459,14 +705,20 @@ class TranslationExercise(models.Model):
     prompt_text = models.CharField(max_length=255)
     direction = models.CharField(max_length=10, choices=DIRECTION, default="es_gn")
     acceptable_answers = models.JSONField(default=list, help_text='Lista de respuestas válidas/sinónimos')
+    acceptable_answers_normalized = models.JSONField(default=list, blank=True, editable=False)
     order = models.PositiveIntegerField(default=0)
 
+    NORMALIZED_FIELDS = (("acceptable_answers_normalized", "acceptable_answers", True),)
+
     class Meta:
         ordering = ["order", "id"]
 
     def __str__(self):
         return f"Translation #{self.id} - L{self.lesson_id}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_with_fields(kwargs, *normalize_fields(self)))
+
 
 
 
@@ -50,6 +50,23 @@ class SRSGradeSerializer(serializers.Serializer):
     card_id = serializers.IntegerField()
     rating = serializers.IntegerField(min_value=0, max_value=5)
 
+class SRSSessionSerializer(serializers.Serializer):
+    size = serializers.IntegerField(min_value=1, max_value=100, required=False, default=20)
+
+class SRSForecastSerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=365, required=False, default=30)
+
+
+class SRSBatchGradeItemSerializer(serializers.Serializer):
+    card_id = serializers.IntegerField()
+    rating = serializers.IntegerField(min_value=0, max_value=5)
+    reviewed_at = serializers.DateTimeField(required=False)
+
+
+class SRSBatchGradeSerializer(serializers.Serializer):
+    # Ordered as graded on the client; applied sequentially
+    reviews = serializers.ListField(child=SRSBatchGradeItemSerializer(), min_length=1, max_length=200)
+
 class BulkGlossaryListSerializer(serializers.Serializer):
     items = serializers.ListField(child=GlossaryEntrySerializer())
 
@@ -63,4 +80,19 @@ class ListeningSubmissionSerializer(serializers.Serializer):
 
 class TranslationSubmissionSerializer(serializers.Serializer):
     exercise_id = serializers.IntegerField()
-    answer = serializers.CharField()
\ No newline at end of file
+    answer = serializers.CharField()
+
+
+class LessonSubmissionSerializer(serializers.Serializer):
+    # All answers of one lesson, per exercise type (same items as the single endpoints)
+    fillblank = FillBlankSubmissionSerializer(many=True, required=False)
+    mcq = MCQSubmissionSerializer(many=True, required=False)
+    matching = MatchingSubmissionSerializer(many=True, required=False)
+    dragdrop = DragDropSubmissionSerializer(many=True, required=False)
+    listening = ListeningSubmissionSerializer(many=True, required=False)
+    translation = TranslationSubmissionSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.values()):
+            raise serializers.ValidationError("No answers submitted")
+        return attrs
@@ -11,8 +11,11 @@ What it does
 
 How to use
 - Call grade_and_schedule(card, user_state, rating) after the learner grades a
-  flashcard (rating 0..5). It will update the DB fields on both objects and
-  return (interval_days, half_life_days, p0_estimate).
+  flashcard (rating 0..5). It will update the DB fields on both objects (theta
+  through the append-only log in srs_theta.py) and return
+  (interval_days, half_life_days, p0_estimate).
+- apply_grade() is the same step without the saves, for callers that persist
+  many grades at once (bulk_update / bulk_create).
 """
 
 from dataclasses import dataclass
@@ -48,17 +51,30 @@ class AISRSConfig:
 
 CFG = AISRSConfig()
 
+# Flashcard columns written by a grade (also used for bulk_update)
+CARD_SCHEDULE_FIELDS = [
+    "ai_difficulty", "half_life_days", "interval_days", "due_at",
+    "repetitions", "lapses", "updated_at",
+]
 
-def grade_and_schedule(card, user_state, rating: int, now=None, cfg: AISRSConfig = CFG):
-    """
-    Apply one AI-SRS update step and schedule the next review.
 
-    Params
-    - card: Flashcard instance (must have fields ai_difficulty, half_life_days,
-            interval_days, due_at, repetitions, lapses)
-    - user_state: SRSUserState instance (must have field theta)
-    - rating: int in 0..5 (0-2 incorrect/low confidence; 3 meh; 4-5 correct)
-    - now: optional timezone-aware datetime (defaults to timezone.now())
+def next_interval(h: float, p0: float, cfg: AISRSConfig = CFG) -> int:
+    """Days until the next review for half-life h and current mastery p0."""
+    # Choose next interval t so that expected recall at review time ≈ target
+    # Simple forgetting curve: p(t) = 2^(-t / h)  =>  t = -h * log2(target)
+    # Use natural log to avoid base issues.
+    t = int(round(-h * (math.log(cfg.target_recall) / math.log(2))))
+    t = max(cfg.min_interval, min(cfg.max_interval, t))
+    # If current mastery is low, force a short repeat
+    if p0 < 0.6:
+        t = cfg.min_interval
+    return t
+
+
+def apply_grade(card, user_state, rating: int, now=None, cfg: AISRSConfig = CFG):
+    """
+    In-memory half of grade_and_schedule: update theta and the card's AI/SRS
+    fields on the given objects without saving anything.
 
     Returns
     - (interval_days, half_life_days, p0_estimate)
@@ -93,18 +109,9 @@ def grade_and_schedule(card, user_state, rating: int, now=None, cfg: AISRSConfig
         # Incorrect/low confidence halves half-life (but bounded)
         h = max(cfg.min_half_life, h * 0.5)
 
-    # Choose next interval t so that expected recall at review time ≈ target
-    # Simple forgetting curve: p(t) = 2^(-t / h)  =>  t = -h * log2(target)
-    # Use natural log to avoid base issues.
-    t = int(round(-h * (math.log(cfg.target_recall) / math.log(2))))
-    t = max(cfg.min_interval, min(cfg.max_interval, t))
-    # If current mastery is low, force a short repeat
-    if p0 < 0.6:
-        t = cfg.min_interval
+    t = next_interval(h, p0, cfg)
 
-    # Persist updates
     user_state.theta = theta
-    user_state.save(update_fields=["theta", "updated_at"])
 
     card.ai_difficulty = diff
     card.half_life_days = h
@@ -115,9 +122,38 @@ def grade_and_schedule(card, user_state, rating: int, now=None, cfg: AISRSConfig
     else:
         card.repetitions = 0
         card.lapses = (card.lapses or 0) + 1
-    card.save(update_fields=[
-        "ai_difficulty", "half_life_days", "interval_days", "due_at",
-        "repetitions", "lapses", "updated_at"
-    ])
 
-    return t, h, p0
\ No newline at end of file
+    return t, h, p0
+
+
+def grade_and_schedule(card, user_state, rating: int, now=None, cfg: AISRSConfig = CFG):
+    """
+    Apply one AI-SRS update step and schedule the next review.
+
+    Params
+    - card: Flashcard instance (must have fields ai_difficulty, half_life_days,
+            interval_days, due_at, repetitions, lapses)
+    - user_state: SRSUserState instance (must have field theta)
+    - rating: int in 0..5 (0-2 incorrect/low confidence; 3 meh; 4-5 correct)
+    - now: optional timezone-aware datetime (defaults to timezone.now())
+
+    Returns
+    - (interval_days, half_life_days, p0_estimate)
+    """
+    # Imported here: srs_theta builds on this module
+    from . import srs_theta
+
+    # Start from the current theta (checkpoint + grades not folded yet)
+    pending = srs_theta.refresh(user_state, cfg)
+    difficulty = card.ai_difficulty
+    t, h, p0 = apply_grade(card, user_state, rating, now=now, cfg=cfg)
+
+    # Persist updates; theta as an append-only event, never a read-modify-write.
+    # The state row is only written after commit (deck counters and updated_at
+    # through the card's post_save, the fold), never under the grade's transaction.
+    card.save(update_fields=CARD_SCHEDULE_FIELDS)
+    srs_theta.record(user_state, [(rating >= 4, difficulty)])
+    if pending + 1 >= srs_theta.FOLD_EVERY:
+        srs_theta.fold_on_commit(user_state.pk, cfg)
+
+    return t, h, p0
@@ -0,0 +1,160 @@
+# learning/services/ai_srs_batch.py
+"""
+Vectorized (NumPy) version of the AI-SRS scheduler in ai_srs.py.
+
+What it does
+- grade_and_schedule_batch(): the apply_grade() step over arrays of theta,
+  difficulty, half-life and rating (one element per review, independent).
+- next_interval_batch(): next_interval() over arrays.
+- reschedule_deck(): re-derive half-life bounds, interval and due_at for every
+  graded card of a deck under a (possibly changed) AISRSConfig, writing only the
+  rows that change with chunked bulk_update.
+
+Parity with the scalar code
+- Same formulas, same clamping and the same round-half-to-even rounding.
+- exact=True (default) evaluates exp() with math.exp so every float matches the
+  scalar path bit for bit; exact=False uses np.exp, which is faster but can
+  differ in the last ulp.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Flashcard, SRSUserState
+from . import srs_counters, srs_queue, srs_theta
+from .ai_srs import AISRSConfig, CFG
+
+CHUNK_SIZE = 1000
+
+
+def sigmoid_batch(x, exact: bool = True):
+    """Array version of ai_srs._sigmoid (same ±12 clamps)."""
+    x = np.asarray(x, dtype=np.float64)
+    neg = -np.clip(x, -12.0, 12.0)  # clamped elements are overwritten below
+    if exact:
+        e = np.fromiter(map(math.exp, neg.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
+    else:
+        e = np.exp(neg)
+    p = 1.0 / (1.0 + e)
+    p = np.where(x > 12, 0.999994, p)
+    return np.where(x < -12, 0.000006, p)
+
+
+def next_interval_batch(half_life, p0, cfg: AISRSConfig = CFG):
+    """Array version of ai_srs.next_interval; returns int64 days."""
+    h = np.asarray(half_life, dtype=np.float64)
+    t = np.rint(-h * (math.log(cfg.target_recall) / math.log(2))).astype(np.int64)
+    t = np.clip(t, cfg.min_interval, cfg.max_interval)
+    return np.where(np.asarray(p0) < 0.6, cfg.min_interval, t)
+
+
+@dataclass
+class BatchGrade:
+    theta: np.ndarray        # updated learner ability
+    difficulty: np.ndarray   # updated item difficulty
+    half_life: np.ndarray    # updated half-life (days)
+    interval: np.ndarray     # next interval (days, int64)
+    p0: np.ndarray           # mastery estimate before the update
+    correct: np.ndarray      # rating >= 4
+
+
+def grade_and_schedule_batch(theta, difficulty, half_life, rating, cfg: AISRSConfig = CFG, exact: bool = True):
+    """
+    One AI-SRS step per element, identical to ai_srs.apply_grade().
+
+    Elements are independent: if one learner has several reviews, feed them in
+    consecutive calls (or use apply_grade) so theta carries over.
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    diff = np.asarray(difficulty, dtype=np.float64)
+    h = np.asarray(half_life, dtype=np.float64)
+    rating = np.asarray(rating, dtype=np.int64)
+
+    h = np.where(h <= 0, cfg.min_half_life, h)
+    y = rating >= 4
+
+    p0 = sigmoid_batch(theta - diff, exact=exact)
+    error = y.astype(np.float64) - p0
+    new_theta = theta + cfg.lr_user * error
+    new_diff = diff - cfg.lr_item * error
+
+    factor = 1.0 + 0.25 * np.maximum(0, rating - 3)
+    new_h = np.where(y, np.minimum(cfg.max_half_life, h * factor), np.maximum(cfg.min_half_life, h * 0.5))
+
+    return BatchGrade(
+        theta=new_theta, difficulty=new_diff, half_life=new_h,
+        interval=next_interval_batch(new_h, p0, cfg), p0=p0, correct=y,
+    )
+
+
+def reschedule_deck(user_id, deck_id, theta: float, cfg: AISRSConfig = CFG, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Re-apply cfg to every graded card (interval_days > 0) of one deck.
+
+    The last review time is recovered as due_at - interval_days; half-life is
+    clamped to the configured bounds and the interval recomputed from it and
+    the current mastery sigmoid(theta - ai_difficulty). Returns rows updated.
+    """
+    rows = list(
+        Flashcard.objects.filter(user_id=user_id, deck_id=deck_id, interval_days__gt=0)
+        .order_by("id").values_list(
+            "id", "ai_difficulty", "half_life_days", "interval_days", "due_at", "repetitions", "suspended"
+        )
+    )
+    if not rows:
+        return 0
+    ids, diff, h, old_t, due, reps, suspended = zip(*rows)
+    diff = np.array(diff, dtype=np.float64)
+    old_h = np.array(h, dtype=np.float64)
+    old_t = np.array(old_t, dtype=np.int64)
+
+    new_h = np.clip(np.where(old_h <= 0, cfg.min_half_life, old_h), cfg.min_half_life, cfg.max_half_life)
+    p = sigmoid_batch(theta - diff)
+    new_t = next_interval_batch(new_h, p, cfg)
+
+    changed = np.flatnonzero((new_t != old_t) | (new_h != old_h))
+    if changed.size == 0:
+        return 0
+
+    now = timezone.now()
+    cards, moves = [], []
+    for i in changed.tolist():
+        new_due = due[i] - timedelta(days=int(old_t[i])) + timedelta(days=int(new_t[i]))
+        cards.append(Flashcard(
+            id=ids[i],
+            half_life_days=float(new_h[i]),
+            interval_days=int(new_t[i]),
+            due_at=new_due,
+            updated_at=now,
+        ))
+        moves.append((
+            Flashcard.counter_bucket(reps[i], suspended[i], due[i]),
+            Flashcard.counter_bucket(reps[i], suspended[i], new_due),
+        ))
+    with transaction.atomic():
+        for start in range(0, len(cards), chunk_size):
+            Flashcard.objects.bulk_update(
+                cards[start:start + chunk_size], ["half_life_days", "interval_days", "due_at", "updated_at"]
+            )
+        srs_counters.record(user_id, deck_id, moves)
+    srs_queue.invalidate(user_id, deck_id)
+    from .srs_retrievability import invalidate as invalidate_retrievability
+    invalidate_retrievability(user_id, deck_id)
+    return len(cards)
+
+
+def reschedule_users(user_ids, cfg: AISRSConfig = CFG, chunk_size: int = CHUNK_SIZE) -> dict:
+    """reschedule_deck() for every deck state of the given users (one shard)."""
+    updated = decks = 0
+    user_ids = list(user_ids)
+    srs_theta.fold_users(user_ids, cfg)
+    states = SRSUserState.objects.filter(user_id__in=user_ids).values_list("user_id", "deck_id", "theta")
+    for user_id, deck_id, theta in states:
+        updated += reschedule_deck(user_id, deck_id, theta, cfg, chunk_size)
+        decks += 1
+    return {"users": len(user_ids), "decks": decks, "cards": updated}
@@ -0,0 +1,159 @@
+# learning/services/answer_keys.py
+"""
+In-process answer-key cache for the exercise submission endpoints.
+
+Every submit used to load its exercise row (get_object_or_404), and
+matching also re-queried its pairs and rebuilt the lowercase map. The
+answer keys change only when a teacher edits a lesson, so they are kept per
+lesson in process memory:
+
+- lesson_keys(lesson_id): {(kind, exercise id): AnswerKey} for every
+  written / listening / translation exercise of the lesson, built with one
+  values_list query per type (+ one for matching pairs). The key data is
+  the normalized forms stored on the exercises (scoring.normalize_answer,
+  nasal-folded with settings.ANSWER_FOLD_NASAL): the answer, upper-cased
+  choice keys, the pair map, the tokens, and an AnswerMatcher (exact set +
+  length / bigram filter) of the accepted translations.
+- get(kind, exercise_id): the key for one exercise. Exercise -> lesson ids
+  are indexed when a lesson is built; only an exercise never seen by this
+  process costs a one-column lookup.
+- Versioning: a local entry is used only while the lesson's content
+  version (lesson_content.version, moved by the content signals) is the one
+  it was built at, so other processes see edits too (with a shared cache
+  backend); the hot path does one cache get and no database queries.
+  CACHE_TTL is the safety net for writes that bypass signals
+  (queryset.update, bulk_create); call lesson_content.invalidate() after
+  those.
+- Those writes also skip the models' save(), which fills the normalized
+  forms: a form left empty (or a list of the wrong length) is normalized
+  from its source here; the normalize_exercises command repairs the rows.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+from ..models import (
+    DragDropExercise, FillBlankExercise, ListeningExercise, MatchingExercise,
+    MatchingPair, MultipleChoiceExercise, TranslationExercise,
+)
+from . import lesson_content
+from .scoring import (
+    AnswerMatcher, fold_nasals, matching_key, normalize_answer, score_choice, score_dragdrop, score_fillblank,
+    score_matching, score_translation,
+)
+
+CACHE_TTL = 60 * 60      # seconds a local entry is trusted without a signal
+
+MODELS = {
+    "fillblank": FillBlankExercise,
+    "mcq": MultipleChoiceExercise,
+    "matching": MatchingExercise,
+    "dragdrop": DragDropExercise,
+    "listening": ListeningExercise,
+    "translation": TranslationExercise,
+}
+KINDS = {model: kind for kind, model in MODELS.items()}
+
+
+class AnswerKey(NamedTuple):
+    kind: str
+    exercise_id: int
+    lesson_id: int
+    data: object          # pre-normalized answer data, see _build
+
+    def exercise(self):
+        """Unsaved instance with pk / lesson_id: all _save_user_result needs from the row."""
+        return MODELS[self.kind](pk=self.exercise_id, lesson_id=self.lesson_id)
+
+
+_lock = threading.Lock()
+_lessons = {}             # lesson_id -> (version token, built at, {(kind, id): AnswerKey})
+_index = {}               # (kind, exercise id) -> lesson_id
+
+
+def _fold_nasal() -> bool:
+    return bool(getattr(settings, "ANSWER_FOLD_NASAL", False))
+
+
+def _normalized(stored, source):
+    """The stored normalized form, or source normalized here if the row bypassed save() (bulk_create)."""
+    if isinstance(source, list):
+        if len(stored or []) != len(source):
+            return [normalize_answer(v) for v in source]
+        return stored
+    return stored if stored or not source else normalize_answer(source)
+
+
+def _build(lesson_id) -> dict:
+    # The answer side is stored normalized (models' save()); only the optional nasal folding is applied here
+    fold = fold_nasals if _fold_nasal() else (lambda text: text)
+    keys = {}
+    for pk, answer, source in FillBlankExercise.objects.filter(lesson_id=lesson_id).values_list(
+        "id", "correct_answer_normalized", "correct_answer"
+    ):
+        keys[("fillblank", pk)] = fold(_normalized(answer, source))
+    for kind in ("mcq", "listening"):
+        for pk, key in MODELS[kind].objects.filter(lesson_id=lesson_id).values_list("id", "correct_key"):
+            keys[(kind, pk)] = key.strip().upper()
+    pairs = {pk: [] for pk in MatchingExercise.objects.filter(lesson_id=lesson_id).values_list("id", flat=True)}
+    for pk, left, right, left_text, right_text in MatchingPair.objects.filter(
+        exercise__lesson_id=lesson_id
+    ).values_list("exercise_id", "left_normalized", "right_normalized", "left_text", "right_text"):
+        pairs[pk].append((fold(_normalized(left, left_text)), fold(_normalized(right, right_text))))
+    for pk, rows in pairs.items():
+        keys[("matching", pk)] = matching_key(rows)
+    for pk, tokens, source in DragDropExercise.objects.filter(lesson_id=lesson_id).values_list(
+        "id", "correct_tokens_normalized", "correct_tokens"
+    ):
+        keys[("dragdrop", pk)] = [fold(t) for t in _normalized(tokens, source or [])]
+    for pk, answers, source in TranslationExercise.objects.filter(lesson_id=lesson_id).values_list(
+        "id", "acceptable_answers_normalized", "acceptable_answers"
+    ):
+        keys[("translation", pk)] = AnswerMatcher(fold(a) for a in _normalized(answers, source or []))
+    return {k: AnswerKey(k[0], k[1], lesson_id, data) for k, data in keys.items()}
+
+
+def lesson_keys(lesson_id) -> dict:
+    """{(kind, exercise id): AnswerKey} of one lesson, rebuilt when its version moved."""
+    version = lesson_content.version(lesson_id)
+    entry = _lessons.get(lesson_id)
+    if entry is not None and entry[0] == version and time.monotonic() - entry[1] < CACHE_TTL:
+        return entry[2]
+    keys = _build(lesson_id)
+    with _lock:
+        _lessons[lesson_id] = (version, time.monotonic(), keys)
+        _index.update((k, lesson_id) for k in keys)
+    return keys
+
+
+def get(kind, exercise_id):
+    """AnswerKey of one exercise, or None if it does not exist."""
+    lesson_id = _index.get((kind, exercise_id))
+    if lesson_id is not None:
+        key = lesson_keys(lesson_id).get((kind, exercise_id))
+        if key is not None:
+            return key
+        # Deleted or moved to another lesson
+        with _lock:
+            _index.pop((kind, exercise_id), None)
+    lesson_id = MODELS[kind].objects.filter(pk=exercise_id).values_list("lesson_id", flat=True).first()
+    if lesson_id is None:
+        return None
+    return lesson_keys(lesson_id).get((kind, exercise_id))
+
+
+def score(key: AnswerKey, submission: dict):
+    """(score, is_correct, extra) of a validated submission against its answer key."""
+    if key.kind in ("mcq", "listening"):
+        return score_choice(key.data, submission["selected_key"])
+    fold = _fold_nasal()
+    if key.kind == "fillblank":
+        return score_fillblank(key.data, submission["answer"], fold)
+    if key.kind == "matching":
+        return score_matching(key.data, submission["pairs"], fold)
+    if key.kind == "dragdrop":
+        return score_dragdrop(key.data, submission["order"], fold)
+    return score_translation(key.data, submission["answer"], fold)
@@ -0,0 +1,144 @@
+# learning/services/glossary_sync.py
+"""
+Glossary → SRS flashcard sync (change-driven).
+
+How it works
+- Every Flashcard created from the glossary carries a link to its GlossaryEntry
+  and a content_key (sha1 of the stripped ES/GN pair) that is unique per deck.
+- Saving a GlossaryEntry flips SRSDeck.glossary_dirty for the owner's decks
+  (see learning/signals.py). While a deck is clean, sync_deck() returns without
+  touching the database, so the SRS hot path pays nothing.
+- A dirty deck only scans entries whose updated_at is at/after the deck's
+  high-water mark (glossary_synced_at), and inserts the missing keys in bulk.
+- New cards start from the global item priors (services/srs_priors.py).
+- Legacy decks (no high-water mark yet) are backfilled first: keyless cards get
+  their content_key and glossary link so nothing is duplicated.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Flashcard, GlossaryEntry, SRSDeck
+from . import srs_counters, srs_priors, srs_queue
+
+BATCH_SIZE = 500
+
+
+def mark_glossary_dirty(user_id):
+    """Flag every deck of this user for a glossary re-scan (one UPDATE)."""
+    SRSDeck.objects.filter(user_id=user_id, glossary_dirty=False).update(glossary_dirty=True)
+
+
+def backfill_deck(deck) -> dict:
+    """
+    Fill content_key / glossary_entry on cards created before the link existed.
+
+    Cards whose pair is already keyed in the deck are duplicates and keep a NULL
+    key (they still work, they just never match the glossary again).
+    Returns counters: {"keyed", "linked", "duplicates"}.
+    """
+    entry_ids = {}
+    for eid, es, gn in GlossaryEntry.objects.filter(user_id=deck.user_id).values_list(
+        "id", "source_text_es", "translated_text_gn"
+    ).order_by("id"):
+        entry_ids.setdefault(Flashcard.make_content_key(es, gn), eid)
+
+    taken = set(
+        Flashcard.objects.filter(deck=deck, content_key__isnull=False).values_list("content_key", flat=True)
+    )
+    keyed = linked = duplicates = 0
+    to_update = []
+    legacy = Flashcard.objects.filter(deck=deck, content_key__isnull=True).only(
+        "id", "front_text_es", "back_text_gn", "glossary_entry_id"
+    ).order_by("id")
+    for card in legacy.iterator(chunk_size=BATCH_SIZE):
+        key = Flashcard.make_content_key(card.front_text_es, card.back_text_gn)
+        if key in taken:
+            duplicates += 1
+            continue
+        taken.add(key)
+        card.content_key = key
+        keyed += 1
+        if card.glossary_entry_id is None and key in entry_ids:
+            card.glossary_entry_id = entry_ids[key]
+            linked += 1
+        to_update.append(card)
+    if to_update:
+        Flashcard.objects.bulk_update(to_update, ["content_key", "glossary_entry"], batch_size=BATCH_SIZE)
+    return {"keyed": keyed, "linked": linked, "duplicates": duplicates}
+
+
+def _existing_keys(deck, keys) -> set:
+    existing = set()
+    for i in range(0, len(keys), BATCH_SIZE):
+        existing.update(
+            Flashcard.objects.filter(deck=deck, content_key__in=keys[i:i + BATCH_SIZE])
+            .values_list("content_key", flat=True)
+        )
+    return existing
+
+
+def create_cards(deck, candidates, due_at) -> int:
+    """
+    Bulk-create the cards of `candidates` ({content_key: (entry_id, es, gn, notes)})
+    that the deck does not have yet, seeded from the global item priors.
+    Returns the number of flashcards created.
+
+    The deck row is locked for the insert, and the inserted keys are
+    re-read afterwards: rows skipped by ignore_conflicts (another writer got
+    there first) are neither counted nor recorded in the deck counters.
+    """
+    if not candidates:
+        return 0
+    with transaction.atomic():
+        list(SRSDeck.objects.select_for_update().filter(pk=deck.pk).values_list("pk", flat=True))
+        existing = _existing_keys(deck, list(candidates))
+        to_create = [
+            Flashcard(
+                user_id=deck.user_id, deck=deck, glossary_entry_id=eid, content_key=key,
+                front_text_es=es, back_text_gn=gn, notes=notes, due_at=due_at,
+            )
+            for key, (eid, es, gn, notes) in candidates.items() if key not in existing
+        ]
+        if not to_create:
+            return 0
+        srs_priors.seed(to_create)
+        Flashcard.objects.bulk_create(to_create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        created = len(_existing_keys(deck, [card.content_key for card in to_create]))
+        srs_counters.record(deck.user_id, deck.pk, [(None, ("new",))] * created)
+    if created:
+        srs_queue.invalidate(deck.user_id, deck.pk)
+    return created
+
+
+def sync_deck(deck, force: bool = False) -> int:
+    """
+    Create flashcards for glossary entries that changed since the last sync.
+
+    - force=False: no-op (no queries) unless the deck is flagged dirty.
+    - force=True: always run the incremental high-water-mark scan.
+    Returns the number of flashcards created.
+    """
+    if not force and not deck.glossary_dirty:
+        return 0
+
+    if deck.glossary_synced_at is None:
+        backfill_deck(deck)
+
+    # Clear the flag *before* scanning so a concurrent save re-dirties the deck.
+    mark = timezone.now()
+    SRSDeck.objects.filter(pk=deck.pk).update(glossary_dirty=False)
+
+    entries = GlossaryEntry.objects.filter(user_id=deck.user_id)
+    if deck.glossary_synced_at is not None:
+        entries = entries.filter(updated_at__gte=deck.glossary_synced_at)
+    candidates = {}
+    for eid, es, gn, notes in entries.values_list("id", "source_text_es", "translated_text_gn", "notes").order_by("id"):
+        candidates.setdefault(Flashcard.make_content_key(es, gn), (eid, es.strip(), gn.strip(), notes or ""))
+
+    created = create_cards(deck, candidates, mark)
+
+    SRSDeck.objects.filter(pk=deck.pk).update(glossary_synced_at=mark)
+    deck.glossary_dirty = False
+    deck.glossary_synced_at = mark
+    return created
@@ -0,0 +1,54 @@
+# learning/services/grading.py
+"""
+Offline grading of answer sheets (grade_answers command).
+
+Rows (student, exercise, answer) typed in from paper or exported from a
+spreadsheet are scored with the same answer keys and scorers as the submit
+endpoints (answer_keys.score) and stored as ordinary submissions:
+
+- the command resolves students and answer keys in the parent process
+  (answer_keys caches them per lesson: each lesson is loaded once) and
+  ships each chunk of rows with just the keys it needs;
+- score_chunk() runs in the worker processes (services/parallel.py) and
+  only computes: it returns ResultUpdates, never touches the database;
+- the parent stores them with lesson_progress.save_results (bulk upsert,
+  merged like repeated submissions: best score, is_correct OR,
+  attempts + 1) and moves the progress rows they touch in the same
+  transaction (lesson_progress.apply_deltas), so a stopped run resumed
+  with --after-line leaves no progress stale.
+"""
+
+from typing import NamedTuple
+
+from . import answer_keys
+from .lesson_progress import ResultUpdate
+
+# Exercise types whose answer is one cell of text
+KINDS = ("fillblank", "translation", "mcq", "listening")
+
+
+class Chunk(NamedTuple):
+    first_line: int
+    last_line: int
+    rows: list            # [(line, user_id, kind, exercise_id, answer)]
+    keys: dict            # {(kind, exercise id): AnswerKey} for these rows
+
+
+def submission(kind: str, answer: str) -> dict:
+    """The validated payload the submit endpoint would pass to answer_keys.score."""
+    return {"selected_key": answer} if kind in ("mcq", "listening") else {"answer": answer}
+
+
+def score_chunk(chunk: Chunk) -> dict:
+    """Score one chunk: {"first_line", "last_line", "updates": [ResultUpdate], "correct"}."""
+    updates = []
+    for _line, user_id, kind, exercise_id, answer in chunk.rows:
+        key = chunk.keys[(kind, exercise_id)]
+        score, is_correct, _extra = answer_keys.score(key, submission(kind, answer))
+        updates.append(ResultUpdate(user_id, kind, exercise_id, key.lesson_id, score, is_correct))
+    return {
+        "first_line": chunk.first_line,
+        "last_line": chunk.last_line,
+        "updates": updates,
+        "correct": sum(1 for u in updates if u.is_correct),
+    }
@@ -0,0 +1,161 @@
+# learning/services/lesson_content.py
+"""
+Lesson content versions and the precompiled lesson bundle.
+
+Version
+- Every lesson has a version token in the Django cache. invalidate()
+  replaces it; the signals call it for any change to the lesson, its
+  sections, pronunciation exercises, the six answer-keyed exercise types or
+  matching pairs (content_changed also covers a row moved between lessons).
+- Caches derived from lesson content are keyed by it: answer keys
+  (answer_keys.py) and the bundle below. A missing token (new or evicted)
+  is replaced by a fresh one, so a stale entry is never taken as current.
+
+Bundle (/learning/api/lessons/<pk>/bundle/)
+- build() reads the whole lesson (ten queries: the lesson, sections, seven
+  exercise types, matching pairs) into one JSON document: choices
+  normalized, no answers (matching options and drag-drop tokens sorted so
+  their order tells nothing).
+- bundle() stores the serialized bytes, their gzip and a strong ETag
+  (sha256 of the bytes; the gzip body's tag ends in -gz) under the lesson's
+  version; it is rebuilt only
+  after the version moved. Unpublished or deleted lessons are cached as
+  None (the Lesson signal invalidates them too).
+"""
+
+import gzip
+import hashlib
+import json
+import uuid
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from ..models import (
+    DragDropExercise, FillBlankExercise, Lesson, LessonSection, ListeningExercise, MatchingExercise,
+    MatchingPair, MultipleChoiceExercise, PronunciationExercise, TranslationExercise,
+)
+
+BUNDLE_TTL = 24 * 60 * 60    # seconds; the version key makes stale bundles unreachable anyway
+BUNDLE_FORMAT = 1            # bump when build() output changes shape
+
+# Rows that belong to a lesson through a `lesson` FK (signals.py)
+CONTENT_MODELS = (
+    LessonSection, FillBlankExercise, MultipleChoiceExercise, MatchingExercise, PronunciationExercise,
+    DragDropExercise, ListeningExercise, TranslationExercise,
+)
+
+
+def _version_key(lesson_id) -> str:
+    return f"lesson:{lesson_id}:v"
+
+
+def version(lesson_id) -> str:
+    token = cache.get(_version_key(lesson_id))
+    if token is None:
+        cache.add(_version_key(lesson_id), uuid.uuid4().hex, None)
+        token = cache.get(_version_key(lesson_id))
+    return token
+
+
+def invalidate(lesson_id):
+    """Lesson content changed: every process rebuilds what it derived from it."""
+    if lesson_id is not None:
+        cache.set(_version_key(lesson_id), uuid.uuid4().hex, None)
+
+
+def content_changed(row, previous_lesson_id=None):
+    """Signal hook for CONTENT_MODELS rows: invalidate their lesson (and the one they left)."""
+    invalidate(row.lesson_id)
+    if previous_lesson_id is not None and previous_lesson_id != row.lesson_id:
+        invalidate(previous_lesson_id)
+
+
+# ----- Bundle -----
+
+def _url(field):
+    return field.url if field else None
+
+
+def build(lesson) -> dict:
+    """The full content of one lesson, as served by the bundle endpoint."""
+    pairs = {}
+    for exercise_id, left, right in MatchingPair.objects.filter(exercise__lesson=lesson).order_by("id").values_list(
+        "exercise_id", "left_text", "right_text"
+    ):
+        pairs.setdefault(exercise_id, []).append((left, right))
+
+    return {
+        "format": BUNDLE_FORMAT,
+        "lesson": {"id": lesson.id, "title": lesson.title, "description": lesson.description, "order": lesson.order},
+        "sections": [
+            {"id": s.id, "title": s.title, "body": s.body, "reference_audio": _url(s.reference_audio), "order": s.order}
+            for s in lesson.sections.all()
+        ],
+        "fillblank": [
+            {"id": e.id, "prompt_text": e.prompt_text, "order": e.order}
+            for e in lesson.fillblanks.all()
+        ],
+        "mcq": [
+            {"id": e.id, "question_text": e.question_text, "choices": e.normalized_choices, "order": e.order}
+            for e in lesson.mcqs.all()
+        ],
+        "matching": [
+            {
+                "id": e.id, "instructions": e.instructions, "order": e.order,
+                "left": [left for left, _ in pairs.get(e.id, [])],
+                "options": sorted({right for _, right in pairs.get(e.id, [])}, key=str.casefold),
+            }
+            for e in lesson.matchings.all()
+        ],
+        "pronunciation": [
+            {"id": e.id, "text_guarani": e.text_guarani, "reference_audio": _url(e.reference_audio), "order": e.order}
+            for e in lesson.pronun_exercises.all()
+        ],
+        "dragdrop": [
+            {"id": e.id, "prompt_text": e.prompt_text, "tokens": sorted(e.correct_tokens or [], key=str.casefold),
+             "order": e.order}
+            for e in lesson.dragdrops.all()
+        ],
+        "listening": [
+            {"id": e.id, "prompt_text": e.prompt_text, "audio": _url(e.audio), "choices": e.normalized_choices,
+             "order": e.order}
+            for e in lesson.listenings.all()
+        ],
+        "translation": [
+            {"id": e.id, "prompt_text": e.prompt_text, "direction": e.direction, "order": e.order}
+            for e in lesson.translations.all()
+        ],
+    }
+
+
+class Bundle(NamedTuple):
+    etag: str             # strong, quoted; of the identity body
+    body: bytes           # UTF-8 JSON
+    gzipped: bytes
+
+    @property
+    def gzip_etag(self) -> str:
+        """Strong validators differ per content-coding: the gzip body has its own tag."""
+        return self.etag[:-1] + '-gz"'
+
+
+def compile_bundle(data: dict) -> Bundle:
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Bundle(
+        etag='"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+    )
+
+
+def bundle(lesson_id):
+    """Compiled Bundle of a published lesson (None if missing or unpublished), cached per version."""
+    key = f"lesson:{lesson_id}:bundle:{version(lesson_id)}"
+    cached = cache.get(key)
+    if cached is not None:
+        return Bundle(*cached) if cached else None
+    lesson = Lesson.objects.filter(pk=lesson_id, is_published=True).first()
+    compiled = compile_bundle(build(lesson)) if lesson else None
+    cache.set(key, tuple(compiled) if compiled else (), BUNDLE_TTL)
+    return compiled
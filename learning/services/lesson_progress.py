@@ -0,0 +1,507 @@
+# learning/services/lesson_progress.py
+"""
+UserLessonProgress, kept incrementally.
+
+Definitions (unchanged from the old _update_lesson_progress)
+- written_score: mean best score over the learner's fill-blank / MCQ /
+  matching results in the lesson
+- pronunciation_confidence: mean over the lesson's pronunciation exercises
+  (with attempts) of the mean accuracy of their attempts
+- progress_percent = WRITTEN_WEIGHT * written + PRONUNCIATION_WEIGHT * pronunciation,
+  completed at COMPLETED_AT
+
+Running aggregates on the progress row (written_sum / written_count,
+pronunciation_stats = {exercise id: [sum accuracy, attempts]}) are moved by
+the delta of each submission: one locked read of the row plus at most one
+UPDATE of the fields that actually changed. Rows never aggregated
+(stats_synced_at NULL: new, or created before the aggregates existed) take
+the full path, recompute(), which is also the repair tool (results or
+attempts deleted by hand, weights changed).
+
+recompute_users() does the same for a whole shard of users with a handful
+of grouped queries and chunked bulk writes (recompute_progress command);
+apply_deltas() moves a batch of submissions' rows (save_results) the same
+way, and rebuilds the ones not in sync with recompute_pairs().
+
+UserExerciseResult carries its exercise's lesson and exercise_type
+(denormalized, kept in step by save_result and the exercise signals), so
+the written aggregates are plain indexed (user, lesson) queries;
+tag_results() fills both columns from the exercise rows (migration 0019,
+backfill_exercise_results command). When an exercise is moved or deleted,
+the signals retag its results and mark the affected rows of both lessons
+stale (mark_stale), so their next write takes the full path.
+"""
+
+import math
+from typing import NamedTuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from ..models import (
+    FillBlankExercise, MatchingExercise, MultipleChoiceExercise,
+    PronunciationAttempt, UserExerciseResult, UserLessonProgress,
+)
+from . import answer_keys
+
+WRITTEN_MODELS = (FillBlankExercise, MultipleChoiceExercise, MatchingExercise)
+WRITTEN_TYPES = ("fillblank", "mcq", "matching")     # UserExerciseResult.exercise_type of WRITTEN_MODELS
+WRITTEN_WEIGHT = 0.5
+PRONUNCIATION_WEIGHT = 0.5
+COMPLETED_AT = 90.0
+CHUNK_SIZE = 500          # rows per bulk write in recompute_users
+
+STAT_FIELDS = ["written_sum", "written_count", "pronunciation_stats"]
+DERIVED_FIELDS = ["written_score", "pronunciation_confidence", "progress_percent", "completed"]
+
+
+def is_written(exercise) -> bool:
+    return isinstance(exercise, WRITTEN_MODELS)
+
+
+def save_result(user, exercise, score: float, is_correct: bool):
+    """
+    Upsert the learner's best result for one exercise (row-locked).
+    Returns (best-score delta, result-count delta) for the running sums.
+    """
+    ct = ContentType.objects.get_for_model(type(exercise))
+    tags = {"lesson_id": exercise.lesson_id, "exercise_type": answer_keys.KINDS[type(exercise)]}
+    with transaction.atomic():
+        obj, created = UserExerciseResult.objects.select_for_update().get_or_create(
+            user=user, content_type=ct, object_id=exercise.id,
+            defaults={"score": score, "is_correct": is_correct, "attempts": 1, **tags},
+        )
+        if created:
+            return score, 1
+        old = obj.score
+        obj.score = max(obj.score, score)
+        obj.is_correct = obj.is_correct or is_correct
+        obj.attempts += 1
+        for name, value in tags.items():
+            setattr(obj, name, value)
+        obj.save()
+    return obj.score - old, 0
+
+
+class ResultUpdate(NamedTuple):
+    user_id: int
+    kind: str             # UserExerciseResult.exercise_type
+    exercise_id: int
+    lesson_id: int
+    score: float
+    is_correct: bool
+    attempts: int = 1     # submissions folded into this update
+
+
+def save_results(updates, now=None) -> dict:
+    """
+    save_result for many updates at once, merged in order: existing rows
+    read under lock (one query per exercise type, two for a batch of many
+    users and exercises), one executemany UPDATE, one bulk_create. Returns {(user_id, lesson_id): [sum delta, count delta,
+    any written]} for apply_deltas().
+    """
+    updates = list(updates)
+    now = now or timezone.now()
+    cts = {kind: ContentType.objects.get_for_model(answer_keys.MODELS[kind]) for kind in {u.kind for u in updates}}
+    deltas = {}
+    with transaction.atomic():
+        existing = {}
+        for kind, ct in cts.items():
+            wanted = {(u.user_id, u.exercise_id) for u in updates if u.kind == kind}
+            users, exercises = {w[0] for w in wanted}, {w[1] for w in wanted}
+            rows = UserExerciseResult.objects.filter(content_type=ct, user_id__in=users, object_id__in=exercises)
+            if len(users) > 1 and len(exercises) > 1:
+                # users x exercises also matches pairs not in the batch (most of them, for a large mixed
+                # batch such as grade_answers): find the wanted ids as tuples, lock and load only those
+                ids = [
+                    pk for pk, user_id, object_id in rows.values_list("id", "user_id", "object_id").iterator(
+                        chunk_size=CHUNK_SIZE * 10
+                    )
+                    if (user_id, object_id) in wanted
+                ]
+                rows = [
+                    obj for i in range(0, len(ids), CHUNK_SIZE)
+                    for obj in UserExerciseResult.objects.select_for_update().filter(id__in=ids[i:i + CHUNK_SIZE])
+                ]
+            else:
+                rows = rows.select_for_update()
+            for obj in rows:
+                existing[(obj.user_id, kind, obj.object_id)] = obj
+        to_update, to_create = {}, {}
+        for u in updates:
+            key = (u.user_id, u.kind, u.exercise_id)
+            obj = existing.get(key) or to_create.get(key)
+            if obj is None:
+                obj = to_create[key] = UserExerciseResult(
+                    user_id=u.user_id, content_type=cts[u.kind], object_id=u.exercise_id,
+                    lesson_id=u.lesson_id, exercise_type=u.kind,
+                    score=u.score, is_correct=u.is_correct, attempts=u.attempts, last_submitted=now,
+                )
+                old, created = 0.0, 1
+            else:
+                old, created = obj.score, 0
+                obj.score = max(obj.score, u.score)
+                obj.is_correct = obj.is_correct or u.is_correct
+                obj.attempts += u.attempts
+                obj.last_submitted = now
+                obj.lesson_id, obj.exercise_type = u.lesson_id, u.kind
+                if key in existing:
+                    to_update[key] = obj
+            entry = deltas.setdefault((u.user_id, u.lesson_id), [0.0, 0, False])
+            if u.kind in WRITTEN_TYPES:
+                entry[0] += obj.score - old
+                entry[1] += created
+                entry[2] = True
+        _bulk_update(list(to_update.values()), ["score", "is_correct", "attempts", "last_submitted", "lesson", "exercise_type"])
+        UserExerciseResult.objects.bulk_create(list(to_create.values()), batch_size=CHUNK_SIZE)
+    return deltas
+
+
+def apply_deltas(deltas) -> int:
+    """
+    Move each touched progress row once, in bulk: the rows in sync are read
+    under lock (one query per CHUNK_SIZE users), the written deltas added
+    and re-derived, and the moved rows written with one executemany; rows
+    missing or stale are rebuilt together (recompute_pairs). Where nothing
+    written was saved the row only has to exist, as in ensure(). Returns
+    rows written.
+    """
+    if not deltas:
+        return 0
+    now = timezone.now()
+    with transaction.atomic():
+        rows = _locked_pairs(deltas, stats_synced_at__isnull=False)
+        to_update = []
+        for key, progress in rows.items():
+            sum_delta, count_delta, written = deltas[key]
+            if not written or not (sum_delta or count_delta):
+                continue
+            progress.written_sum += sum_delta
+            progress.written_count += count_delta
+            for name, value in derive(progress.written_sum, progress.written_count, progress.pronunciation_stats).items():
+                setattr(progress, name, value)
+            progress.updated_at = now
+            to_update.append(progress)
+        _bulk_update(to_update, ["written_sum", "written_count"] + DERIVED_FIELDS + ["updated_at"])
+        return len(to_update) + recompute_pairs(deltas.keys() - rows.keys(), now=now)
+
+
+def derive(written_sum, written_count, pronunciation_stats) -> dict:
+    """Derived progress fields from the running aggregates."""
+    written = written_sum / written_count if written_count else 0.0
+    means = [total / n for total, n in pronunciation_stats.values() if n]
+    pronunciation = sum(means) / len(means) if means else 0.0
+    percent = WRITTEN_WEIGHT * written + PRONUNCIATION_WEIGHT * pronunciation
+    return {
+        "written_score": written,
+        "pronunciation_confidence": pronunciation,
+        "progress_percent": percent,
+        "completed": percent >= COMPLETED_AT,
+    }
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-9)
+    return a == b
+
+
+def _store(progress, stat_fields) -> bool:
+    """Re-derive and save only what changed (plus the moved stats). Returns True if written."""
+    fields = list(stat_fields)
+    for name, value in derive(progress.written_sum, progress.written_count, progress.pronunciation_stats).items():
+        if not _same(getattr(progress, name), value):
+            setattr(progress, name, value)
+            fields.append(name)
+    if not fields:
+        return False
+    progress.save(update_fields=fields + ["updated_at"])
+    return True
+
+
+def _locked(user_id, lesson_id):
+    return UserLessonProgress.objects.select_for_update().filter(
+        user_id=user_id, lesson_id=lesson_id, stats_synced_at__isnull=False
+    ).first()
+
+
+def record_written(user_id, lesson_id, sum_delta: float, count_delta: int) -> bool:
+    """Apply a written result delta (from save_result). Returns True if the row was written."""
+    with transaction.atomic():
+        progress = _locked(user_id, lesson_id)
+        if progress is None:
+            recompute(user_id, lesson_id)
+            return True
+        if not sum_delta and not count_delta:
+            return False
+        progress.written_sum += sum_delta
+        progress.written_count += count_delta
+        return _store(progress, ["written_sum", "written_count"])
+
+
+def record_pronunciation(user_id, lesson_id, exercise_id, accuracy: float) -> bool:
+    """Apply one new PronunciationAttempt. Returns True if the row was written."""
+    with transaction.atomic():
+        progress = _locked(user_id, lesson_id)
+        if progress is None:
+            recompute(user_id, lesson_id)
+            return True
+        stats = dict(progress.pronunciation_stats or {})
+        total, n = stats.get(str(exercise_id), (0.0, 0))
+        stats[str(exercise_id)] = [total + accuracy, n + 1]
+        progress.pronunciation_stats = stats
+        return _store(progress, ["pronunciation_stats"])
+
+
+def ensure(user_id, lesson_id) -> bool:
+    """
+    For submissions that do not move the aggregates (drag-drop, listening,
+    translation): make sure the progress row exists. Returns True if written.
+    """
+    if UserLessonProgress.objects.filter(
+        user_id=user_id, lesson_id=lesson_id, stats_synced_at__isnull=False
+    ).exists():
+        return False
+    recompute(user_id, lesson_id)
+    return True
+
+
+def written_filter(lesson_ids) -> Q:
+    """UserExerciseResult filter for the written exercises of the given lessons."""
+    return Q(lesson_id__in=lesson_ids, exercise_type__in=WRITTEN_TYPES)
+
+
+def compute(user_id, lesson_id) -> dict:
+    """Fresh running aggregates from the result tables (two queries)."""
+    written = UserExerciseResult.objects.filter(user_id=user_id).filter(written_filter([lesson_id])).aggregate(
+        total=Sum("score"), n=Count("id"),
+    )
+    pronunciation = (
+        PronunciationAttempt.objects.filter(user_id=user_id, exercise__lesson_id=lesson_id)
+        .values("exercise_id").annotate(total=Sum("accuracy_score"), n=Count("id")).order_by()
+    )
+    return {
+        "written_sum": written["total"] or 0.0,
+        "written_count": written["n"],
+        "pronunciation_stats": {str(r["exercise_id"]): [r["total"], r["n"]] for r in pronunciation},
+    }
+
+
+def tag_results(first_id, last_id) -> int:
+    """
+    Set lesson / exercise_type of the results with first_id <= id <= last_id
+    from their exercise (one UPDATE per exercise type). Rows of deleted
+    exercises get lesson NULL. Returns rows updated.
+    """
+    updated = 0
+    for kind, model in answer_keys.MODELS.items():
+        updated += UserExerciseResult.objects.filter(
+            id__gte=first_id, id__lte=last_id, content_type=ContentType.objects.get_for_model(model),
+        ).update(
+            exercise_type=kind,
+            lesson_id=Subquery(model.objects.filter(pk=OuterRef("object_id")).values("lesson_id")[:1]),
+        )
+    return updated
+
+
+def mark_stale(user_ids, lesson_ids) -> int:
+    """Send these (user, lesson) rows back to the full path: their next write recomputes them."""
+    lesson_ids = [pk for pk in lesson_ids if pk is not None]
+    return UserLessonProgress.objects.filter(
+        user_id__in=list(user_ids), lesson_id__in=lesson_ids, stats_synced_at__isnull=False,
+    ).update(stats_synced_at=None)
+
+
+def move_results(kind, exercise_id, from_lesson_id, to_lesson_id) -> int:
+    """
+    An exercise moved to another lesson (to_lesson_id None: deleted): retag
+    its results. For written exercises the running sums of both lessons no
+    longer match, so the learners' rows of both are marked stale.
+    """
+    results = UserExerciseResult.objects.filter(lesson_id=from_lesson_id, exercise_type=kind, object_id=exercise_id)
+    user_ids = list(results.values_list("user_id", flat=True).distinct()) if kind in WRITTEN_TYPES else []
+    moved = results.update(lesson_id=to_lesson_id)
+    if user_ids:
+        mark_stale(user_ids, [from_lesson_id, to_lesson_id])
+    return moved
+
+
+def move_pronunciation(exercise_id, from_lesson_id, to_lesson_id) -> int:
+    """
+    A pronunciation exercise moved (to_lesson_id None: deleted, its attempts
+    with it): mark stale the rows whose pronunciation_stats count it, in both
+    lessons. Returns rows marked.
+    """
+    user_ids = UserLessonProgress.objects.filter(
+        lesson_id=from_lesson_id, pronunciation_stats__has_key=str(exercise_id),
+    ).values_list("user_id", flat=True)
+    return mark_stale(list(user_ids), [from_lesson_id, to_lesson_id])
+
+
+def recompute(user_id, lesson_id):
+    """Full path: rebuild one (user, lesson) progress row from scratch and save it."""
+    with transaction.atomic():
+        progress, _ = UserLessonProgress.objects.select_for_update().get_or_create(user_id=user_id, lesson_id=lesson_id)
+        for name, value in compute(user_id, lesson_id).items():
+            setattr(progress, name, value)
+        for name, value in derive(progress.written_sum, progress.written_count, progress.pronunciation_stats).items():
+            setattr(progress, name, value)
+        progress.stats_synced_at = timezone.now()
+        progress.save()
+    return progress
+
+
+def compute_users(user_ids, lesson_ids=None) -> dict:
+    """
+    Running aggregates of every (user, lesson) pair of the given users (of
+    the given lessons only, if set): one grouped query per source.
+    """
+    user_ids = list(user_ids)
+    stats = {}
+    written, pronunciation = Q(), Q()
+    if lesson_ids is not None:
+        written, pronunciation = Q(lesson_id__in=list(lesson_ids)), Q(exercise__lesson_id__in=list(lesson_ids))
+
+    def slot(key):
+        return stats.setdefault(key, {"written_sum": 0.0, "written_count": 0, "pronunciation_stats": {}})
+
+    rows = (
+        UserExerciseResult.objects.filter(
+            written, user_id__in=user_ids, lesson_id__isnull=False, exercise_type__in=WRITTEN_TYPES
+        )
+        .values("user_id", "lesson_id").annotate(total=Sum("score"), n=Count("id")).order_by()
+    )
+    for r in rows:
+        entry = slot((r["user_id"], r["lesson_id"]))
+        entry["written_sum"] += r["total"]
+        entry["written_count"] += r["n"]
+
+    rows = (
+        PronunciationAttempt.objects.filter(pronunciation, user_id__in=user_ids)
+        .values("user_id", "exercise__lesson_id", "exercise_id")
+        .annotate(total=Sum("accuracy_score"), n=Count("id")).order_by()
+    )
+    for r in rows:
+        slot((r["user_id"], r["exercise__lesson_id"]))["pronunciation_stats"][str(r["exercise_id"])] = [r["total"], r["n"]]
+    return stats
+
+
+def _locked_pairs(pairs, **filters) -> dict:
+    """Progress rows of the given (user, lesson) pairs, locked: one query per CHUNK_SIZE users."""
+    user_ids = sorted({user_id for user_id, _ in pairs})
+    lesson_ids = list({lesson_id for _, lesson_id in pairs})
+    rows = {}
+    for i in range(0, len(user_ids), CHUNK_SIZE):
+        for progress in UserLessonProgress.objects.select_for_update().filter(
+            user_id__in=user_ids[i:i + CHUNK_SIZE], lesson_id__in=lesson_ids, **filters
+        ):
+            if (progress.user_id, progress.lesson_id) in pairs:
+                rows[(progress.user_id, progress.lesson_id)] = progress
+    return rows
+
+
+def recompute_pairs(pairs, now=None) -> int:
+    """
+    recompute() for many (user, lesson) pairs: grouped queries and chunked
+    bulk writes instead of three queries a pair. Returns rows written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    now = now or timezone.now()
+    with transaction.atomic():
+        existing = _locked_pairs(pairs)
+        stats = {}
+        user_ids = sorted({user_id for user_id, _ in pairs})
+        lesson_ids = {lesson_id for _, lesson_id in pairs}
+        for i in range(0, len(user_ids), CHUNK_SIZE):
+            stats.update(compute_users(user_ids[i:i + CHUNK_SIZE], lesson_ids))
+        to_update, to_create = [], []
+        for key in pairs:
+            values = stats.get(key) or {"written_sum": 0.0, "written_count": 0, "pronunciation_stats": {}}
+            values.update(derive(**values))
+            progress = existing.get(key)
+            if progress is None:
+                to_create.append(UserLessonProgress(user_id=key[0], lesson_id=key[1], stats_synced_at=now, **values))
+                continue
+            for name, value in values.items():
+                setattr(progress, name, value)
+            progress.stats_synced_at = progress.updated_at = now
+            to_update.append(progress)
+        _bulk_update(to_update, STAT_FIELDS + DERIVED_FIELDS + ["stats_synced_at", "updated_at"])
+        UserLessonProgress.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+    return len(pairs)
+
+
+def _bulk_update(rows, fields):
+    """
+    bulk_update() for many rows of one model: one prepared UPDATE ... WHERE
+    id = %s run with executemany per chunk. Values go through
+    get_db_prep_save, so conversions (JSON, datetimes, FK ids) stay the
+    ORM's; the stored rows are the same (test_lesson_progress). Plain values
+    only: no F() expressions.
+
+    Why not Model.objects.bulk_update: it builds a CASE WHEN per field and
+    row and spends its time compiling them. Measured with bench_bulk_update
+    (SQLite, 5000 rows of UserLessonProgress x 8 fields or
+    UserExerciseResult x 6): 0.2-0.3 s here against 5-8 s, 22-31x at any
+    batch_size from 50 to 500, i.e. most of a recompute_progress shard or
+    a grade_answers chunk.
+    """
+    if not rows:
+        return
+    if any(p.pk is None for p in rows):
+        raise ValueError("All _bulk_update() objects must have a primary key set.")
+    meta = rows[0]._meta
+    columns = [meta.get_field(name) for name in fields]
+    qn = connection.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        qn(meta.db_table), ", ".join(f"{qn(f.column)} = %s" for f in columns), qn(meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), CHUNK_SIZE):
+            cursor.executemany(sql, [
+                [f.get_db_prep_save(getattr(p, f.attname), connection) for f in columns] + [p.pk]
+                for p in rows[i:i + CHUNK_SIZE]
+            ])
+
+
+def recompute_users(user_ids, dry_run: bool = False) -> dict:
+    """
+    Full recompute for one shard of users: aggregates, then chunked bulk
+    updates of the rows that changed and bulk_create of missing ones, in
+    one transaction with the shard's progress rows locked so concurrent
+    submissions wait instead of being overwritten. updated_at is left alone
+    (it drives "recent lessons").
+    """
+    user_ids = list(user_ids)
+    fields = STAT_FIELDS + DERIVED_FIELDS + ["stats_synced_at"]
+    result = {"users": len(user_ids), "last_user_id": max(user_ids, default=None), "pairs": 0, "updated": 0, "created": 0}
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (p.user_id, p.lesson_id): p
+            for p in UserLessonProgress.objects.select_for_update().filter(user_id__in=user_ids)
+        }
+        stats = compute_users(user_ids)
+        to_update, to_create = [], []
+        for key in stats.keys() | existing.keys():
+            values = stats.get(key) or {"written_sum": 0.0, "written_count": 0, "pronunciation_stats": {}}
+            values.update(derive(**values))
+            progress = existing.get(key)
+            if progress is None:
+                to_create.append(UserLessonProgress(user_id=key[0], lesson_id=key[1], stats_synced_at=now, **values))
+                continue
+            if progress.stats_synced_at is not None and all(_same(getattr(progress, k), v) for k, v in values.items()):
+                continue
+            for name, value in values.items():
+                setattr(progress, name, value)
+            progress.stats_synced_at = now
+            to_update.append(progress)
+        result.update(pairs=len(stats.keys() | existing.keys()), updated=len(to_update), created=len(to_create))
+        if not dry_run:
+            _bulk_update(to_update, fields)
+            UserLessonProgress.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+    return result
@@ -0,0 +1,74 @@
+# learning/services/lesson_submit.py
+"""
+Whole-lesson submission: every answer of a lesson in one request.
+
+Submitting exercise by exercise costs, per answer, a get_object_or_404, a
+locked get_or_create of the UserExerciseResult and a progress update.
+submit() does the same work once per lesson:
+
+- the lesson's answer keys come from the in-process cache
+  (services/answer_keys.py, no content queries when warm); answers are
+  scored in memory exactly as by the single endpoints
+- results merged into the learner's rows in submission order (best score,
+  is_correct OR, attempts + 1) by lesson_progress.save_results: one locked
+  read per type, one bulk UPDATE, one bulk_create
+- lesson progress moved once by the summed written delta
+  (lesson_progress.apply_deltas)
+"""
+
+from ..models import UserLessonProgress
+from . import answer_keys, lesson_progress
+
+
+class UnknownExercises(Exception):
+    """Some submitted exercise ids are not exercises of the lesson: {type: [ids]}."""
+
+    def __init__(self, missing):
+        super().__init__(missing)
+        self.missing = missing
+
+
+def load(lesson, answers) -> dict:
+    """{type: {id: AnswerKey}} for the submitted ids, from the lesson's cached keys. Raises UnknownExercises."""
+    keys = answer_keys.lesson_keys(lesson.id)
+    exercises, missing = {}, {}
+    for name, items in answers.items():
+        if not items:
+            continue
+        ids = {a["exercise_id"] for a in items}
+        exercises[name] = {pk: keys[(name, pk)] for pk in ids if (name, pk) in keys}
+        if ids - set(exercises[name]):
+            missing[name] = sorted(ids - set(exercises[name]))
+    if missing:
+        raise UnknownExercises(missing)
+    return exercises
+
+
+def submit(user, lesson, answers) -> dict:
+    """
+    Score and store all answers ({type: [validated submission, ...]}) of one
+    lesson. Returns {"results": [per answer], "progress": {...}}.
+    """
+    exercises = load(lesson, answers)
+
+    scored = []   # (type, answer key, score, is_correct, extra), in submission order
+    for name, items in answers.items():
+        for a in items or ():
+            ak = exercises[name][a["exercise_id"]]
+            scored.append((name, ak, *answer_keys.score(ak, a)))
+
+    lesson_progress.apply_deltas(lesson_progress.save_results(
+        lesson_progress.ResultUpdate(user.id, name, ak.exercise_id, ak.lesson_id, score, is_correct)
+        for name, ak, score, is_correct, _extra in scored
+    ))
+
+    progress = UserLessonProgress.objects.filter(user=user, lesson=lesson).values(
+        "written_score", "pronunciation_confidence", "progress_percent", "completed",
+    ).first()
+    return {
+        "results": [
+            {"type": name, "exercise_id": ak.exercise_id, "score": score, "is_correct": is_correct, **extra}
+            for name, ak, score, is_correct, extra in scored
+        ],
+        "progress": progress,
+    }
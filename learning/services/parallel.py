@@ -0,0 +1,47 @@
+# learning/services/parallel.py
+"""
+Small helpers for management commands that shard work across processes.
+
+- Work is split into shards (lists of user ids, usually) and each shard is
+  handled by a module-level function, so it can be pickled to a worker.
+- Workers run django.setup() and drop inherited DB connections; the parent
+  closes its own connections before the pool starts.
+- workers <= 1 runs everything in-process (handy on SQLite and for debugging).
+- max_pending bounds the shards queued at once, so a lazily produced shard
+  iterable (a streamed file) is read only as fast as the pool drains it.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+
+def init_worker():
+    import django
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+
+
+def chunked(ids, size):
+    ids = list(ids)
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def run_sharded(fn, shards, workers: int = 1, *args, max_pending: int = None):
+    """Yield fn(shard, *args) for every shard, as results complete."""
+    if workers <= 1:
+        for shard in shards:
+            yield fn(shard, *args)
+        return
+
+    from django.db import connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        pending = set()
+        for shard in shards:
+            pending.add(pool.submit(fn, shard, *args))
+            if max_pending and len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
@@ -0,0 +1,368 @@
+# learning/services/result_queue.py
+"""
+Optional write-behind persistence of exercise results (settings.RESULT_WRITE_BEHIND).
+
+The submit endpoints score synchronously but used to block the response on
+the result upsert and the progress update, two write transactions per
+answer that contend for the single SQLite writer lock under classroom load.
+With write-behind on, _save_user_result only queues a ResultUpdate and
+returns:
+
+- put() coalesces repeated submissions of the same (user, exercise) in
+  memory: best score, is_correct OR, attempts summed (the merge the
+  synchronous path applies row by row, so the stored result is the same).
+- A daemon worker thread takes everything queued every FLUSH_INTERVAL
+  seconds (or as soon as MAX_BATCH keys are pending) and writes it with
+  lesson_progress.save_results + apply_deltas: one transaction for the
+  results, one progress update per touched (user, lesson). A batch that
+  meets a busy database (OperationalError) is put back and retried on the
+  next flush; one that fails otherwise is retried update by update, and
+  updates that still fail are logged and dropped (journaled to
+  failed-<pid>.jsonl when a journal is set).
+- Durability (settings.RESULT_WRITE_BEHIND_JOURNAL = a directory): every
+  put() is appended to a per-process journal segment before it is queued
+  (fsync'ed with RESULT_WRITE_BEHIND_FSYNC). Segments are rotated when a
+  batch is taken and deleted once it is stored. Journals of processes that
+  died (their .lock is no longer flock'ed) are replayed at start, or with
+  the replay_result_journal command.
+- Replay is idempotent: a batch marks its segments applied
+  (AppliedResultSegment) in the transaction that stores it, and replay
+  skips marked segments, so a crash between that commit and the segment's
+  removal does not add its attempts again. Marks of removed segments are
+  dropped in the next batch's transaction.
+- The worker thread survives any error of a flush (journal I/O included):
+  it is logged and the next flush retries what was not stored.
+- Flush on shutdown: stop() is registered with atexit (normal exit,
+  Ctrl-C, gunicorn graceful worker exit); flush() writes everything queued
+  so far synchronously.
+
+Reads (dashboard, progress) lag by at most FLUSH_INTERVAL. The lesson batch
+submit (lesson_submit) stays synchronous: it returns the updated progress.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, transaction
+
+from ..models import AppliedResultSegment
+from .lesson_progress import ResultUpdate, apply_deltas, save_results
+
+try:
+    import fcntl
+except ImportError:       # Windows: no flock, journals are replayed only by replay_result_journal
+    fcntl = None
+
+FLUSH_INTERVAL = 0.5      # seconds between flushes
+MAX_BATCH = 500           # pending (user, exercise) keys that trigger an early flush
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "RESULT_WRITE_BEHIND", False))
+
+
+def _merge(older: ResultUpdate, newer: ResultUpdate) -> ResultUpdate:
+    return newer._replace(
+        score=max(older.score, newer.score),
+        is_correct=older.is_correct or newer.is_correct,
+        attempts=older.attempts + newer.attempts,
+    )
+
+
+def _mark(applied, forget):
+    if forget:
+        AppliedResultSegment.objects.filter(segment__in=list(forget)).delete()
+    if applied:
+        AppliedResultSegment.objects.bulk_create([AppliedResultSegment(segment=name) for name in applied])
+
+
+def store(updates, segments=(), forget=()) -> list:
+    """
+    Write updates now (one batch, falling back to one by one). Returns the
+    updates that failed. OperationalError (database locked or unreachable)
+    propagates: nothing is lost, the caller retries later.
+
+    segments: names of the journal segments the updates come from, marked
+    applied in the same transaction (so replaying them is a no-op); forget:
+    segments already removed, whose marks are dropped there too.
+    """
+    updates = list(updates)
+    if not updates:
+        return []
+    try:
+        with transaction.atomic():
+            apply_deltas(save_results(updates))
+            _mark(segments, forget)
+        return []
+    except OperationalError:
+        raise
+    except Exception:
+        logger.exception("Result batch of %d failed, retrying one by one", len(updates))
+    failed = []
+    with transaction.atomic():
+        for update in updates:
+            try:
+                with transaction.atomic():
+                    apply_deltas(save_results([update]))
+            except OperationalError:
+                raise
+            except Exception:
+                logger.exception("Result update failed: %s", update)
+                failed.append(update)
+        _mark(segments, forget)
+    return failed
+
+
+# ----- Journal -----
+
+def append_journal(path, updates):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(list(u)) + "\n" for u in updates)
+
+
+def read_journal(path):
+    updates = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                updates.append(ResultUpdate(*json.loads(line)))
+            except (ValueError, TypeError):
+                continue      # torn last line of a crashed process
+    return updates
+
+
+def segment_name(path) -> str:
+    return os.path.basename(path)[:-len(".jsonl")]
+
+
+def recover(journal_dir, skip_pid=None) -> int:
+    """
+    Replay and delete the journal segments of processes that are gone
+    (their lock file is not held). Segments marked applied are skipped.
+    Returns updates stored.
+    """
+    replayed = 0
+    for lock_path in sorted(glob.glob(os.path.join(journal_dir, "results-*.lock"))):
+        pid = lock_path.rsplit("-", 1)[1][:-len(".lock")]
+        if pid == str(skip_pid):
+            continue
+        with open(lock_path, "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue          # owner still running
+            segments = sorted(
+                glob.glob(os.path.join(journal_dir, f"results-{pid}-*.jsonl")),
+                key=lambda p: int(p.rsplit("-", 1)[1][:-len(".jsonl")]),
+            )
+            names = [segment_name(path) for path in segments]
+            applied = set(AppliedResultSegment.objects.filter(segment__in=names).values_list("segment", flat=True))
+            todo = [(path, name) for path, name in zip(segments, names) if name not in applied]
+            updates = [u for path, _name in todo for u in read_journal(path)]
+            failed = store(updates, [name for _path, name in todo])
+            if failed:
+                append_journal(os.path.join(journal_dir, f"failed-{pid}.jsonl"), failed)
+            replayed += len(updates) - len(failed)
+            for path in segments:
+                os.remove(path)
+            AppliedResultSegment.objects.filter(segment__startswith=f"results-{pid}-").delete()
+        os.remove(lock_path)
+    return replayed
+
+
+class ResultQueue:
+    def __init__(self, journal_dir=None, fsync=False, interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        self.journal_dir = journal_dir or None
+        self.fsync = fsync
+        self.interval = interval
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()   # one batch written at a time, in order
+        self._pending = {}                     # (user_id, kind, exercise_id) -> coalesced ResultUpdate
+        self._segments = []                    # closed journal segments of a batch put back for retry
+        self._removed = []                     # applied segments deleted since the last batch (marks to drop)
+        self._journal = None
+        self._lock_file = None
+        self._seq = 0
+        self._token = uuid.uuid4().hex[:12]   # segment names stay unique when a pid is reused
+        self._stopping = False
+        self._thread = None
+
+    # --- lifecycle ---
+
+    def start(self):
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._lock_file = open(os.path.join(self.journal_dir, f"results-{os.getpid()}.lock"), "a")
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            if fcntl is not None:
+                recover(self.journal_dir, skip_pid=os.getpid())
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="result-queue", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything queued and stop the worker (atexit hook)."""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for _ in range(3):
+            self.flush()
+            if not self._pending:
+                break
+            time.sleep(1.0)
+        if self._pending:
+            # Journal files (if any) stay behind for the next start / replay_result_journal
+            logger.error("Stopping with %d results not stored", len(self._pending))
+        if self._removed:
+            try:
+                AppliedResultSegment.objects.filter(segment__in=self._removed).delete()
+                self._removed = []
+            except DatabaseError:
+                logger.warning("Could not drop %d applied segment marks", len(self._removed), exc_info=True)
+        if self._journal is not None:
+            self._journal.close()
+            if not self._pending:
+                os.remove(self._journal.name)
+            self._journal = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            if not self._pending:
+                os.remove(self._lock_file.name)
+            self._lock_file = None
+
+    # --- queueing ---
+
+    def put(self, update: ResultUpdate):
+        if self._stopping:
+            # Shutting down (late request during atexit): write through
+            store([update])
+            return
+        with self._cond:
+            if self._journal is not None:
+                self._journal.write(json.dumps(list(update)) + "\n")
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            key = (update.user_id, update.kind, update.exercise_id)
+            older = self._pending.get(key)
+            self._pending[key] = update if older is None else _merge(older, update)
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Store everything queued so far in the calling thread. Returns updates written (0 if the DB was busy)."""
+        with self._flush_lock:
+            batch, segments = self._take()
+            return len(batch) if self._write(batch, segments) else 0
+
+    # --- internals ---
+
+    def _open_segment(self):
+        # The new segment is opened before the old one is let go: if that fails, put() keeps the old one
+        self._seq += 1
+        path = os.path.join(self.journal_dir, f"results-{os.getpid()}-{self._token}-{self._seq}.jsonl")
+        self._journal = open(path, "a", encoding="utf-8")
+
+    def _take(self):
+        with self._cond:
+            segments = []
+            if self._journal is not None and self._pending:
+                closing = self._journal
+                self._open_segment()
+                closing.close()
+                segments.append(closing.name)
+            batch, self._pending = self._pending, {}
+            segments, self._segments = self._segments + segments, []
+        return batch, segments
+
+    def _write(self, batch, segments):
+        forget = self._removed
+        try:
+            failed = store(batch.values(), [segment_name(p) for p in segments], forget) if batch else []
+        except OperationalError:
+            logger.warning("Database busy, %d results kept for the next flush", len(batch), exc_info=True)
+            with self._cond:
+                for key, update in batch.items():
+                    newer = self._pending.get(key)
+                    self._pending[key] = update if newer is None else _merge(update, newer)
+                self._segments = segments + self._segments
+            return False
+        except Exception:
+            # Not stored: the segments stay on disk, untracked, and are replayed once this process is gone
+            logger.exception("Result batch of %d not stored, left to the journal", len(batch))
+            return False
+        if batch:
+            self._removed = []
+        if failed and self.journal_dir:
+            # Kept apart for replay_result_journal --failed (their segments are marked applied)
+            try:
+                append_journal(os.path.join(self.journal_dir, f"failed-{os.getpid()}.jsonl"), failed)
+            except OSError:
+                logger.exception("Could not journal %d failed results", len(failed))
+        for path in segments:
+            try:
+                os.remove(path)
+                self._removed.append(segment_name(path))
+            except OSError:
+                logger.exception("Could not remove applied journal segment %s (a replay skips it)", path)
+        return True
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._stopping or len(self._pending) >= self.max_batch, timeout=self.interval
+                    )
+                    if self._stopping:
+                        return
+                try:
+                    with self._flush_lock:
+                        batch, segments = self._take()
+                        self._write(batch, segments)
+                except Exception:
+                    # A dead worker would leave put() buffering forever: log, the next flush retries
+                    logger.exception("Result queue flush failed")
+        finally:
+            connection.close()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ResultQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ResultQueue(
+                journal_dir=getattr(settings, "RESULT_WRITE_BEHIND_JOURNAL", "") or None,
+                fsync=bool(getattr(settings, "RESULT_WRITE_BEHIND_FSYNC", False)),
+            ).start()
+        return _queue
+
+
+def submit(update: ResultUpdate):
+    """Queue one result (write-behind mode)."""
+    get_queue().put(update)
@@ -0,0 +1,174 @@
+# learning/services/review_archive.py
+"""
+ReviewLog compaction: old review rows are rolled into one ReviewArchive per
+card, holding packed little-endian records
+
+    (seconds since the previous review: u4, rating: u1, interval_after: u2)
+
+i.e. 7 bytes per review instead of a full row. Times are kept to the second;
+the first delta is relative to ReviewArchive.first_at.
+
+- compact_chunk(): archives the reviews older than a cutoff for the next
+  `chunk_size` cards (by card id) in one short transaction and deletes exactly
+  the rows it packed (by id), so concurrent grades are never lost. Re-running
+  is harmless and continues where it stopped (archived rows are gone).
+- load_reviews(): live rows + archived records as one set of NumPy arrays
+  sorted by (card, time), so replay/analytics code does not care where a
+  review lives.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ReviewArchive, ReviewLog
+
+RECORD = np.dtype([("dt", "<u4"), ("rating", "u1"), ("interval", "<u2")])
+CHUNK_SIZE = 500          # cards per transaction
+DELETE_BATCH = 900        # ids per DELETE (SQLite variable limit)
+
+
+def pack(ts, rating, interval):
+    """Sorted epoch seconds + ratings + intervals -> (first_at, last_at, bytes)."""
+    secs = np.rint(np.asarray(ts, dtype=np.float64)).astype(np.int64)
+    records = np.empty(len(secs), dtype=RECORD)
+    records["dt"] = np.diff(secs, prepend=secs[0])
+    records["rating"] = rating
+    records["interval"] = np.minimum(np.asarray(interval), np.iinfo(np.uint16).max)
+    first = datetime.fromtimestamp(int(secs[0]), tz=dt_timezone.utc)
+    last = datetime.fromtimestamp(int(secs[-1]), tz=dt_timezone.utc)
+    return first, last, records.tobytes()
+
+
+def unpack(archive):
+    """ReviewArchive -> (epoch seconds, ratings, intervals) as arrays, oldest first."""
+    records = np.frombuffer(bytes(archive.data), dtype=RECORD)
+    ts = archive.first_at.timestamp() + np.cumsum(records["dt"], dtype=np.int64)
+    return ts.astype(np.float64), records["rating"].astype(np.int64), records["interval"].astype(np.int64)
+
+
+def _merge(archive, ts, rating, interval):
+    if archive is not None:
+        old_ts, old_rating, old_interval = unpack(archive)
+        ts = np.r_[old_ts, ts]
+        rating = np.r_[old_rating, rating]
+        interval = np.r_[old_interval, interval]
+        # Backdated batch grades may be older than what is already packed
+        order = np.argsort(ts, kind="stable")
+        ts, rating, interval = ts[order], rating[order], interval[order]
+    return (len(ts),) + pack(ts, rating, interval)
+
+
+def compact_chunk(cutoff, after_card_id: int = 0, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Archive reviews older than `cutoff` for the next chunk of cards after
+    after_card_id. Returns {"last_card_id" (None when done), "cards", "reviews"}.
+    """
+    card_ids = list(
+        ReviewLog.objects.filter(reviewed_at__lt=cutoff, card_id__gt=after_card_id)
+        .order_by("card_id").values_list("card_id", flat=True).distinct()[:chunk_size]
+    )
+    if not card_ids:
+        return {"last_card_id": None, "cards": 0, "reviews": 0}
+
+    with transaction.atomic():
+        rows = list(
+            ReviewLog.objects.filter(card_id__in=card_ids, reviewed_at__lt=cutoff)
+            .order_by("card_id", "reviewed_at", "id")
+            .values_list("id", "card_id", "user_id", "rating", "reviewed_at", "interval_after")
+        )
+        archives = ReviewArchive.objects.select_for_update().filter(card_id__in=card_ids).in_bulk(field_name="card_id")
+        by_card = {}
+        for row in rows:
+            by_card.setdefault(row[1], []).append(row)
+
+        to_create, to_update = [], []
+        now = timezone.now()
+        for card_id, card_rows in by_card.items():
+            _, _, user_ids, ratings, times, intervals = zip(*card_rows)
+            archive = archives.get(card_id)
+            count, first, last, data = _merge(
+                archive, [t.timestamp() for t in times], np.array(ratings), np.array(intervals)
+            )
+            if archive is None:
+                to_create.append(ReviewArchive(
+                    user_id=user_ids[0], card_id=card_id, count=count, first_at=first, last_at=last, data=data,
+                ))
+            else:
+                archive.count, archive.first_at, archive.last_at, archive.data = count, first, last, data
+                archive.updated_at = now          # auto_now does not fire in bulk_update
+                to_update.append(archive)
+        ReviewArchive.objects.bulk_create(to_create)
+        ReviewArchive.objects.bulk_update(to_update, ["count", "first_at", "last_at", "data", "updated_at"])
+        ids = [row[0] for row in rows]
+        for i in range(0, len(ids), DELETE_BATCH):
+            ReviewLog.objects.filter(id__in=ids[i:i + DELETE_BATCH]).delete()
+    return {"last_card_id": card_ids[-1], "cards": len(by_card), "reviews": len(rows)}
+
+
+def compact(cutoff, after_card_id: int = 0, chunk_size: int = CHUNK_SIZE):
+    """Yield compact_chunk() results until every card is done."""
+    while True:
+        stats = compact_chunk(cutoff, after_card_id, chunk_size)
+        if stats["last_card_id"] is None:
+            return
+        yield stats
+        after_card_id = stats["last_card_id"]
+
+
+def cutoff_for(days: int, now=None):
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def load_reviews(user_ids):
+    """
+    Every review of the given users, live and archived, as a dict of arrays
+    (user_id, card_id, deck_id, rating, interval, ts in epoch seconds) sorted
+    by (card_id, ts); archived records come first on equal times.
+    """
+    user_ids = list(user_ids)
+    cols = {k: [] for k in ("user_id", "card_id", "deck_id", "rating", "interval", "ts", "archived")}
+
+    archives = ReviewArchive.objects.filter(user_id__in=user_ids).select_related("card").only(
+        "user_id", "card_id", "card__deck_id", "first_at", "data"
+    )
+    for archive in archives:
+        ts, rating, interval = unpack(archive)
+        n = len(ts)
+        cols["user_id"].append(np.full(n, archive.user_id, dtype=np.int64))
+        cols["card_id"].append(np.full(n, archive.card_id, dtype=np.int64))
+        cols["deck_id"].append(np.full(n, archive.card.deck_id, dtype=np.int64))
+        cols["rating"].append(rating)
+        cols["interval"].append(interval)
+        cols["ts"].append(ts)
+        cols["archived"].append(np.ones(n, dtype=np.int64))
+
+    rows = list(
+        ReviewLog.objects.filter(user_id__in=user_ids).order_by("card_id", "reviewed_at", "id")
+        .values_list("user_id", "card_id", "card__deck_id", "rating", "interval_after", "reviewed_at")
+    )
+    if rows:
+        u, c, d, r, i, at = zip(*rows)
+        cols["user_id"].append(np.array(u, dtype=np.int64))
+        cols["card_id"].append(np.array(c, dtype=np.int64))
+        cols["deck_id"].append(np.array(d, dtype=np.int64))
+        cols["rating"].append(np.array(r, dtype=np.int64))
+        cols["interval"].append(np.array(i, dtype=np.int64))
+        cols["ts"].append(np.array([x.timestamp() for x in at], dtype=np.float64))
+        cols["archived"].append(np.zeros(len(rows), dtype=np.int64))
+
+    out = {
+        k: (np.concatenate(v) if v else np.array([], dtype=np.float64 if k == "ts" else np.int64))
+        for k, v in cols.items()
+    }
+    order = np.lexsort((-out.pop("archived"), out["ts"], out["card_id"]))
+    return {k: v[order] for k, v in out.items()}
+
+
+def user_ids_with_reviews():
+    """Sorted ids of users with live or archived reviews."""
+    live = set(ReviewLog.objects.values_list("user_id", flat=True).distinct())
+    archived = set(ReviewArchive.objects.values_list("user_id", flat=True).distinct())
+    return sorted(live | archived)
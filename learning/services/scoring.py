@@ -1,5 +1,119 @@
 # learning/services/scoring.py
-def levenshtein_ratio(s1: str, s2: str) -> float:
+"""
+Answer scoring.
+
+Answers are compared in normalize_answer() form: Unicode NFC, every
+apostrophe look-alike typed for the puso as ', lowercase, punctuation
+and symbols dropped, whitespace collapsed; with fold_nasal (settings.
+ANSWER_FOLD_NASAL) the nasal tilde of vowels and g is dropped too (ñ is
+kept). The exercise side is normalized once, at save time, and stored on
+the exercise (models: *_normalized fields); only the submission is
+normalized per request.
+
+Edit distance is Myers' bit-parallel algorithm (Hyyrö's Levenshtein
+variant): the pattern's columns are bits of a Python int, so one text
+character costs a few big-int operations instead of a row of the DP
+matrix. The ratio is computed exactly as the original matrix version did
+(lower().strip(), 100 * (1 - distance / longer length)); that version is
+kept as reference_ratio for the tests and the bench_scoring command.
+
+- levenshtein_ratio(s1, s2, score_cutoff): with a cutoff, gives up as soon
+  as the distance can no longer reach it and returns 0.0.
+- best_ratio(s, candidates): the highest ratio of one answer against many
+  accepted answers; the answer's bit masks are built once, candidates that
+  cannot beat the best so far (length difference) are skipped and the rest
+  are cut off at the best so far.
+- AnswerMatcher(answers): the accepted answers of one translation exercise
+  compiled once (answer_keys caches it per lesson version) into an exact
+  lookup, a segment index that finds every answer a submission could pass
+  against in lookups independent of the number of answers, and a bigram
+  index that bounds the rest when the submission passes none.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+PUSO = "'"
+# Apostrophe look-alikes keyboards and phones produce for the puso
+PUSO_VARIANTS = "\u2019\u2018\u02bc\u02bb\u0060\u00b4\u2032\ua78c\u02b9"
+NASAL_TILDE = "\u0303"
+NASAL_BASES = set("aeiouyg" + "AEIOUYG")
+_PUSO_TABLE = str.maketrans({c: PUSO for c in PUSO_VARIANTS})
+# Anything but letters, digits, whitespace, the puso and combining marks (g̃ has no precomposed form)
+_PUNCTUATION = re.compile(r"[^\w\s'\u0300-\u036f]+")
+
+
+def fold_nasals(text: str) -> str:
+    """Drop the nasal tilde of vowels and g (ã -> a, g̃ -> g); ñ stays."""
+    base, out = "", []
+    for c in unicodedata.normalize("NFD", text):
+        if c == NASAL_TILDE and base in NASAL_BASES:
+            continue
+        if not unicodedata.combining(c):
+            base = c
+        out.append(c)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def normalize_answer(text, fold_nasal: bool = False) -> str:
+    text = unicodedata.normalize("NFC", text or "").translate(_PUSO_TABLE)
+    if fold_nasal:
+        text = fold_nasals(text)
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def _pattern(s: str):
+    """Per-character bit masks of s (bit i set where s[i] == c)."""
+    peq = {}
+    for i, c in enumerate(s):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    return peq
+
+
+def _distance(peq, m: int, text: str, max_dist=None) -> int:
+    """
+    Levenshtein distance between the length-m pattern of peq and text. With
+    max_dist, returns max_dist + 1 as soon as the distance must exceed it.
+    """
+    n = len(text)
+    if m == 0:
+        return n
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    remaining = n
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        pv = ((mh << 1) | ~(xv | ph)) & mask
+        mv = ph & xv
+        remaining -= 1
+        if max_dist is not None and score - remaining > max_dist:
+            return max_dist + 1
+    return score
+
+
+def _max_dist(length: int, score_cutoff: float) -> int:
+    # Loose by one so float rounding never cuts a reachable score; the caller rechecks the exact ratio
+    return int(length * (1 - score_cutoff / 100.0)) + 1
+
+
+def _ratio(dist: int, length: int) -> float:
+    ratio = 100.0 * (1 - dist / length)
+    return max(0.0, min(100.0, ratio))
+
+
+def reference_ratio(s1: str, s2: str) -> float:
+    """The original full-matrix levenshtein_ratio: the reference for tests and bench_scoring."""
     if not s1 and not s2:
         return 100.0
     if not s1 or not s2:
@@ -7,13 +121,275 @@ def levenshtein_ratio(s1: str, s2: str) -> float:
     s1 = s1.lower().strip()
     s2 = s2.lower().strip()
     m, n = len(s1), len(s2)
-    dp = [[0]*(n+1) for _ in range(m+1)]
-    for i in range(m+1): dp[i][0] = i
-    for j in range(n+1): dp[0][j] = j
-    for i in range(1, m+1):
-        for j in range(1, n+1):
-            cost = 0 if s1[i-1] == s2[j-1] else 1
-            dp[i][j] = min(dp[i-1][j]+1, dp[i][j-1]+1, dp[i-1][j-1]+cost)
-    dist = dp[m][n]
-    ratio = 100.0 * (1 - dist / max(m, n))
-    return max(0.0, min(100.0, ratio))
\ No newline at end of file
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(m + 1):
+        dp[i][0] = i
+    for j in range(n + 1):
+        dp[0][j] = j
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            dp[i][j] = min(dp[i - 1][j] + 1, dp[i][j - 1] + 1, dp[i - 1][j - 1] + cost)
+    return _ratio(dp[m][n], max(m, n))
+
+
+def levenshtein_ratio(s1: str, s2: str, score_cutoff: float = None) -> float:
+    if not s1 and not s2:
+        return 100.0
+    if not s1 or not s2:
+        return 0.0
+    s1 = s1.lower().strip()
+    s2 = s2.lower().strip()
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1           # shorter one as the pattern: narrower masks
+    m, n = len(s1), len(s2)
+    max_dist = None
+    if score_cutoff:
+        if n - m > _max_dist(n, score_cutoff):
+            return 0.0
+        max_dist = _max_dist(n, score_cutoff)
+    ratio = _ratio(_distance(_pattern(s1), m, s2, max_dist), max(m, n))
+    return ratio if score_cutoff is None or ratio >= score_cutoff else 0.0
+
+
+def best_ratio(s: str, candidates) -> float:
+    """max(levenshtein_ratio(s, c) for c in candidates), 0.0 if there are none."""
+    if not s:
+        return max((100.0 if not c else 0.0 for c in candidates), default=0.0)
+    pattern = s.lower().strip()
+    peq, m = _pattern(pattern), len(pattern)
+    # Closest lengths first: likely the best match, which then cuts off the others
+    texts = sorted((c.lower().strip() for c in candidates if c), key=lambda t: abs(len(t) - m))
+    best = 0.0
+    for text in texts:
+        length = max(m, len(text))
+        if not length:
+            continue              # both blank after strip: undefined ratio, scorers match these exactly first
+        if _ratio(abs(len(text) - m), length) <= best:
+            continue              # the length difference alone already costs too much
+        max_dist = _max_dist(length, best) if best else None
+        best = max(best, _ratio(_distance(peq, m, text, max_dist), length))
+        if best == 100.0:
+            break
+    return best
+
+
+QGRAM = 2
+PASS_RATIO = 90.0          # the scorers' pass mark
+
+
+def _qgrams(s: str) -> frozenset:
+    """
+    Bigrams of s tagged with their occurrence number ("ab", 2nd "ab", ...),
+    so the size of a set intersection is the shared bigram multiset.
+    """
+    seen = {}
+    grams = []
+    for i in range(len(s) - QGRAM + 1):
+        g = s[i:i + QGRAM]
+        seen[g] = seen.get(g, 0) + 1
+        grams.append((g, seen[g]))
+    return frozenset(grams)
+
+
+def _pass_dist(length: int) -> int:
+    """
+    Most edits between an answer of `length` and a submission scoring at
+    least PASS_RATIO against it (a longer submission also stretches the
+    denominator: d <= 0.1 * (length + d)).
+    """
+    return int(length * (100.0 - PASS_RATIO) / PASS_RATIO + 1e-9)
+
+
+def _segments(length: int):
+    """(start, size) of the _pass_dist(length) + 1 near-equal pieces an answer of `length` is cut into."""
+    parts = _pass_dist(length) + 1
+    size, longer = divmod(length, parts)
+    start, out = 0, []
+    for i in range(parts):
+        n = size + (i >= parts - longer)
+        out.append((start, n))
+        start += n
+    return out
+
+
+class AnswerMatcher:
+    """
+    Accepted answers (normalize_answer forms) compiled into an exact set and
+    two indexes. best() gives the same score as best_ratio over the list:
+
+    - Segment index (pigeonhole): an answer is cut into _pass_dist + 1
+      pieces; a submission within that many edits leaves at least one piece
+      intact, shifted by at most as many characters. best() looks up the
+      submission's substrings at those places for every answer length that
+      can still pass, so the answers that could score PASS_RATIO or more are
+      found with a number of dict lookups set by the submission's length,
+      not by the number of answers. If one of them passes, no other answer
+      can beat it and best() stops there.
+    - Bigram index, for a submission no answer is close to (its exact
+      partial score): postings of the submission's occurrence-tagged bigrams
+      are counted in one pass; an answer sharing c of them is at least
+      ceil((max(bigram counts) - c) / QGRAM) edits away, and at least the
+      length difference, so answers are tried most shared first until that
+      bound loses. Answers sharing no bigram are looked at only if nothing
+      close was found (per length bucket, when the bound still allows it).
+      This pass reads postings in proportion to the number of answers.
+    """
+
+    def __init__(self, answers):
+        self.exact = set()
+        self._texts = []                     # answer index -> text
+        self._postings = {}                  # bigram -> [answer index]
+        self._by_length = {}                 # length -> [answer index]
+        self._pieces = {}                    # (length, piece number, piece) -> [answer index]
+        for a in answers or ():
+            if a in self.exact:
+                continue
+            self.exact.add(a)
+            if not a:
+                continue
+            i = len(self._texts)
+            self._texts.append(a)
+            self._by_length.setdefault(len(a), []).append(i)
+            for g in _qgrams(a):
+                self._postings.setdefault(g, []).append(i)
+            for k, (start, size) in enumerate(_segments(len(a))):
+                self._pieces.setdefault((len(a), k, a[start:start + size]), []).append(i)
+
+    def __len__(self):
+        return len(self.exact)
+
+    @staticmethod
+    def _upper(m, n_grams, length, shared) -> float:
+        """Best ratio an answer of `length` sharing at most `shared` bigrams can reach."""
+        most = max(n_grams, length - QGRAM + 1)
+        return _ratio(max(abs(length - m), -(-(most - shared) // QGRAM)), max(m, length))
+
+    def _passing(self, answer: str):
+        """Indexes of every answer that can score PASS_RATIO or more against `answer` (and a few more)."""
+        m = len(answer)
+        found = set()
+        for length in self._by_length:
+            limit = _pass_dist(length)
+            if abs(length - m) > limit:
+                continue
+            for k, (start, size) in enumerate(_segments(length)):
+                for at in range(max(0, start - limit), min(m - size, start + limit) + 1):
+                    found.update(self._pieces.get((length, k, answer[at:at + size]), ()))
+        return found
+
+    def best(self, answer: str):
+        """(score, accepted answer) closest to a normalized answer; (0.0, None) if none is close at all."""
+        if answer in self.exact:
+            return 100.0, answer
+        if not answer or not self._texts:
+            return 0.0, None
+        peq, m = _pattern(answer), len(answer)
+        best, match = 0.0, None
+
+        def distance_ratio(text):
+            longest = max(m, len(text))
+            return _ratio(_distance(peq, m, text, _max_dist(longest, best) if best else None), longest)
+
+        for i in sorted(self._passing(answer), key=lambda i: abs(len(self._texts[i]) - m)):
+            text = self._texts[i]
+            if _ratio(abs(len(text) - m), max(m, len(text))) <= best:
+                continue
+            ratio = distance_ratio(text)
+            if ratio > best:
+                best, match = ratio, text
+        if best >= PASS_RATIO:
+            return best, match               # any better answer would pass too, so it was a candidate
+
+        grams = _qgrams(answer)
+        n_grams = len(grams)
+        counts = Counter()
+        for g in grams:
+            counts.update(self._postings.get(g, ()))
+
+        def reachable(shared):
+            # Any length: d >= e edits and a longer side of at most m + d
+            e = -(-(n_grams - shared) // QGRAM)
+            return _ratio(e, m + e) > best
+
+        def score(i, shared):
+            nonlocal best, match
+            text = self._texts[i]
+            if self._upper(m, n_grams, len(text), shared) <= best:
+                return
+            ratio = distance_ratio(text)
+            if ratio > best:
+                best, match = ratio, text
+
+        last = None
+        for i, shared in counts.most_common():
+            if shared != last:
+                last = shared
+                if not reachable(shared):
+                    break
+            score(i, shared)
+
+        if reachable(0):
+            # Nothing close: answers without a shared bigram, in the length buckets that can still win
+            for n, indices in self._by_length.items():
+                if self._upper(m, n_grams, n, 0) > best:
+                    for i in indices:
+                        if i not in counts:
+                            score(i, 0)
+        return best, match
+
+
+# --- Exercise scorers (shared by the single-exercise endpoints and the lesson batch submit) ---
+# Each takes the answer key as plain data and returns (score, is_correct, extra response fields).
+
+def score_fillblank(correct_answer: str, answer: str, fold_nasal: bool = False):
+    """correct_answer: the stored normalized form."""
+    user_answer = normalize_answer(answer, fold_nasal)
+    score = 100.0 if user_answer == correct_answer else levenshtein_ratio(user_answer, correct_answer)
+    return score, score >= 90.0, {}
+
+
+def score_choice(correct_key: str, selected_key: str):
+    """Multiple choice and listening."""
+    is_correct = selected_key.strip().upper() == correct_key.strip().upper()
+    return (100.0 if is_correct else 0.0), is_correct, {}
+
+
+def matching_key(pairs) -> dict:
+    """{left: right} from normalized (left, right) pairs."""
+    return {left: right for left, right in pairs}
+
+
+def score_matching(correct_map: dict, submitted_pairs, fold_nasal: bool = False):
+    total = len(correct_map) or 1
+    correct_count = 0
+    for item in submitted_pairs:
+        left = normalize_answer(item.get("left"), fold_nasal)
+        right = normalize_answer(item.get("right"), fold_nasal)
+        if correct_map.get(left) == right:
+            correct_count += 1
+    score = (correct_count / total) * 100.0
+    return score, score >= 100.0, {"correct": correct_count, "total": total}
+
+
+def score_dragdrop(correct_tokens, order, fold_nasal: bool = False):
+    """correct_tokens: the stored normalized tokens."""
+    submitted = [normalize_answer(t, fold_nasal) for t in order]
+    correct = correct_tokens or []
+    total = max(1, len(correct))
+    correct_pos = sum(1 for i in range(min(len(submitted), len(correct))) if submitted[i] == correct[i])
+    score = (correct_pos / total) * 100.0
+    return score, score >= 95.0, {"correct_positions": correct_pos, "total": total}
+
+
+def score_translation(acceptable_answers, answer: str, fold_nasal: bool = False):
+    """acceptable_answers: the exercise's list, or an AnswerMatcher of its normalized forms."""
+    answer = normalize_answer(answer, fold_nasal)
+    if isinstance(acceptable_answers, AnswerMatcher):
+        best, _match = acceptable_answers.best(answer)
+        return best, best >= 90.0, {}
+    answers = [normalize_answer(a, fold_nasal) for a in (acceptable_answers or [])]
+    if any(answer == a for a in answers):
+        return 100.0, True, {}
+    best = best_ratio(answer, answers)
+    return best, best >= 90.0, {}
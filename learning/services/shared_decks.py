@@ -0,0 +1,128 @@
+# learning/services/shared_decks.py
+"""
+Shared (subscribable) SRS decks.
+
+Importing the standard glossary used to copy every pair into each learner's
+GlossaryEntry and Flashcard rows. A shared deck stores the content once:
+
+- SRSDeck(is_shared=True) owns SharedNote rows (text only); note_count is
+  kept on the deck.
+- subscribe() writes one SRSSubscription and one SRSUserState: O(1) whatever
+  the deck size.
+- A subscriber's Flashcard rows hold only scheduling state (text fields
+  empty, note set) and are created lazily by materialize(), a few new cards
+  at a time when a session needs them, in note id order. Everything
+  downstream (queue, counters, retrievability, grading, ReviewLog) works on
+  those rows unchanged.
+- Notes never materialized are the learner's "unseen" cards: deck.note_count
+  minus subscription.materialized (reported with the new-card count).
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Flashcard, SharedNote, SRSDeck, SRSDueDay, SRSSubscription, SRSUserState
+from . import srs_counters, srs_priors, srs_queue
+
+BATCH_SIZE = 500
+
+
+def publish(owner, name, rows, description: str = "", convert: bool = False) -> dict:
+    """
+    Create (or extend) the shared deck `name` of `owner` with (es, gn, notes)
+    rows. Pairs already in the deck are skipped. Returns {"deck", "created"}.
+
+    A personal (not shared) deck of the same name is only turned into a
+    public shared deck with convert=True; otherwise ValueError.
+    """
+    deck, _ = SRSDeck.objects.get_or_create(
+        user=owner, name=name, defaults={"description": description, "is_shared": True, "glossary_dirty": False},
+    )
+    if not deck.is_shared:
+        if not convert:
+            raise ValueError(
+                f"{owner} already has a personal deck named {name!r}; pick another name or convert it explicitly"
+            )
+        SRSDeck.objects.filter(pk=deck.pk).update(is_shared=True)
+        deck.is_shared = True
+    notes = {}
+    for es, gn, text in rows:
+        es, gn = es.strip(), gn.strip()
+        if es and gn:
+            notes.setdefault(Flashcard.make_content_key(es, gn), (es, gn, text or ""))
+    before = deck.note_count
+    with transaction.atomic():
+        SharedNote.objects.bulk_create(
+            [SharedNote(deck=deck, content_key=k, front_text_es=es, back_text_gn=gn, notes=text)
+             for k, (es, gn, text) in notes.items()],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        deck.note_count = SharedNote.objects.filter(deck=deck).count()
+        SRSDeck.objects.filter(pk=deck.pk).update(note_count=deck.note_count)
+    return {"deck": deck, "created": deck.note_count - before}
+
+
+def subscribe(user, deck):
+    """Follow a shared deck (two small writes, no per-card rows). Returns (subscription, created)."""
+    sub, created = SRSSubscription.objects.get_or_create(user=user, deck=deck)
+    SRSUserState.objects.get_or_create(user=user, deck=deck)
+    return sub, created
+
+
+def unsubscribe(user, deck) -> bool:
+    """Stop following a shared deck and drop the learner's cards and state for it."""
+    with transaction.atomic():
+        deleted, _ = SRSSubscription.objects.filter(user=user, deck=deck).delete()
+        SRSUserState.objects.filter(user=user, deck=deck).delete()
+        SRSDueDay.objects.filter(user=user, deck=deck).delete()
+        Flashcard.objects.filter(user=user, deck=deck).delete()
+    srs_queue.invalidate(user.id, deck.id)
+    return bool(deleted)
+
+
+def unseen_count(user_id, deck) -> int:
+    """Notes of a shared deck the learner has no card for yet."""
+    materialized = (
+        SRSSubscription.objects.filter(user_id=user_id, deck=deck).values_list("materialized", flat=True).first()
+    )
+    return max(0, deck.note_count - (materialized or 0))
+
+
+def materialize(user_id, deck, count: int, now=None) -> int:
+    """
+    Create the learner's cards for the next `count` unseen notes (seeded from
+    the item priors). The subscription cursor moves with a compare-and-set, so
+    a concurrent call creates nothing twice. Returns cards created.
+    """
+    sub = SRSSubscription.objects.filter(user_id=user_id, deck=deck).values_list("id", "note_cursor").first()
+    if sub is None or count <= 0:
+        return 0
+    sub_id, cursor = sub
+    notes = list(
+        SharedNote.objects.filter(deck=deck, id__gt=cursor).order_by("id")
+        .values_list("id", "front_text_es", "back_text_gn")[:count]
+    )
+    if not notes:
+        return 0
+
+    now = now or timezone.now()
+    priors = srs_priors.lookup(srs_priors.item_key(es, gn) for _, es, gn in notes)
+    cards = []
+    for note_id, es, gn in notes:
+        card = Flashcard(user_id=user_id, deck=deck, note_id=note_id, front_text_es="", due_at=now)
+        prior = priors.get(srs_priors.item_key(es, gn))
+        if prior:
+            card.ai_difficulty, card.half_life_days = prior
+        cards.append(card)
+
+    with transaction.atomic():
+        moved = SRSSubscription.objects.filter(pk=sub_id, note_cursor=cursor).update(
+            note_cursor=notes[-1][0], materialized=F("materialized") + len(cards),
+        )
+        if not moved:
+            return 0
+        Flashcard.objects.bulk_create(cards, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        srs_counters.record(user_id, deck.id, [(None, ("new",))] * len(cards))
+    srs_queue.invalidate(user_id, deck.id)
+    return len(cards)
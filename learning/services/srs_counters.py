@@ -0,0 +1,207 @@
+# learning/services/srs_counters.py
+"""
+Denormalized SRS counters on SRSUserState, so api_srs_state and the dashboard
+no longer run COUNT(*) over Flashcard: the new / review / suspended counts
+are one row, and the due count (due_count) sums the deck's SRSDueDay rows up
+to today, one indexed aggregate over a few rows per deck.
+
+Stored per (user, deck)
+- new_count:       non-suspended cards with repetitions == 0
+- review_count:    non-suspended cards with repetitions > 0
+- suspended_count: suspended cards
+- due histogram:   SRSDueDay rows, review cards per due_at date (UTC, the
+                   same day boundary as the daily reset and the SRS queue)
+- counters_synced_at: last full reconcile; NULL means "never counted", and
+                   such rows are reconciled on first read.
+
+Keeping it right
+- Every card is in exactly one bucket (Flashcard.counter_bucket). A write moves cards
+  between buckets; record() applies the net delta as F() increments: one
+  UPDATE of the state row (no read, no row lock taken up front) plus one
+  UPDATE per due day that moved. Concurrent grades of a deck never
+  read-modify-write the counters, so none of them is lost.
+- Single-card save() calls go through the Flashcard post_save/post_delete
+  signals (the bucket a card was loaded with is kept by Flashcard.from_db),
+  applied after commit (record_on_commit; a failure there flags the deck
+  for reconcile instead of failing the committed write). bulk_create/bulk_update callers
+  (glossary sync, batched grading, reschedule_deck) call record() themselves.
+- reconcile() recounts with two grouped queries and overwrites the row and
+  its SRSDueDay rows; the reconcile_srs_counters command runs it for every
+  deck to correct drift.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, timezone as dt_timezone
+from functools import partial
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from ..models import Flashcard, SRSDueDay, SRSUserState
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ["new_count", "review_count", "suspended_count", "updated_at"]
+
+
+def card_bucket(card) -> tuple:
+    return Flashcard.counter_bucket(card.repetitions, card.suspended, card.due_at)
+
+
+def diff(transitions) -> Counter:
+    """Net delta of (before, after) bucket pairs; None means the card did not exist."""
+    delta = Counter()
+    for before, after in transitions:
+        if before == after:
+            continue
+        if before is not None:
+            delta[before] -= 1
+        if after is not None:
+            delta[after] += 1
+    return delta
+
+
+def split(delta) -> tuple:
+    """Bucket delta -> ({counter field: n}, {"YYYY-MM-DD": n}), zero entries dropped."""
+    counts, days = Counter(), Counter()
+    for slot, n in delta.items():
+        if slot[0] == "review":
+            counts["review_count"] += n
+            days[slot[1]] += n
+        elif slot[0] == "new":
+            counts["new_count"] += n
+        else:
+            counts["suspended_count"] += n
+    return {k: n for k, n in counts.items() if n}, {k: n for k, n in days.items() if n}
+
+
+def _add_due(user_id, deck_id, day, n):
+    rows = SRSDueDay.objects.filter(user_id=user_id, deck_id=deck_id, day=day)
+    if rows.update(count=F("count") + n) or n < 0:
+        return        # a missing row on a decrement is drift, left to reconcile
+    try:
+        with transaction.atomic():
+            SRSDueDay.objects.create(user_id=user_id, deck_id=deck_id, day=day, count=n)
+    except IntegrityError:
+        rows.update(count=F("count") + n)        # created concurrently
+
+
+def record(user_id, deck_id, transitions):
+    """
+    Apply (before, after) bucket pairs to the (user, deck) counters. The same
+    UPDATE bumps the state's updated_at (the forecast version), even when no
+    card changed bucket.
+
+    No-op without transitions, when the state does not exist yet, or when it
+    was never counted (the first read reconciles it anyway).
+    """
+    transitions = list(transitions)
+    if not transitions:
+        return
+    counts, days = split(diff(transitions))
+    with transaction.atomic():
+        moved = SRSUserState.objects.filter(
+            user_id=user_id, deck_id=deck_id, counters_synced_at__isnull=False
+        ).update(
+            updated_at=timezone.now(),
+            **{name: Greatest(F(name) + n, Value(0)) for name, n in counts.items()},
+        )
+        if not moved:
+            return
+        for day, n in sorted(days.items()):
+            _add_due(user_id, deck_id, day, n)
+
+
+def _record_after_commit(user_id, deck_id, transitions):
+    try:
+        record(user_id, deck_id, transitions)
+    except DatabaseError:
+        logger.warning("SRS counters of user %s deck %s not updated, left to reconcile",
+                       user_id, deck_id, exc_info=True)
+        try:
+            # "Never counted": the next read reconciles the deck
+            SRSUserState.objects.filter(user_id=user_id, deck_id=deck_id).update(counters_synced_at=None)
+        except DatabaseError:
+            logger.warning("Could not flag user %s deck %s for reconcile", user_id, deck_id, exc_info=True)
+
+
+def record_on_commit(user_id, deck_id, transitions):
+    """
+    record() once the current transaction commits (right away outside one):
+    grade transactions never write the state row, so concurrent grades of a
+    deck do not queue on its lock, and a rolled-back write moves nothing.
+    The write it follows is committed by then, so a failure is logged and
+    the deck left to reconcile instead of failing the request.
+    """
+    transaction.on_commit(partial(_record_after_commit, user_id, deck_id, list(transitions)))
+
+
+def histogram(user_id, deck_id) -> dict:
+    """{"YYYY-MM-DD": n} of review cards per due day."""
+    rows = SRSDueDay.objects.filter(user_id=user_id, deck_id=deck_id, count__gt=0).values_list("day", "count")
+    return {day.isoformat(): n for day, n in rows}
+
+
+def count(user_id, deck_id) -> dict:
+    """Fresh counters from Flashcard (two grouped queries)."""
+    cards = Flashcard.objects.filter(user_id=user_id, deck_id=deck_id)
+    totals = cards.aggregate(
+        suspended_count=Count("id", filter=Q(suspended=True)),
+        new_count=Count("id", filter=Q(suspended=False, repetitions=0)),
+        review_count=Count("id", filter=Q(suspended=False, repetitions__gt=0)),
+    )
+    rows = (
+        cards.filter(suspended=False, repetitions__gt=0)
+        .annotate(day=TruncDate("due_at", tzinfo=dt_timezone.utc))
+        .values_list("day").annotate(n=Count("id")).order_by()
+    )
+    totals["due_histogram"] = {day.isoformat(): n for day, n in rows}
+    return totals
+
+
+def reconcile(state) -> bool:
+    """Recount `state` from Flashcard and save it. Returns True if it had drifted."""
+    fresh = count(state.user_id, state.deck_id)
+    days = fresh.pop("due_histogram")
+    drifted = state.counters_synced_at is not None and (
+        any(getattr(state, name) != value for name, value in fresh.items())
+        or histogram(state.user_id, state.deck_id) != days
+    )
+    for name, value in fresh.items():
+        setattr(state, name, value)
+    state.counters_synced_at = timezone.now()
+    with transaction.atomic():
+        state.save(update_fields=COUNTER_FIELDS + ["counters_synced_at"])
+        SRSDueDay.objects.filter(user_id=state.user_id, deck_id=state.deck_id).delete()
+        SRSDueDay.objects.bulk_create([
+            SRSDueDay(user_id=state.user_id, deck_id=state.deck_id, day=date.fromisoformat(day), count=n)
+            for day, n in days.items()
+        ])
+    return drifted
+
+
+def ensure(state):
+    """Reconcile a state that was never counted (new or pre-existing rows)."""
+    if state.counters_synced_at is None:
+        reconcile(state)
+    return state
+
+
+def due_count(state, now=None) -> int:
+    """Review cards due by the end of today (one indexed aggregate over SRSDueDay)."""
+    today = (now or timezone.now()).date()
+    return SRSDueDay.objects.filter(
+        user_id=state.user_id, deck_id=state.deck_id, day__lte=today, count__gt=0
+    ).aggregate(n=Sum("count"))["n"] or 0
+
+
+def reconcile_users(user_ids) -> dict:
+    """reconcile() every deck state of the given users (one shard)."""
+    decks = drifted = 0
+    for state in SRSUserState.objects.filter(user_id__in=list(user_ids)).order_by("id"):
+        drifted += reconcile(state)
+        decks += 1
+    return {"users": len(user_ids), "decks": decks, "drifted": drifted}
@@ -0,0 +1,94 @@
+# learning/services/srs_forecast.py
+"""
+Review workload forecast for one (user, deck).
+
+- Due counts come from the maintained due-date histogram (SRSDueDay rows,
+  services/srs_counters.py): no Flashcard query at all. Overdue cards are
+  folded into today.
+- Predicted retention for day k is the mean predicted recall of the deck's
+  review cards at now + k days if nothing is reviewed meanwhile, computed
+  from the cached retrievability index (one vectorized pass per request).
+- The result is cached per (user, deck) and tagged with SRSUserState.updated_at.
+  Every grade and every counter move bumps updated_at, so a grade
+  invalidates the forecast without any extra write. A request for fewer
+  days slices the cached one.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import srs_counters, srs_retrievability, srs_theta
+from .ai_srs_batch import sigmoid_batch
+
+CACHE_TTL = 10 * 60  # seconds; also bounds staleness after refit_srs (theta changes)
+MAX_DAYS = 365
+
+
+def _key(user_id, deck_id) -> str:
+    return f"srs:forecast:{user_id}:{deck_id}"
+
+
+def retention_curve(index, theta: float, days: int, now=None):
+    """Mean predicted recall over the index at now + k days, k = 0..days-1 (NaN if empty)."""
+    now = now or timezone.now()
+    if not len(index["ids"]):
+        return np.full(days, np.nan)
+    base = sigmoid_batch(theta - index["diff"], exact=False)
+    elapsed = np.maximum(0.0, now.timestamp() - index["last"]) / 86400.0
+    offsets = np.arange(days, dtype=np.float64)[:, None]
+    return (base * np.exp2(-(elapsed + offsets) / index["half_life"])).mean(axis=1)
+
+
+def build(state, days: int, now=None) -> dict:
+    now = now or timezone.now()
+    today = now.date()
+    histogram = srs_counters.histogram(state.user_id, state.deck_id)
+    last_day = (today + timedelta(days=days - 1)).isoformat()
+    counts = [0] * days
+    overdue = 0
+    for day, n in histogram.items():
+        if day > last_day:
+            continue
+        if day < today.isoformat():
+            overdue += n
+            counts[0] += n
+        else:
+            counts[(date.fromisoformat(day) - today).days] += n
+
+    srs_theta.refresh(state)  # checkpoint + grades not folded yet
+    index = srs_retrievability.get_index(state.user_id, state.deck_id)
+    curve = retention_curve(index, state.theta, days, now)
+    return {
+        "version": state.updated_at.isoformat(),
+        "day": today.isoformat(),
+        "overdue": overdue,
+        "review_cards": state.review_count,
+        "new_cards": state.new_count,
+        "days": [
+            {
+                "date": (today + timedelta(days=k)).isoformat(),
+                "due": counts[k],
+                "retention": None if np.isnan(curve[k]) else round(float(curve[k]), 4),
+            }
+            for k in range(days)
+        ],
+    }
+
+
+def forecast(state, days: int = 30, now=None) -> dict:
+    """Cached forecast for the next `days` days (1..MAX_DAYS) of one state's deck."""
+    now = now or timezone.now()
+    days = max(1, min(days, MAX_DAYS))
+    srs_counters.ensure(state)
+    key = _key(state.user_id, state.deck_id)
+    cached = cache.get(key)
+    if (cached is None or cached["version"] != state.updated_at.isoformat()
+            or cached["day"] != now.date().isoformat() or len(cached["days"]) < days):
+        cached = build(state, days, now)
+        cache.set(key, cached, CACHE_TTL)
+    result = dict(cached, days=cached["days"][:days])
+    del result["version"]
+    return result
@@ -0,0 +1,108 @@
+# learning/services/srs_grading.py
+"""
+Persisting SRS grades: the write path shared by the grade endpoints and the
+simulator (management command simulate_srs).
+
+- grade_review(): one review, one transaction (grade_and_schedule + ReviewLog);
+  caches and deck counters follow through the Flashcard post_save signal.
+- grade_reviews(): a batch of reviews of one user, applied sequentially in
+  memory and written in one transaction (bulk_update cards, theta events,
+  bulk_create ReviewLog), then the cached queue/index patched.
+
+The grade transactions never write SRSUserState: theta is appended as
+SRSThetaEvent rows (srs_theta.py), and the deck counters / updated_at
+(one F() UPDATE, srs_counters.record) and the theta fold run after commit.
+Concurrent grades of a deck therefore do not queue on the state row.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import Flashcard, ReviewLog, SRSUserState
+from . import srs_counters, srs_queue, srs_retrievability, srs_theta
+from .ai_srs import CARD_SCHEDULE_FIELDS, apply_grade, grade_and_schedule
+
+MAX_REVIEW_AGE = timedelta(hours=24)   # oldest client reviewed_at a batch may carry
+
+
+def grade_review(card, state, rating: int, now=None):
+    """Grade one card and log it. Returns (interval_days, half_life_days, p0)."""
+    interval_before = card.interval_days
+    with transaction.atomic():
+        # The card save also moves the deck counters (post_save -> srs_counters.record)
+        interval, half_life, p0 = grade_and_schedule(card, state, rating, now=now)
+        ReviewLog.objects.create(
+            user_id=card.user_id, card=card, rating=rating, reviewed_at=now or timezone.now(),
+            interval_before=interval_before, interval_after=interval,
+            ef_before=card.ease_factor, ef_after=card.ease_factor,
+        )
+    return interval, half_life, p0
+
+
+def grade_reviews(user_id, cards, reviews, now=None):
+    """
+    Grade `reviews` ([{card_id, rating, reviewed_at?}, ...] in grading order)
+    for cards = {id: Flashcard} of one user. Returns one result dict per review.
+
+    Client reviewed_at values are clamped to [floor, now], where the floor is
+    the latest of: now - MAX_REVIEW_AGE, the card's last logged review and
+    the previous review of the batch. A stale or reordered timestamp can
+    neither schedule a card before its last review nor run the batch
+    backwards in time.
+    """
+    now = now or timezone.now()
+    floor = now - MAX_REVIEW_AGE
+    last_reviewed = {}
+    if any(r.get("reviewed_at") for r in reviews):
+        last_reviewed = dict(
+            ReviewLog.objects.filter(card_id__in=list(cards)).values("card_id")
+            .annotate(last=Max("reviewed_at")).values_list("card_id", "last")
+        )
+    deck_ids = {c.deck_id for c in cards.values()}
+    states = {st.deck_id: st for st in SRSUserState.objects.filter(user_id=user_id, deck_id__in=deck_ids)}
+    for deck_id in deck_ids - set(states):
+        states[deck_id], _ = SRSUserState.objects.get_or_create(user_id=user_id, deck_id=deck_id)
+
+    pending = {deck_id: srs_theta.refresh(st) for deck_id, st in states.items()}
+    logs, results, events = [], [], {deck_id: [] for deck_id in states}
+    for r in reviews:
+        card = cards[r["card_id"]]
+        reviewed_at = min(max(r.get("reviewed_at") or now, floor, last_reviewed.get(card.id, floor)), now)
+        floor = reviewed_at
+        interval_before = card.interval_days
+        events[card.deck_id].append((r["rating"] >= 4, card.ai_difficulty))
+        interval, half_life, p0 = apply_grade(card, states[card.deck_id], r["rating"], now=reviewed_at)
+        card.updated_at = now  # bulk_update skips auto_now
+        logs.append(ReviewLog(
+            user_id=user_id, card=card, rating=r["rating"], reviewed_at=reviewed_at,
+            interval_before=interval_before, interval_after=interval,
+            ef_before=card.ease_factor, ef_after=card.ease_factor,
+        ))
+        results.append({
+            "card_id": card.id,
+            "next_due": card.due_at.isoformat(),
+            "interval_days": interval,
+            "half_life": round(half_life, 2),
+            "pred_mastery": round(p0, 2),
+        })
+
+    graded = [cards[cid] for cid in dict.fromkeys(r["card_id"] for r in reviews)]
+    with transaction.atomic():
+        Flashcard.objects.bulk_update(graded, CARD_SCHEDULE_FIELDS)
+        for deck_id, st in states.items():
+            srs_theta.record(st, events[deck_id])
+        ReviewLog.objects.bulk_create(logs)
+        # bulk_update skips post_save: move the deck counters here (after commit, like the signal)
+        for deck_id in states:
+            srs_counters.record_on_commit(user_id, deck_id, [
+                (c._srs_bucket, srs_counters.card_bucket(c)) for c in graded if c.deck_id == deck_id
+            ])
+    for deck_id, st in states.items():
+        if pending[deck_id] + len(events[deck_id]) >= srs_theta.FOLD_EVERY:
+            srs_theta.fold_on_commit(st.pk)
+    srs_queue.refresh_cards(graded)
+    srs_retrievability.refresh_cards(graded)
+    return results
@@ -0,0 +1,176 @@
+# learning/services/srs_priors.py
+"""
+Global item priors: starting ai_difficulty / half_life_days for new cards,
+learned from every learner's reviews of the same ES/GN pair.
+
+A new Flashcard used to start at d=0, h=1.5 even when thousands of learners
+had reviewed that pair, so the scheduler re-learned the item from scratch
+for each of them (and over-reviewed it meanwhile).
+
+Build (build_srs_priors command)
+- Reviews come from review_archive.load_reviews (live + archived), sharded by
+  user id. Each shard groups its reviews by item_key (normalized card text)
+  with np.unique + np.bincount and returns additive partial sums; the
+  command adds the shards up, so workers never share state.
+- Difficulty: d = mean learner theta - logit(smoothed success rate), i.e.
+  the item difficulty that makes sigmoid(theta - d) match what learners
+  achieved, shrunk towards 0 by n / (n + SHRINK).
+- Half-life: from first revisits (each learner's second review of the item):
+  recall = sigmoid(theta - d) * 2^(-dt / h)  =>  h = -mean dt / log2(rate / base),
+  with the rate shrunk towards what the default half-life would give.
+- Items seen by fewer than min_learners learners are not stored.
+
+Use
+- seed(cards) sets the prior on unsaved Flashcards in one indexed lookup;
+  glossary_sync.create_cards (sync_deck, import_glossary) calls it before
+  bulk_create. Cards without a prior keep the model defaults.
+"""
+
+import hashlib
+import math
+
+import numpy as np
+from django.db import transaction
+
+from ..models import Flashcard, SRSItemPrior, SRSUserState
+from .ai_srs import AISRSConfig, CFG
+from .review_archive import load_reviews
+
+DEFAULT_HALF_LIFE = 1.5   # Flashcard.half_life_days default
+SHRINK = 20.0             # pseudo-observations pulling towards the defaults
+MIN_LEARNERS = 3
+BATCH_SIZE = 500
+
+# Partial sums per item, in this order (all additive across shards)
+SUMS = ("reviews", "correct", "theta", "learners", "revisits", "revisit_correct", "revisit_days")
+
+
+def item_key(front_text_es: str, back_text_gn: str) -> str:
+    """Like Flashcard.make_content_key, but case- and whitespace-insensitive."""
+    es = " ".join((front_text_es or "").split()).casefold()
+    gn = " ".join((back_text_gn or "").split()).casefold()
+    return hashlib.sha1(f"{es}\x1f{gn}".encode("utf-8")).hexdigest()
+
+
+def aggregate_users(user_ids) -> dict:
+    """Partial sums {item_key: np.array(len(SUMS))} over the reviews of one shard of users."""
+    reviews = load_reviews(user_ids)
+    n = len(reviews["card_id"])
+    if not n:
+        return {}
+
+    card_ids, c_idx = np.unique(reviews["card_id"], return_inverse=True)
+    texts = dict(
+        # Cards of shared decks take their text from the note
+        (pk, item_key(note_es, note_gn) if note_id else item_key(es, gn))
+        for pk, es, gn, note_id, note_es, note_gn in
+        Flashcard.objects.filter(pk__in=card_ids.tolist()).values_list(
+            "id", "front_text_es", "back_text_gn", "note_id", "note__front_text_es", "note__back_text_gn"
+        )
+    )
+    card_keys = np.array([texts.get(cid, "") for cid in card_ids.tolist()], dtype=object)
+    item_keys, card_item = np.unique(card_keys, return_inverse=True)
+    i_idx = card_item[c_idx]
+
+    thetas = {
+        (u, d): theta for u, d, theta in
+        SRSUserState.objects.filter(user_id__in=list(user_ids)).values_list("user_id", "deck_id", "theta")
+    }
+    theta = np.array([
+        thetas.get((u, d), 0.0) for u, d in zip(reviews["user_id"].tolist(), reviews["deck_id"].tolist())
+    ])
+    y = (reviews["rating"] >= 4).astype(np.float64)
+
+    # Reviews are sorted by (card, time): rank within the card, and days since the previous one
+    first = np.r_[True, reviews["card_id"][1:] != reviews["card_id"][:-1]]
+    starts = np.flatnonzero(first)
+    rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    dt = np.zeros(n)
+    dt[~first] = np.diff(reviews["ts"])[~first[1:]] / 86400.0
+    revisit = (rank == 1) & (dt > 0)
+
+    n_items = len(item_keys)
+    sums = np.vstack([
+        np.bincount(i_idx, minlength=n_items),
+        np.bincount(i_idx, y, n_items),
+        np.bincount(i_idx, theta, n_items),
+        # one learner per card (cards belong to one user); a learner's duplicate
+        # cards of the same pair count twice, which is rare and harmless
+        np.bincount(card_item, minlength=n_items),
+        np.bincount(i_idx, revisit, n_items),
+        np.bincount(i_idx, y * revisit, n_items),
+        np.bincount(i_idx, dt * revisit, n_items),
+    ]).astype(np.float64)
+    return {key: sums[:, i] for i, key in enumerate(item_keys.tolist()) if key}
+
+
+def merge(total: dict, part: dict) -> dict:
+    for key, sums in part.items():
+        if key in total:
+            total[key] = total[key] + sums
+        else:
+            total[key] = sums
+    return total
+
+
+def estimate(sums, cfg: AISRSConfig = CFG):
+    """(ai_difficulty, half_life_days) from one item's partial sums."""
+    reviews, correct, theta_sum, _learners, revisits, revisit_correct, revisit_days = sums
+    mean_theta = theta_sum / reviews
+    rate = (correct + 1.0) / (reviews + 2.0)
+    d = (mean_theta - math.log(rate / (1.0 - rate))) * reviews / (reviews + SHRINK)
+
+    h = DEFAULT_HALF_LIFE
+    if revisits:
+        base = 1.0 / (1.0 + math.exp(-(mean_theta - d)))
+        mean_days = revisit_days / revisits
+        # Revisit success rate, with SHRINK pseudo-revisits at the default half-life
+        expected = base * 2.0 ** (-mean_days / DEFAULT_HALF_LIFE)
+        rate = (revisit_correct + SHRINK * expected) / (revisits + SHRINK)
+        # Revisits a few days apart cannot tell h = 30 from h = 300: cap at ~13.5x the gap
+        ratio = min(rate / base, 0.95)
+        h = min(cfg.max_half_life, max(cfg.min_half_life, mean_days / -math.log2(ratio)))
+    return d, h
+
+
+def write(totals: dict, min_learners: int = MIN_LEARNERS, cfg: AISRSConfig = CFG) -> int:
+    """Upsert priors for items with enough learners (chunked). Returns rows written."""
+    rows = []
+    for key, sums in totals.items():
+        if sums[3] < min_learners:
+            continue
+        d, h = estimate(sums, cfg)
+        rows.append(SRSItemPrior(
+            key=key, reviews=int(sums[0]), learners=int(sums[3]), ai_difficulty=d, half_life_days=h,
+        ))
+    with transaction.atomic():
+        for i in range(0, len(rows), BATCH_SIZE):
+            SRSItemPrior.objects.bulk_create(
+                rows[i:i + BATCH_SIZE], update_conflicts=True, unique_fields=["key"],
+                update_fields=["reviews", "learners", "ai_difficulty", "half_life_days", "updated_at"],
+            )
+    return len(rows)
+
+
+def lookup(keys) -> dict:
+    """{item_key: (ai_difficulty, half_life_days)} for the keys that have a prior."""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        found.update(
+            (key, (d, h)) for key, d, h in
+            SRSItemPrior.objects.filter(key__in=keys[i:i + BATCH_SIZE]).values_list("key", "ai_difficulty", "half_life_days")
+        )
+    return found
+
+
+def seed(cards) -> int:
+    """Set ai_difficulty / half_life_days of unsaved cards from their priors. Returns cards seeded."""
+    keys = [item_key(c.front_text_es, c.back_text_gn) for c in cards]
+    priors = lookup(keys)
+    seeded = 0
+    for card, key in zip(cards, keys):
+        if key in priors:
+            card.ai_difficulty, card.half_life_days = priors[key]
+            seeded += 1
+    return seeded
@@ -0,0 +1,175 @@
+# learning/services/srs_queue.py
+"""
+Materialized per-(user, deck) SRS queue kept in the Django cache.
+
+Layout of one cached queue
+- day:   the date the queue was built for (a new day forces a rebuild, which is
+         also when SRSUserState gets its daily reset)
+- until: timestamp horizon; "due" holds every review card due before it
+- due:   sorted [(due_ts, card_id), ...] for non-suspended cards with repetitions > 0
+- new:   card ids with repetitions == 0, ascending id = creation order
+         (at most NEW_PREFETCH)
+- new_more: True when the DB had more new cards than were prefetched
+
+session_card_ids() mirrors the old api_srs_next queries exactly (oldest due
+review, otherwise oldest new card) but answers from the cache. Cards only leave the
+queue when their scheduling changes (refresh_card), so "skip" still shows the
+same card, as before.
+
+Keeping it fresh
+- refresh_card(): called from the Flashcard post_save signal, i.e. whenever
+  grade_and_schedule writes a new due_at; refresh_cards() does the same for
+  bulk_update callers (batched grading), which bypass signals.
+- invalidate(): called when cards are bulk-created (glossary sync) or
+  bulk-rescheduled; the next read rebuilds.
+- Writers from several processes race on the same queue: the updates go
+  through versioned_cache.patch, so one that lost the race drops the queue
+  (rebuilt on the next read) instead of overwriting the other's change.
+- check_queue(): compares the cached queue with a fresh build off the
+  (user, deck, due_at) index; used by the srs_queue_check command.
+"""
+
+import bisect
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from ..models import Flashcard
+from . import versioned_cache
+
+CACHE_TTL = 60 * 60      # seconds; safety net, the queue is rebuilt at least hourly
+NEW_PREFETCH = 200       # new-card ids kept per queue
+
+
+def _key(user_id, deck_id) -> str:
+    return f"srs:queue:{user_id}:{deck_id}"
+
+
+def _end_of_day(now):
+    # Same day boundary as the SRSUserState daily reset (timezone.now().date())
+    return datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+
+
+def build_queue(user_id, deck_id, now=None) -> dict:
+    """Rebuild the queue from the database (two indexed queries) and cache it."""
+    now = now or timezone.now()
+    gen = versioned_cache.generation(_key(user_id, deck_id))
+    until = _end_of_day(now)
+    base = Flashcard.objects.filter(user_id=user_id, deck_id=deck_id, suspended=False)
+    due = [
+        (due_at.timestamp(), cid)
+        for due_at, cid in base.filter(repetitions__gt=0, due_at__lt=until)
+        .order_by("due_at", "id").values_list("due_at", "id")
+    ]
+    new = list(
+        base.filter(repetitions=0).order_by("id").values_list("id", flat=True)[:NEW_PREFETCH + 1]
+    )
+    queue = {
+        "day": now.date().isoformat(),
+        "until": until.timestamp(),
+        "due": due,
+        "new": new[:NEW_PREFETCH],
+        "new_more": len(new) > NEW_PREFETCH,
+    }
+    versioned_cache.store(_key(user_id, deck_id), queue, gen, CACHE_TTL)
+    return queue
+
+
+def get_queue(user_id, deck_id, now=None) -> dict:
+    """Cached queue, rebuilt on a miss or when the day rolled over."""
+    now = now or timezone.now()
+    queue = versioned_cache.get(_key(user_id, deck_id))
+    if queue is None or queue["day"] != now.date().isoformat() or now.timestamp() >= queue["until"]:
+        queue = build_queue(user_id, deck_id, now)
+    return queue
+
+
+def invalidate(user_id, deck_id):
+    versioned_cache.invalidate(_key(user_id, deck_id))
+
+
+def session_card_ids(user_id, deck_id, size: int, allowed_new: int, now=None, include_due: bool = True):
+    """
+    Return up to `size` (card_id, kind) pairs, kind being "review" or "new":
+    due reviews first (oldest due_at), then at most `allowed_new` new cards.
+    include_due=False returns new cards only (reviews ordered elsewhere).
+    """
+    now = now or timezone.now()
+    if size <= 0:
+        return []
+    queue = get_queue(user_id, deck_id, now)
+    ts = now.timestamp()
+    picked = []
+    if include_due:
+        picked = [(cid, "review") for due_ts, cid in queue["due"][:size] if due_ts <= ts]
+    n_new = min(size - len(picked), allowed_new)
+    if n_new > 0:
+        if len(queue["new"]) < n_new and queue["new_more"]:
+            queue = build_queue(user_id, deck_id, now)
+        picked.extend((cid, "new") for cid in queue["new"][:n_new])
+    return picked
+
+
+def _place(queue, card_id, repetitions, due_ts, suspended):
+    queue["due"] = [item for item in queue["due"] if item[1] != card_id]
+    idx = bisect.bisect_left(queue["new"], card_id)
+    if idx < len(queue["new"]) and queue["new"][idx] == card_id:
+        queue["new"].pop(idx)
+    if suspended:
+        return
+    if repetitions > 0:
+        if due_ts < queue["until"]:
+            bisect.insort(queue["due"], (due_ts, card_id))
+    elif not queue["new_more"] or (queue["new"] and card_id < queue["new"][-1]):
+        bisect.insort(queue["new"], card_id)
+
+
+def refresh_card(card):
+    """Move one card to its new slot after its scheduling fields changed."""
+    refresh_cards([card])
+
+
+def refresh_cards(cards):
+    """refresh_card() for many cards with one cache read/write per deck."""
+    by_deck = {}
+    for card in cards:
+        by_deck.setdefault((card.user_id, card.deck_id), []).append(card)
+    for (user_id, deck_id), deck_cards in by_deck.items():
+        def place(queue, deck_cards=deck_cards):
+            for card in deck_cards:
+                _place(queue, card.id, card.repetitions or 0, card.due_at.timestamp(), card.suspended)
+        versioned_cache.patch(_key(user_id, deck_id), place, CACHE_TTL)
+
+
+def remove_card(card):
+    versioned_cache.patch(
+        _key(card.user_id, card.deck_id), lambda queue: _place(queue, card.id, 0, 0.0, True), CACHE_TTL,
+    )
+
+
+def check_queue(user_id, deck_id, now=None, repair: bool = False) -> dict:
+    """
+    Compare the cached queue with what the (user, deck, due_at) index says.
+
+    Returns {"cached": bool, "missing_due", "stale_due", "missing_new", "stale_new"}
+    (id lists). With repair=True a mismatching queue is replaced by the fresh one.
+    """
+    key = _key(user_id, deck_id)
+    gen = versioned_cache.generation(key)
+    cached = versioned_cache.get(key)
+    report = {"cached": cached is not None, "missing_due": [], "stale_due": [], "missing_new": [], "stale_new": []}
+    if cached is None:
+        return report
+    fresh = build_queue(user_id, deck_id, now)  # note: overwrites the cache entry
+    fresh_due, cached_due = set(fresh["due"]), set(cached["due"])
+    report["missing_due"] = sorted(cid for _, cid in fresh_due - cached_due)
+    report["stale_due"] = sorted(cid for _, cid in cached_due - fresh_due)
+    # Only the prefetched window is comparable for new cards
+    window = min(len(fresh["new"]), len(cached["new"])) if (fresh["new_more"] or cached["new_more"]) else None
+    fresh_new = set(fresh["new"][:window])
+    cached_new = set(cached["new"][:window])
+    report["missing_new"] = sorted(fresh_new - cached_new)
+    report["stale_new"] = sorted(cached_new - fresh_new)
+    if not repair:
+        versioned_cache.store(key, cached, gen, CACHE_TTL)
+    return report
@@ -0,0 +1,132 @@
+# learning/services/srs_retrievability.py
+"""
+Retrievability-priority ordering for SRS reviews (SRSUserState.priority =
+"retrievability").
+
+Instead of the oldest due_at, serve the review card with the lowest predicted
+recall right now:
+
+    p = sigmoid(theta - d) * 2^(-elapsed / h)
+
+where elapsed is the time since the card's last review (due_at - interval_days)
+and h its half-life. A card counts as "due" once p drops below
+AISRSConfig.target_recall, which is the recall level the scheduler aims for.
+
+The per-deck index (ids, difficulty, last review, half-life as NumPy arrays) is
+cached; ranking is one vectorized pass plus argpartition, so it stays fast for
+decks of 10k+ cards. theta is applied at query time, so grades elsewhere in
+the deck need no rebuild; refresh_card() patches one slot after a grade
+(versioned_cache.patch, so concurrent graders cannot lose each other's patch).
+"""
+
+import numpy as np
+from django.utils import timezone
+
+from ..models import Flashcard
+from . import versioned_cache
+from .ai_srs import AISRSConfig, CFG
+from .ai_srs_batch import sigmoid_batch
+
+CACHE_TTL = 60 * 60
+
+
+def _key(user_id, deck_id) -> str:
+    return f"srs:retr:{user_id}:{deck_id}"
+
+
+def build_index(user_id, deck_id) -> dict:
+    gen = versioned_cache.generation(_key(user_id, deck_id))
+    rows = list(
+        Flashcard.objects.filter(user_id=user_id, deck_id=deck_id, suspended=False, repetitions__gt=0)
+        .order_by("id").values_list("id", "ai_difficulty", "half_life_days", "interval_days", "due_at")
+    )
+    if rows:
+        ids, diff, h, interval, due = zip(*rows)
+        last = [d.timestamp() - i * 86400.0 for d, i in zip(due, interval)]
+    else:
+        ids, diff, h, last = (), (), (), ()
+    index = {
+        "ids": np.array(ids, dtype=np.int64),
+        "diff": np.array(diff, dtype=np.float64),
+        "half_life": np.maximum(np.array(h, dtype=np.float64), CFG.min_half_life),
+        "last": np.array(last, dtype=np.float64),
+    }
+    versioned_cache.store(_key(user_id, deck_id), index, gen, CACHE_TTL)
+    return index
+
+
+def get_index(user_id, deck_id) -> dict:
+    index = versioned_cache.get(_key(user_id, deck_id))
+    if index is None:
+        index = build_index(user_id, deck_id)
+    return index
+
+
+def invalidate(user_id, deck_id):
+    versioned_cache.invalidate(_key(user_id, deck_id))
+
+
+def predicted_recall(index: dict, theta: float, now=None):
+    now = now or timezone.now()
+    elapsed_days = np.maximum(0.0, now.timestamp() - index["last"]) / 86400.0
+    return sigmoid_batch(theta - index["diff"], exact=False) * np.exp2(-elapsed_days / index["half_life"])
+
+
+def lowest(user_id, deck_id, theta: float, k: int = 1, now=None, cfg: AISRSConfig = CFG):
+    """
+    Up to k (card_id, p) pairs with the lowest predicted recall, lowest first,
+    restricted to cards whose p is already below cfg.target_recall.
+    """
+    index = get_index(user_id, deck_id)
+    if not len(index["ids"]):
+        return []
+    p = predicted_recall(index, theta, now)
+    below = np.flatnonzero(p < cfg.target_recall)
+    if not below.size:
+        return []
+    if below.size > k:
+        below = below[np.argpartition(p[below], k - 1)[:k]]
+    below = below[np.argsort(p[below], kind="stable")]
+    return [(int(index["ids"][i]), float(p[i])) for i in below]
+
+
+def _patch(index, card_id, diff, half_life, last, keep: bool):
+    ids = index["ids"]
+    pos = int(np.searchsorted(ids, card_id))
+    present = pos < len(ids) and ids[pos] == card_id
+    if present and keep:
+        index["diff"][pos] = diff
+        index["half_life"][pos] = max(half_life, CFG.min_half_life)
+        index["last"][pos] = last
+    elif present:
+        for name in ("ids", "diff", "half_life", "last"):
+            index[name] = np.delete(index[name], pos)
+    elif keep:
+        index["ids"] = np.insert(ids, pos, card_id)
+        index["diff"] = np.insert(index["diff"], pos, diff)
+        index["half_life"] = np.insert(index["half_life"], pos, max(half_life, CFG.min_half_life))
+        index["last"] = np.insert(index["last"], pos, last)
+
+
+def refresh_cards(cards):
+    """Patch the cached index after cards were graded/suspended (one cache round trip per deck)."""
+    by_deck = {}
+    for card in cards:
+        by_deck.setdefault((card.user_id, card.deck_id), []).append(card)
+    for (user_id, deck_id), deck_cards in by_deck.items():
+        def patch(index, deck_cards=deck_cards):
+            for card in deck_cards:
+                keep = not card.suspended and (card.repetitions or 0) > 0
+                last = card.due_at.timestamp() - card.interval_days * 86400.0
+                _patch(index, card.id, card.ai_difficulty, card.half_life_days, last, keep)
+        versioned_cache.patch(_key(user_id, deck_id), patch, CACHE_TTL)
+
+
+def refresh_card(card):
+    refresh_cards([card])
+
+
+def remove_card(card):
+    versioned_cache.patch(
+        _key(card.user_id, card.deck_id), lambda index: _patch(index, card.id, 0.0, 0.0, 0.0, keep=False), CACHE_TTL,
+    )
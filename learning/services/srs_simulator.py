@@ -0,0 +1,354 @@
+# learning/services/srs_simulator.py
+"""
+Synthetic-learner simulator for the AI-SRS scheduler (command simulate_srs).
+
+Ground truth
+- Every learner has a true ability and memory scale, every card a true
+  difficulty, and every (learner, card) a true half-life:
+      p(recall) = sigmoid(ability - difficulty + 1) * 2^(-elapsed / h_true)
+  (first exposure: half the base probability). A recall multiplies h_true by
+  2.2, a miss multiplies it by 0.6. The scheduler never sees these values; it
+  only gets the ratings (5/4 when recalled, 2/1 when not).
+
+Each simulated day at 09:00 a learner studies a session like api_srs_session:
+every due review (oldest due first), then up to new_per_day cards with
+repetitions == 0 (lapsed cards re-enter that pool, as in the app).
+
+Engines
+- memory: no database. "scalar" runs ai_srs.apply_grade per review on small
+  in-memory objects; "batch" runs ai_srs_batch.grade_and_schedule_batch across
+  all learners at once, one review rank at a time so theta carries over
+  exactly as in the sequential path (np.exp, i.e. exact=False).
+- db: real rows in a throwaway test database, destroyed at the end (with
+  keep=True: the configured database, and the rows stay). Grades commit as
+  in the views (autocommit, grade_review / grade_reviews own their
+  transactions), so their after-commit work (counter deltas, theta folds)
+  runs and is counted. "scalar" mimics api_srs_grade per review (card
+  fetch, state fetch, srs_grading.grade_review); "batch" mimics
+  api_srs_grade_batch (srs_grading.grade_reviews once per learner and day).
+  Sessions are picked through the cached srs_queue in both.
+
+Reported: reviews/sec of the study loop (setup excluded), DB statements per
+review (savepoints excluded, after-commit work included), and the achieved recall of scheduled reviews
+(cards with repetitions > 0) against AISRSConfig.target_recall.
+"""
+
+import math
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from ..models import Flashcard, SRSDeck, SRSUserState
+from . import srs_queue, srs_retrievability
+from .ai_srs import AISRSConfig, CFG, apply_grade
+from .ai_srs_batch import grade_and_schedule_batch
+from .srs_grading import grade_review, grade_reviews
+
+User = get_user_model()
+
+START = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+STUDY_HOUR = 9 / 24          # sessions happen at 09:00 of each simulated day
+DEFAULT_HALF_LIFE = 1.5      # Flashcard.half_life_days default
+BULK_SIZE = 5000
+
+
+@dataclass
+class SimConfig:
+    learners: int = 1000
+    cards: int = 2000
+    days: int = 30
+    new_per_day: int = 10
+    seed: int = 0
+
+
+@dataclass
+class SimStats:
+    engine: str
+    path: str
+    reviews: int = 0
+    scheduled: int = 0        # reviews of cards with repetitions > 0
+    recalled: int = 0         # scheduled reviews that were recalled
+    true_p_sum: float = 0.0   # ground-truth recall probability, summed over scheduled reviews
+    statements: int = 0
+    seconds: float = 0.0
+    setup_seconds: float = 0.0
+    target_recall: float = CFG.target_recall
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def reviews_per_sec(self) -> float:
+        return self.reviews / self.seconds if self.seconds else 0.0
+
+    @property
+    def statements_per_review(self) -> float:
+        return self.statements / self.reviews if self.reviews else 0.0
+
+    @property
+    def achieved_recall(self) -> float:
+        return self.recalled / self.scheduled if self.scheduled else float("nan")
+
+    @property
+    def mean_true_recall(self) -> float:
+        return self.true_p_sum / self.scheduled if self.scheduled else float("nan")
+
+
+class Truth:
+    """Ground-truth forgetting model over learners x cards (flat index l * cards + c)."""
+
+    def __init__(self, cfg: SimConfig, rng):
+        self.cards = cfg.cards
+        self.rng = rng
+        self.ability = rng.normal(0.0, 1.0, cfg.learners)
+        self.difficulty = rng.normal(0.0, 1.0, cfg.cards)
+        memory = rng.lognormal(0.0, 0.4, cfg.learners)
+        self.half_life = np.repeat(memory, cfg.cards)
+        self.last = np.full(cfg.learners * cfg.cards, np.nan)
+
+    def review(self, flat, t_days):
+        """Sample recalls for the given (learner, card) slots at time t_days; returns (ratings, p)."""
+        flat = np.asarray(flat, dtype=np.int64)
+        learner, card = np.divmod(flat, self.cards)
+        base = 1.0 / (1.0 + np.exp(-(self.ability[learner] - self.difficulty[card] + 1.0)))
+        elapsed = t_days - self.last[flat]
+        p = np.where(np.isnan(elapsed), 0.5 * base, base * np.exp2(-np.nan_to_num(elapsed) / self.half_life[flat]))
+        recalled = self.rng.random(flat.size) < p
+        ratings = np.where(recalled, np.where(p > 0.9, 5, 4), np.where(p > 0.3, 2, 1))
+        self.half_life[flat] = np.where(recalled, self.half_life[flat] * 2.2, np.maximum(0.2, self.half_life[flat] * 0.6))
+        self.last[flat] = t_days
+        return ratings, p
+
+
+def _record(stats, ratings, p, scheduled):
+    stats.reviews += len(ratings)
+    stats.scheduled += int(scheduled.sum())
+    stats.recalled += int((ratings[scheduled] >= 4).sum())
+    stats.true_p_sum += float(p[scheduled].sum())
+
+
+def _session_order(due2, reps2, t, new_per_day):
+    """(flat indices, learner of each) for one day: due reviews by due time, then new cards by id."""
+    n_cards = due2.shape[1]
+    review = (reps2 > 0) & (due2 <= t)
+    pool = reps2 == 0
+    new = pool & (np.cumsum(pool, axis=1) <= new_per_day)
+    rl, rc = np.nonzero(review)
+    nl, nc = np.nonzero(new)
+    learner = np.r_[rl, nl]
+    card = np.r_[rc, nc]
+    group = np.r_[np.zeros(rl.size), np.ones(nl.size)]
+    key = np.r_[due2[rl, rc], nc.astype(np.float64)]
+    order = np.lexsort((card, key, group, learner))
+    return learner[order] * n_cards + card[order], learner[order]
+
+
+class _Card:
+    __slots__ = ("ai_difficulty", "half_life_days", "interval_days", "due_at", "repetitions", "lapses")
+
+
+class _State:
+    __slots__ = ("theta",)
+
+
+def run_memory(cfg: SimConfig, path: str = "batch", srs_cfg: AISRSConfig = CFG) -> SimStats:
+    """Pure in-memory run (no database); path is "scalar" or "batch"."""
+    rng = np.random.default_rng(cfg.seed)
+    truth = Truth(cfg, rng)
+    n = cfg.learners * cfg.cards
+    theta = np.zeros(cfg.learners)
+    diff = np.zeros(n)
+    half_life = np.full(n, DEFAULT_HALF_LIFE)
+    due = np.zeros(n)            # days since START
+    reps = np.zeros(n, dtype=np.int64)
+    stats = SimStats("memory", path, target_recall=srs_cfg.target_recall)
+
+    started = time.perf_counter()
+    for day in range(cfg.days):
+        t = day + STUDY_HOUR
+        flat, learner = _session_order(
+            due.reshape(cfg.learners, cfg.cards), reps.reshape(cfg.learners, cfg.cards), t, cfg.new_per_day
+        )
+        if not flat.size:
+            continue
+        scheduled = reps[flat] > 0
+        ratings, p = truth.review(flat, t)
+        _record(stats, ratings, p, scheduled)
+
+        if path == "scalar":
+            now = START + timedelta(days=t)
+            state = _State()
+            for i, (f, l, rating) in enumerate(zip(flat.tolist(), learner.tolist(), ratings.tolist())):
+                if i == 0 or learner[i - 1] != l:
+                    state.theta = theta[l]
+                card = _Card()
+                card.ai_difficulty, card.half_life_days = diff[f], half_life[f]
+                card.interval_days, card.due_at, card.repetitions, card.lapses = 0, now, int(reps[f]), 0
+                apply_grade(card, state, rating, now=now, cfg=srs_cfg)
+                theta[l] = state.theta
+                diff[f], half_life[f], reps[f] = card.ai_difficulty, card.half_life_days, card.repetitions
+                due[f] = t + card.interval_days
+        else:
+            # k-th review of every learner at once; a learner appears once per rank
+            starts = np.r_[0, np.flatnonzero(np.diff(learner)) + 1]
+            rank = np.arange(flat.size) - np.repeat(starts, np.diff(np.r_[starts, flat.size]))
+            for k in range(int(rank.max()) + 1):
+                sel = np.flatnonzero(rank == k)
+                f, l = flat[sel], learner[sel]
+                g = grade_and_schedule_batch(theta[l], diff[f], half_life[f], ratings[sel], srs_cfg, exact=False)
+                theta[l] = g.theta
+                diff[f], half_life[f] = g.difficulty, g.half_life
+                reps[f] = np.where(g.correct, reps[f] + 1, 0)
+                due[f] = t + g.interval
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+class _StatementCounter:
+    """connection.execute_wrapper that counts statements (savepoints excluded)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(("SAVEPOINT", "RELEASE", "ROLLBACK TO")):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _insert_cards(user_ids, deck_ids, n_cards):
+    """
+    Insert n_cards fresh cards per deck with executemany: building millions of
+    model instances for bulk_create takes minutes. Column values come from a
+    prototype Flashcard, so defaults and DB conversions stay the ORM's.
+    """
+    fields = [f for f in Flashcard._meta.concrete_fields if not f.primary_key]
+    proto = Flashcard(due_at=START, created_at=START, updated_at=START)
+    values = [f.get_db_prep_save(getattr(proto, f.attname), connection) for f in fields]
+    names = [f.attname for f in fields]
+    slots = {name: names.index(name) for name in ("user_id", "deck_id", "front_text_es", "back_text_gn")}
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(Flashcard._meta.db_table),
+        ", ".join(connection.ops.quote_name(f.column) for f in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        for uid, did in zip(user_ids, deck_ids):
+            rows = []
+            for c in range(n_cards):
+                row = list(values)
+                row[slots["user_id"]], row[slots["deck_id"]] = uid, did
+                row[slots["front_text_es"]], row[slots["back_text_gn"]] = f"es {c}", f"gn {c}"
+                rows.append(row)
+            cursor.executemany(sql, rows)
+
+
+def _setup_db(cfg: SimConfig, tag: str):
+    """Create learners, decks, states and cards; returns (user_ids, deck_ids, card ids as (L, C))."""
+    users = User.objects.bulk_create(
+        [User(username=f"srs_sim_{tag}_{i}", password="!") for i in range(cfg.learners)], batch_size=BULK_SIZE
+    )
+    user_ids = [u.pk for u in users] if users and users[0].pk else list(
+        User.objects.filter(username__startswith=f"srs_sim_{tag}_").order_by("id").values_list("id", flat=True)
+    )
+    decks = SRSDeck.objects.bulk_create(
+        [SRSDeck(user_id=uid, name="Mi Glosario", glossary_dirty=False, glossary_synced_at=START) for uid in user_ids],
+        batch_size=BULK_SIZE,
+    )
+    deck_ids = [d.pk for d in decks] if decks and decks[0].pk else list(
+        SRSDeck.objects.filter(user_id__in=user_ids).order_by("user_id").values_list("id", flat=True)
+    )
+    SRSUserState.objects.bulk_create([
+        SRSUserState(user_id=uid, deck_id=did, new_count=cfg.cards, counters_synced_at=START)
+        for uid, did in zip(user_ids, deck_ids)
+    ], batch_size=BULK_SIZE)
+    _insert_cards(user_ids, deck_ids, cfg.cards)
+    ids = np.array(
+        Flashcard.objects.filter(deck_id__in=deck_ids).order_by("deck_id", "id").values_list("id", flat=True),
+        dtype=np.int64,
+    ).reshape(cfg.learners, cfg.cards)
+    return user_ids, deck_ids, ids
+
+
+@contextmanager
+def _database(keep: bool):
+    """A throwaway test database for the run (migrated, destroyed afterwards); the configured one with keep."""
+    if keep:
+        yield
+        return
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run_db(cfg: SimConfig, path: str = "batch", keep: bool = False) -> SimStats:
+    """Run against a throwaway database (the configured one, rows kept, with keep=True)."""
+    rng = np.random.default_rng(cfg.seed)
+    truth = Truth(cfg, rng)
+    stats = SimStats("db", path)
+    counter = _StatementCounter()
+    tag = uuid.uuid4().hex[:8]
+
+    with _database(keep):
+        started = time.perf_counter()
+        with transaction.atomic():
+            user_ids, deck_ids, ids = _setup_db(cfg, tag)
+        stats.setup_seconds = time.perf_counter() - started
+        try:
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                for day in range(cfg.days):
+                    t = day + STUDY_HOUR
+                    now = START + timedelta(days=t)
+                    for l, (user_id, deck_id) in enumerate(zip(user_ids, deck_ids)):
+                        picked = srs_queue.session_card_ids(user_id, deck_id, cfg.cards, cfg.new_per_day, now)
+                        if not picked:
+                            continue
+                        card_ids = [cid for cid, _kind in picked]
+                        flat = l * cfg.cards + np.searchsorted(ids[l], card_ids)
+                        scheduled = np.array([kind == "review" for _cid, kind in picked])
+                        ratings, p = truth.review(flat, t)
+                        _record(stats, ratings, p, scheduled)
+                        if path == "scalar":
+                            for cid, rating in zip(card_ids, ratings.tolist()):
+                                card = Flashcard.objects.get(pk=cid, user_id=user_id)
+                                state = SRSUserState.objects.get(user_id=user_id, deck_id=deck_id)
+                                grade_review(card, state, rating, now=now)
+                        else:
+                            cards = Flashcard.objects.filter(user_id=user_id, pk__in=card_ids).in_bulk()
+                            grade_reviews(user_id, cards, [
+                                {"card_id": cid, "rating": rating} for cid, rating in zip(card_ids, ratings.tolist())
+                            ], now)
+            stats.seconds = time.perf_counter() - started
+            stats.statements = counter.count
+        finally:
+            for user_id, deck_id in zip(user_ids, deck_ids):
+                srs_queue.invalidate(user_id, deck_id)
+                srs_retrievability.invalidate(user_id, deck_id)
+    stats.extra["tag"] = tag
+    return stats
+
+
+def run(cfg: SimConfig, engine: str = "memory", path: str = "batch", keep: bool = False) -> SimStats:
+    if engine == "memory":
+        return run_memory(cfg, path)
+    return run_db(cfg, path, keep=keep)
+
+
+def format_stats(stats: SimStats) -> str:
+    recall = stats.achieved_recall
+    gap = "" if math.isnan(recall) else f" ({recall - stats.target_recall:+.3f} vs target)"
+    return (
+        f"{stats.engine}/{stats.path}: {stats.reviews} reviews in {stats.seconds:.2f}s "
+        f"= {stats.reviews_per_sec:,.0f} reviews/s; "
+        f"{stats.statements_per_review:.2f} statements/review; "
+        f"achieved recall {recall:.3f}{gap}, mean true p {stats.mean_true_recall:.3f}, "
+        f"target {stats.target_recall:.2f}; scheduled reviews {stats.scheduled}"
+        + (f"; setup {stats.setup_seconds:.1f}s" if stats.setup_seconds else "")
+    )
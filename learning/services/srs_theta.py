@@ -0,0 +1,127 @@
+# learning/services/srs_theta.py
+"""
+Contention-free learner ability (theta) updates.
+
+grade_and_schedule used to read SRSUserState.theta, step it and save it, so
+two tabs grading the same deck overwrote each other's update. Locking the row
+would serialize every grade of a learner. Instead:
+
+- A grade appends an SRSThetaEvent (was it correct, the card difficulty it
+  was graded against): a plain INSERT, nothing to conflict on.
+- SRSUserState.theta is a checkpoint: theta folded over every event up to
+  theta_event_id. The current theta is the checkpoint plus the pending events
+  replayed in id order with the same logistic step as ai_srs.apply_grade.
+- fold() reads the pending events and writes a new checkpoint with a
+  compare-and-set on theta_event_id (no row lock) in one transaction, and
+  deletes exactly the events it replayed. If another fold won, nothing is
+  lost: the events are still there.
+- Pending means "not deleted yet", not "id above the checkpoint": on
+  databases that hand out ids before commit (PostgreSQL, MySQL) an event
+  may commit after one with a higher id has been folded; it is simply
+  replayed by the next fold.
+
+So every grade moves the stored theta exactly once, however many requests
+ran in parallel. A fold that fails after a grade committed (fold_on_commit)
+is logged and the events wait for the next one.
+"""
+
+import logging
+from functools import partial
+
+from django.db import DatabaseError, transaction
+from django.db.models import Max
+
+from ..models import SRSThetaEvent, SRSUserState
+from .ai_srs import AISRSConfig, CFG, _sigmoid
+
+logger = logging.getLogger(__name__)
+
+FOLD_EVERY = 16  # fold opportunistically once this many events are pending
+
+
+def step(theta: float, correct: bool, difficulty: float, cfg: AISRSConfig = CFG) -> float:
+    """The theta half of ai_srs.apply_grade."""
+    return theta + cfg.lr_user * ((1 if correct else 0) - _sigmoid(theta - difficulty))
+
+
+def replay(theta: float, events, cfg: AISRSConfig = CFG) -> float:
+    for correct, difficulty in events:
+        theta = step(theta, correct, difficulty, cfg)
+    return theta
+
+
+def _pending(state_id):
+    return list(
+        SRSThetaEvent.objects.filter(state_id=state_id).order_by("id").values_list("id", "correct", "difficulty")
+    )
+
+
+def refresh(state, cfg: AISRSConfig = CFG) -> int:
+    """Set state.theta to the current theta (checkpoint + pending events). Returns the pending count."""
+    pending = _pending(state.pk)
+    state.theta = replay(state.theta, [(c, d) for _, c, d in pending], cfg)
+    return len(pending)
+
+
+def record(state, events):
+    """Append (correct, difficulty) events for `state` (one INSERT)."""
+    SRSThetaEvent.objects.bulk_create([
+        SRSThetaEvent(state_id=state.pk, correct=bool(correct), difficulty=float(difficulty))
+        for correct, difficulty in events
+    ])
+
+
+def fold(state_id, cfg: AISRSConfig = CFG):
+    """
+    Move the checkpoint of one state past every pending event. Returns the
+    folded theta, or None if a concurrent fold moved the checkpoint first.
+    """
+    with transaction.atomic():
+        theta, last_id = SRSUserState.objects.filter(pk=state_id).values_list("theta", "theta_event_id").get()
+        pending = _pending(state_id)
+        if not pending:
+            return theta
+        new_theta = replay(theta, [(c, d) for _, c, d in pending], cfg)
+        moved = SRSUserState.objects.filter(pk=state_id, theta_event_id=last_id).update(
+            theta=new_theta, theta_event_id=max(pk for pk, _, _ in pending)
+        )
+        if not moved:
+            return None
+        SRSThetaEvent.objects.filter(id__in=[pk for pk, _, _ in pending]).delete()
+    return new_theta
+
+
+def _fold_after_commit(state_id, cfg):
+    try:
+        fold(state_id, cfg)
+    except DatabaseError:
+        logger.warning("Theta fold of SRS state %s failed, its events stay pending", state_id, exc_info=True)
+
+
+def fold_on_commit(state_id, cfg: AISRSConfig = CFG):
+    """
+    fold() once the current transaction commits. The grade is stored by
+    then, so a failure is logged, not raised; the next fold (or the
+    fold_srs_theta command) picks the events up.
+    """
+    transaction.on_commit(partial(_fold_after_commit, state_id, cfg))
+
+
+def fold_users(user_ids, cfg: AISRSConfig = CFG) -> int:
+    """fold() every state of the given users that has pending events. Returns states folded."""
+    state_ids = (
+        SRSThetaEvent.objects.filter(state__user_id__in=list(user_ids))
+        .values_list("state_id", flat=True).distinct()
+    )
+    folded = 0
+    for state_id in list(state_ids):
+        folded += fold(state_id, cfg) is not None
+    return folded
+
+
+def checkpoint_ids(state_ids) -> dict:
+    """{state_id: newest event id} for states with events (for writers that replace theta wholesale)."""
+    return dict(
+        SRSThetaEvent.objects.filter(state_id__in=list(state_ids))
+        .values("state_id").annotate(last=Max("id")).values_list("state_id", "last")
+    )
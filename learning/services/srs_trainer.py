@@ -0,0 +1,228 @@
+# learning/services/srs_trainer.py
+"""
+Offline refit of the AI-SRS parameters from ReviewLog history (live rows and
+compacted ReviewArchive records, see review_archive.py).
+
+grade_and_schedule learns theta / ai_difficulty with one online SGD step per
+review, so early noise lingers. This module replays each user's full history
+and fits, by regularized maximum likelihood (full-batch gradient descent on
+NumPy arrays):
+
+    p(recall) = sigmoid(theta[user, deck] - d[card]) * 2^(-dt / (s[user] * h))
+
+- theta: learner ability per SRSUserState, d: Flashcard.ai_difficulty
+- h: the card's half-life *before* each review, replayed with the same
+  multiplicative rule as the scheduler (vectorized across cards, one review
+  rank at a time); dt: days since the previous review of that card
+- s: a per-user memory-strength scale; the stored half_life_days becomes
+  s * (replayed final half-life), clamped to the config bounds.
+
+The log-loss before the fit is that of the stored parameters (theta,
+ai_difficulty, and half_life_days read as a per-card scale on the replayed
+half-life), so before -> after is what the refit gains over the live model.
+The written cards are then rescheduled (ai_srs_batch.reschedule_deck): due
+dates follow the new half-life and mastery.
+
+Users are independent (cards and states belong to one user), so the work is
+sharded by user id; refit_users() handles one shard.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import transaction
+
+from ..models import Flashcard, SRSThetaEvent, SRSUserState
+from .ai_srs import AISRSConfig, CFG
+from .ai_srs_batch import reschedule_deck, sigmoid_batch
+from . import srs_retrievability, srs_theta
+from .review_archive import load_reviews
+
+EPS = 1e-6
+DEFAULT_HALF_LIFE = 1.5  # Flashcard.half_life_days default
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class History:
+    """Reviews of one shard, sorted by (card, reviewed_at)."""
+    user_id: np.ndarray
+    card_id: np.ndarray
+    deck_id: np.ndarray
+    rating: np.ndarray
+    ts: np.ndarray  # epoch seconds
+
+    def __len__(self):
+        return len(self.rating)
+
+
+def load_history(user_ids) -> History:
+    # Live ReviewLog rows and compacted ReviewArchive records alike
+    reviews = load_reviews(user_ids)
+    return History(
+        user_id=reviews["user_id"],
+        card_id=reviews["card_id"],
+        deck_id=reviews["deck_id"],
+        rating=reviews["rating"],
+        ts=reviews["ts"],
+    )
+
+
+def replay_half_life(card_idx, rating, n_cards, cfg: AISRSConfig = CFG):
+    """
+    Half-life before each review and the final half-life per card, replaying
+    the scheduler's update rule. Reviews must be sorted by (card, time).
+    Vectorized across cards: step k updates every card's k-th review at once.
+    """
+    n = len(rating)
+    h_before = np.empty(n, dtype=np.float64)
+    h = np.full(n_cards, DEFAULT_HALF_LIFE, dtype=np.float64)
+    if n == 0:
+        return h_before, h
+    starts = np.r_[0, np.flatnonzero(np.diff(card_idx)) + 1]
+    rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    y = rating >= 4
+    factor = 1.0 + 0.25 * np.maximum(0, rating - 3)
+    for k in range(int(rank.max()) + 1):
+        sel = np.flatnonzero(rank == k)
+        cards = card_idx[sel]
+        h_before[sel] = h[cards]
+        h[cards] = np.where(
+            y[sel],
+            np.minimum(cfg.max_half_life, h[cards] * factor[sel]),
+            np.maximum(cfg.min_half_life, h[cards] * 0.5),
+        )
+    return h_before, h
+
+
+def _log_loss(p, y):
+    p = np.clip(p, EPS, 1 - EPS)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def _predict(theta, diff, log_s, s_idx, c_idx, u_idx, dt, h_before):
+    base = sigmoid_batch(theta[s_idx] - diff[c_idx], exact=False)
+    decay = np.exp2(-dt / (np.exp(log_s[u_idx]) * h_before))
+    return base, decay
+
+
+def fit(history: History, theta0, diff0, s_idx, c_idx, u_idx, n_users,
+        iterations: int = 300, lr: float = 0.5, l2: float = 0.01, cfg: AISRSConfig = CFG, half_life0=None):
+    """
+    Gradient descent on the mean log-loss + l2 * (|theta|² + |d|² + |log s|²).
+    loss_before is measured at the stored parameters: theta0, diff0 and the
+    cards' stored half-lives half_life0 (NaN or default: the replayed ones).
+    Returns (theta, diff, log_s, h_final, loss_before, loss_after).
+    """
+    y = (history.rating >= 4).astype(np.float64)
+    n_cards = len(diff0)
+    h_before, h_final = replay_half_life(c_idx, history.rating, n_cards, cfg)
+    dt = np.zeros(len(history), dtype=np.float64)
+    same_card = np.r_[False, c_idx[1:] == c_idx[:-1]]
+    dt[same_card] = (history.ts[1:] - history.ts[:-1])[same_card[1:]] / 86400.0
+
+    theta = np.array(theta0, dtype=np.float64)
+    diff = np.array(diff0, dtype=np.float64)
+    log_s = np.zeros(n_users, dtype=np.float64)
+
+    # A stored half-life is a per-card scale on the replayed one (1 where unknown)
+    scale0 = np.ones(n_cards)
+    if half_life0 is not None:
+        h0 = np.asarray(half_life0, dtype=np.float64)
+        known = np.isfinite(h0) & (h0 > 0)
+        scale0[known] = h0[known] / h_final[known]
+    base, decay = _predict(theta, diff, np.log(scale0), s_idx, c_idx, c_idx, dt, h_before)
+    loss_before = _log_loss(base * decay, y)
+
+    # Per-parameter step sizes normalized by how many reviews touch each one
+    n_s = np.maximum(1, np.bincount(s_idx, minlength=len(theta)))
+    n_c = np.maximum(1, np.bincount(c_idx, minlength=n_cards))
+    n_u = np.maximum(1, np.bincount(u_idx, minlength=n_users))
+    ln2 = math.log(2)
+    for _ in range(iterations):
+        base, decay = _predict(theta, diff, log_s, s_idx, c_idx, u_idx, dt, h_before)
+        p = np.clip(base * decay, EPS, 1 - EPS)
+        dl_dp = (p - y) / (p * (1 - p))                 # d(-loglik)/dp
+        g_a = dl_dp * base * (1 - base) * decay          # wrt (theta - d)
+        g_ls = dl_dp * p * ln2 * dt / (np.exp(log_s[u_idx]) * h_before)
+        theta -= lr * (np.bincount(s_idx, g_a, len(theta)) / n_s + l2 * theta)
+        diff -= lr * (-np.bincount(c_idx, g_a, n_cards) / n_c + l2 * diff)
+        log_s -= lr * (np.bincount(u_idx, g_ls, n_users) / n_u + l2 * log_s)
+
+    base, decay = _predict(theta, diff, log_s, s_idx, c_idx, u_idx, dt, h_before)
+    loss_after = _log_loss(base * decay, y)
+    return theta, diff, log_s, h_final, loss_before, loss_after
+
+
+def refit_users(user_ids, iterations: int = 300, l2: float = 0.01, dry_run: bool = False,
+                cfg: AISRSConfig = CFG) -> dict:
+    """Refit one shard of users, write the results and reschedule the cards (unless dry_run)."""
+    history = load_history(user_ids)
+    stats = {
+        "users": len(user_ids), "reviews": len(history), "cards": 0, "rescheduled": 0,
+        "loss_before": 0.0, "loss_after": 0.0,
+    }
+    if not len(history):
+        return stats
+
+    states = {
+        (u, d): (pk, theta) for pk, u, d, theta in
+        SRSUserState.objects.filter(user_id__in=list(user_ids)).values_list("id", "user_id", "deck_id", "theta")
+    }
+    state_keys = sorted(set(zip(history.user_id.tolist(), history.deck_id.tolist())) & set(states))
+    s_pos = {k: i for i, k in enumerate(state_keys)}
+    keep = np.array([(u, d) in s_pos for u, d in zip(history.user_id.tolist(), history.deck_id.tolist())])
+    if not keep.all():
+        # Reviews of decks without an SRSUserState cannot be attributed to a theta
+        history = History(*(getattr(history, f)[keep] for f in ("user_id", "card_id", "deck_id", "rating", "ts")))
+        if not len(history):
+            return stats
+
+    card_ids, c_idx = np.unique(history.card_id, return_inverse=True)
+    user_list, u_idx = np.unique(history.user_id, return_inverse=True)
+    s_idx = np.array([s_pos[(u, d)] for u, d in zip(history.user_id.tolist(), history.deck_id.tolist())])
+    cards = Flashcard.objects.in_bulk(card_ids.tolist())
+    diff0 = [cards[cid].ai_difficulty if cid in cards else 0.0 for cid in card_ids.tolist()]
+    theta0 = [states[k][1] for k in state_keys]
+    half_life0 = [cards[cid].half_life_days if cid in cards else math.nan for cid in card_ids.tolist()]
+
+    theta, diff, log_s, h_final, loss_before, loss_after = fit(
+        history, theta0, diff0, s_idx, c_idx, u_idx, len(user_list), iterations=iterations, l2=l2, cfg=cfg,
+        half_life0=half_life0,
+    )
+    stats.update(cards=len(card_ids), loss_before=loss_before, loss_after=loss_after)
+    if dry_run:
+        return stats
+
+    # Per-card user scale: every review of a card has the same user
+    card_user = np.zeros(len(card_ids), dtype=np.int64)
+    card_user[c_idx] = u_idx
+    half_life = np.clip(np.exp(log_s[card_user]) * h_final, cfg.min_half_life, cfg.max_half_life)
+
+    to_update = []
+    for i, cid in enumerate(card_ids.tolist()):
+        card = cards.get(cid)
+        if card is None:
+            continue
+        card.ai_difficulty = float(diff[i])
+        card.half_life_days = float(half_life[i])
+        to_update.append(card)
+    # The refit replaces theta wholesale: fold every pending theta event into it
+    state_ids = [states[k][0] for k in state_keys]
+    last_event = srs_theta.checkpoint_ids(state_ids)
+    new_states = [
+        SRSUserState(id=pk, theta=float(theta[i]), theta_event_id=last_event.get(pk, 0))
+        for i, pk in enumerate(state_ids)
+    ]
+    with transaction.atomic():
+        Flashcard.objects.bulk_update(to_update, ["ai_difficulty", "half_life_days"], batch_size=CHUNK_SIZE)
+        SRSUserState.objects.bulk_update(new_states, ["theta", "theta_event_id"], batch_size=CHUNK_SIZE)
+        for st in new_states:
+            if st.theta_event_id:
+                SRSThetaEvent.objects.filter(state_id=st.id, id__lte=st.theta_event_id).delete()
+    # New half-lives and mastery move the intervals: re-derive due_at from them
+    for i, (user_id, deck_id) in enumerate(state_keys):
+        stats["rescheduled"] += reschedule_deck(user_id, deck_id, float(theta[i]), cfg)
+        srs_retrievability.invalidate(user_id, deck_id)
+    return stats
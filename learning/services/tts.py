@@ -0,0 +1,387 @@
+# learning/services/tts.py
+"""
+espeak-ng speech synthesis on a pool of long-lived worker processes.
+
+Every TTS cache miss used to fork a fresh espeak-ng (subprocess.run), which
+loads the phoneme and voice data again and blocks the request thread until
+it exits; a failing variant voice forked a second time. synthesize() hands
+the job to a fixed pool instead:
+
+- Workers (settings.TTS_WORKERS) are spawned once and load libespeak-ng
+  through ctypes (settings.ESPEAK_NG_LIBRARY, or found on the library
+  path); each job is a voice / parameter switch and one espeak_Synth call
+  into memory, written as a WAV (temp file + rename, so a half-written file
+  is never served). The fallback voice is tried in the same worker.
+- Without the library (ExecutableEngine) a worker still forks the
+  espeak-ng executable for every job, as before: that path only gains the
+  bounded queue and the timeouts, not the saved start-up. The latency
+  figures of this change were measured with a stand-in library that
+  simulates the voice-data load, not with libespeak-ng itself.
+- Bounded queue: at most TTS_WORKERS jobs run and TTS_QUEUE_SIZE wait;
+  beyond that synthesize() raises TTSBusy at once (the views answer 503).
+- Per-job timeout (TTS_JOB_TIMEOUT seconds, waiting for a worker
+  included): a worker that does not answer in time is killed and replaced.
+- Recycling: a worker is replaced after TTS_WORKER_MAX_JOBS jobs, or after
+  any error, so leaks or a wedged engine never outlive a few hundred jobs.
+- Replacements start on a background thread (a start may take up to
+  START_TIMEOUT): the request that retired a worker returns at once, and
+  the new worker joins the idle queue when it is ready (None if it failed
+  to start; the job that takes the None starts another attempt).
+
+Workers are plain processes started with the "spawn" method (no copy of
+the Django process, so the entry script needs the usual
+`if __name__ == "__main__"` guard, as manage.py has); the pool starts on
+first use and stops at exit.
+"""
+
+import atexit
+import ctypes
+import ctypes.util
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from typing import NamedTuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# espeak-ng CLI defaults (-s -p -a -g), so jobs without a value sound as before
+DEFAULT_SPEED = 175
+DEFAULT_PITCH = 50
+DEFAULT_AMPLITUDE = 100
+DEFAULT_GAP = 0
+START_TIMEOUT = 30.0      # seconds a new worker may take to load the engine
+
+
+class TTSError(Exception):
+    """Synthesis failed or timed out."""
+
+
+class TTSBusy(TTSError):
+    """Every worker is busy and the queue is full."""
+
+
+class Job(NamedTuple):
+    wav_path: str
+    text: str
+    voice: str
+    fallback_voice: str = None
+    speed: int = DEFAULT_SPEED
+    pitch: int = DEFAULT_PITCH
+    amplitude: int = DEFAULT_AMPLITUDE
+    gap: int = DEFAULT_GAP
+
+
+def exe_path():
+    return getattr(settings, "ESPEAK_NG_EXE", None) or shutil.which("espeak-ng") or shutil.which("espeak")
+
+
+def library_path():
+    configured = getattr(settings, "ESPEAK_NG_LIBRARY", None)
+    if configured:
+        return configured
+    found = ctypes.util.find_library("espeak-ng")
+    if found:
+        return found
+    # Windows installer: libespeak-ng.dll next to espeak-ng.exe
+    exe = getattr(settings, "ESPEAK_NG_EXE", None)
+    if exe:
+        candidate = os.path.join(os.path.dirname(exe), "libespeak-ng.dll")
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def available() -> bool:
+    return bool(library_path() or exe_path())
+
+
+# ----- Engines (run inside the workers) -----
+
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+CHARS_UTF8 = 1
+END_PAUSE = 0x1000        # the CLI's default: trailing silence after the last clause
+POS_CHARACTER = 1
+PARAM_RATE, PARAM_VOLUME, PARAM_PITCH, PARAM_WORDGAP = 1, 2, 3, 7
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+
+
+def _write_wav(path, rate, frames: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(frames)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class LibraryEngine:
+    """libespeak-ng, loaded and initialized once per worker."""
+
+    def __init__(self, path, data_path=None):
+        self.lib = ctypes.CDLL(path)
+        self.lib.espeak_Initialize.restype = ctypes.c_int
+        self.lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        self.lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        self.lib.espeak_SetParameter.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        self.lib.espeak_Synth.argtypes = [
+            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int, ctypes.c_uint, ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_uint), ctypes.c_void_p,
+        ]
+        self.rate = self.lib.espeak_Initialize(
+            AUDIO_OUTPUT_SYNCHRONOUS, 0, data_path.encode() if data_path else None, 0
+        )
+        if self.rate <= 0:
+            raise TTSError("espeak_Initialize failed")
+        self._chunks = []
+        self._callback = SYNTH_CALLBACK(self._collect)   # kept referenced for the library's lifetime
+        self.lib.espeak_SetSynthCallback(self._callback)
+
+    def _collect(self, wav, numsamples, events):
+        if numsamples > 0:
+            self._chunks.append(ctypes.string_at(wav, numsamples * 2))
+        return 0
+
+    def _synth(self, job: Job, voice: str) -> bool:
+        if self.lib.espeak_SetVoiceByName(voice.encode()) != 0:
+            return False
+        for param, value in ((PARAM_RATE, job.speed), (PARAM_PITCH, job.pitch),
+                             (PARAM_VOLUME, job.amplitude), (PARAM_WORDGAP, job.gap)):
+            self.lib.espeak_SetParameter(param, int(value), 0)
+        text = job.text.encode("utf-8")
+        self._chunks = []
+        flags = CHARS_UTF8 | END_PAUSE
+        if self.lib.espeak_Synth(text, len(text) + 1, 0, POS_CHARACTER, 0, flags, None, None) != 0:
+            return False
+        self.lib.espeak_Synchronize()
+        return bool(self._chunks)
+
+    def run(self, job: Job):
+        if not self._synth(job, job.voice) and not (job.fallback_voice and self._synth(job, job.fallback_voice)):
+            raise TTSError(f"espeak-ng could not synthesize with voice {job.voice}")
+        _write_wav(job.wav_path, self.rate, b"".join(self._chunks))
+        self._chunks = []
+
+
+class ExecutableEngine:
+    """No library: the espeak-ng executable per job, as the views used to."""
+
+    def __init__(self, exe, timeout):
+        self.exe = exe
+        self.timeout = timeout
+
+    def _synth(self, job: Job, voice: str, path: str) -> bool:
+        cmd = [self.exe, "-v", voice, "-s", str(job.speed), "-p", str(job.pitch), "-a", str(job.amplitude),
+               "-g", str(job.gap), "-w", path, job.text]
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.timeout)
+        except subprocess.CalledProcessError:
+            return False
+        return True
+
+    def run(self, job: Job):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(job.wav_path), suffix=".part")
+        os.close(fd)
+        try:
+            if not self._synth(job, job.voice, tmp) and not (
+                job.fallback_voice and self._synth(job, job.fallback_voice, tmp)
+            ):
+                raise TTSError(f"espeak-ng could not synthesize with voice {job.voice}")
+            os.replace(tmp, job.wav_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _serve(conn, config: dict):
+    """Worker process: build the engine once, then answer jobs until the pipe closes."""
+    try:
+        if config["library"]:
+            engine = LibraryEngine(config["library"], config["data_path"])
+        else:
+            engine = ExecutableEngine(config["exe"], config["timeout"])
+    except Exception as exc:
+        conn.send((False, f"engine failed to start: {exc}"))
+        return
+    conn.send((True, type(engine).__name__))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            engine.run(Job(*job))
+            conn.send((True, None))
+        except Exception as exc:
+            conn.send((False, str(exc)))
+
+
+# ----- Pool (request side) -----
+
+class _Worker:
+    def __init__(self, context, config):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, config), name="tts-worker", daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        self.conn.close()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class TTSPool:
+    def __init__(self, size=2, queue_size=8, timeout=10.0, max_jobs=500, config=None):
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.config = config
+        self.spawned = 0                       # worker processes started (startup + replacements)
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+        self._idle = queue.Queue()
+        self._stopped = False
+        self._lock = threading.Lock()          # _stopped vs. putting workers back
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        atexit.register(self.stop)
+
+    def _spawn(self):
+        self.spawned += 1
+        worker = _Worker(self._context, self.config)
+        try:
+            ok, detail = worker.conn.recv() if worker.conn.poll(START_TIMEOUT) else (False, "no answer")
+        except (EOFError, OSError) as exc:
+            ok, detail = False, f"exited ({exc!r})"
+        if ok:
+            return worker
+        logger.error("TTS worker failed to start: %s", detail)
+        worker.stop(kill=True)
+        return None
+
+    def _give_back(self, worker):
+        with self._lock:
+            if not self._stopped:
+                self._idle.put(worker)        # None: a replacement failed to start, the next job retries
+                return
+        if worker is not None:
+            worker.stop()
+
+    def _respawn(self, worker, kill):
+        if worker is not None:
+            worker.stop(kill=kill)
+        self._give_back(None if self._stopped else self._spawn())
+
+    def _replace(self, worker, kill=False) -> bool:
+        """
+        Retire worker (None: a failed start) and start its replacement on a
+        background thread, which puts it on the idle queue. Returns False:
+        the caller's idle entry now belongs to that thread.
+        """
+        threading.Thread(target=self._respawn, args=(worker, kill), name="tts-respawn", daemon=True).start()
+        return False
+
+    def run(self, job: Job):
+        if not self._slots.acquire(blocking=False):
+            raise TTSBusy("TTS queue full")
+        deadline = time.monotonic() + self.timeout
+        worker, owned = None, False           # owned: this call holds an idle entry and must give it back
+        try:
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TTSError("timed out waiting for a TTS worker")
+            owned = True
+            if worker is None:
+                # A replacement failed to start earlier: try again, off the request thread
+                owned = self._replace(None)
+                raise TTSError("no TTS worker could be started")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TTSError("timed out waiting for a TTS worker")
+            worker.conn.send(tuple(job))
+            if not worker.conn.poll(remaining):
+                owned = self._replace(worker, kill=True)
+                raise TTSError("TTS job timed out")
+            ok, detail = worker.conn.recv()
+            worker.jobs += 1
+            if not ok:
+                owned = self._replace(worker)
+                raise TTSError(detail)
+            if worker.jobs >= self.max_jobs:
+                owned = self._replace(worker)
+        except (EOFError, OSError) as exc:
+            if owned:
+                owned = self._replace(worker, kill=True)
+            raise TTSError(f"TTS worker died: {exc}")
+        finally:
+            # Only a call that still holds its idle entry gives it back, or the pool would grow
+            if owned:
+                self._give_back(worker)
+            self._slots.release()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> TTSPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            timeout = float(getattr(settings, "TTS_JOB_TIMEOUT", 10))
+            _pool = TTSPool(
+                size=int(getattr(settings, "TTS_WORKERS", 2)),
+                queue_size=int(getattr(settings, "TTS_QUEUE_SIZE", 8)),
+                timeout=timeout,
+                max_jobs=int(getattr(settings, "TTS_WORKER_MAX_JOBS", 500)),
+                config={
+                    "library": library_path(),
+                    "data_path": getattr(settings, "ESPEAK_NG_DATA", None),
+                    "exe": exe_path(),
+                    "timeout": timeout,
+                },
+            )
+        return _pool
+
+
+def synthesize(wav_path, text, voice, fallback_voice=None, speed=None, pitch=None, amplitude=None, gap=None):
+    """Write text spoken with voice (or fallback_voice) to wav_path. Raises TTSBusy / TTSError."""
+    get_pool().run(Job(
+        wav_path, text, voice, fallback_voice,
+        DEFAULT_SPEED if speed is None else int(speed),
+        DEFAULT_PITCH if pitch is None else int(pitch),
+        DEFAULT_AMPLITUDE if amplitude is None else int(amplitude),
+        DEFAULT_GAP if gap is None else int(gap),
+    ))
@@ -0,0 +1,72 @@
+# learning/services/versioned_cache.py
+"""
+Read-modify-write of cached derived data (SRS queues, retrievability
+indexes) without compare-and-set.
+
+The Django cache API has no CAS: two processes patching the same entry with
+get -> mutate -> set each write back their own copy, and one change is lost
+until the entry expires. So every entry has a generation counter next to it
+(key + ":gen"), and entries are stored as (generation, value):
+
+- patch() bumps the counter with cache.incr (atomic on LocMem, Redis and
+  Memcached) before reading the entry, and writes the patched value back
+  only if the entry was at the generation just before its own, i.e. no
+  other write came in between. Otherwise it deletes the entry.
+- store() tags a rebuilt value with the generation read *before* the
+  queries it was built from (generation()); invalidate() bumps and deletes.
+- get() returns a value only while it carries the current generation.
+
+A lost race costs a rebuild, never a stale entry. A counter evicted before
+its entry reads as 0 and the entry is rebuilt the same way.
+"""
+
+from django.core.cache import cache
+
+
+def _gen_key(key) -> str:
+    return f"{key}:gen"
+
+
+def _bump(key):
+    """Next generation of key, or None if the counter vanished mid-way (evicted)."""
+    cache.add(_gen_key(key), 0, None)
+    try:
+        return cache.incr(_gen_key(key))
+    except ValueError:
+        return None
+
+
+def generation(key) -> int:
+    return cache.get(_gen_key(key), 0)
+
+
+def get(key):
+    """The cached value, or None if missing or behind the current generation."""
+    found = cache.get_many([key, _gen_key(key)])
+    entry = found.get(key)
+    if entry is None or entry[0] != found.get(_gen_key(key), 0):
+        return None
+    return entry[1]
+
+
+def store(key, value, gen: int, timeout):
+    cache.set(key, (gen, value), timeout)
+
+
+def patch(key, apply, timeout) -> bool:
+    """apply(value) in place on the cached value, if there is one. Returns True if written back."""
+    gen = _bump(key)
+    entry = cache.get(key)
+    if entry is None:
+        return False
+    if gen is None or entry[0] != gen - 1:
+        cache.delete(key)
+        return False
+    apply(entry[1])
+    cache.set(key, (gen, entry[1]), timeout)
+    return True
+
+
+def invalidate(key):
+    _bump(key)
+    cache.delete(key)
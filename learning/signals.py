@@ -0,0 +1,91 @@
+# learning/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Flashcard, GlossaryEntry, Lesson, MatchingExercise, MatchingPair, PronunciationExercise
+from .services import answer_keys, lesson_content, lesson_progress, srs_counters, srs_queue, srs_retrievability
+from .services.glossary_sync import mark_glossary_dirty
+
+
+@receiver(post_save, sender=GlossaryEntry)
+def glossary_entry_saved(sender, instance, raw=False, **kwargs):
+    # New or edited entry: the owner's decks need an incremental sync.
+    if raw:
+        return
+    mark_glossary_dirty(instance.user_id)
+
+
+@receiver(post_save, sender=Flashcard)
+def flashcard_saved(sender, instance, raw=False, created=False, **kwargs):
+    # Covers grade_and_schedule writing a new due_at, suspensions and admin edits.
+    if raw:
+        return
+    srs_queue.refresh_card(instance)
+    srs_retrievability.refresh_card(instance)
+    # Instances not loaded from the DB (no _srs_bucket) are left to reconcile
+    if created or hasattr(instance, "_srs_bucket"):
+        after = srs_counters.card_bucket(instance)
+        srs_counters.record_on_commit(
+            instance.user_id, instance.deck_id, [(getattr(instance, "_srs_bucket", None), after)]
+        )
+        instance._srs_bucket = after
+
+
+@receiver(post_delete, sender=Flashcard)
+def flashcard_deleted(sender, instance, **kwargs):
+    srs_queue.remove_card(instance)
+    srs_retrievability.remove_card(instance)
+    before = getattr(instance, "_srs_bucket", None) or srs_counters.card_bucket(instance)
+    srs_counters.record_on_commit(instance.user_id, instance.deck_id, [(before, None)])
+
+
+def content_pre_save(sender, instance, raw=False, **kwargs):
+    # Remember the stored lesson so post_save can follow a move to another lesson
+    if raw or instance.pk is None:
+        return
+    instance._stored_lesson_id = sender.objects.filter(pk=instance.pk).values_list("lesson_id", flat=True).first()
+
+
+def content_saved(sender, instance, raw=False, **kwargs):
+    # Lesson content version (services/lesson_content.py): answer keys and bundles; results carry the lesson
+    if raw:
+        return
+    previous = getattr(instance, "_stored_lesson_id", None)
+    lesson_content.content_changed(instance, previous)
+    if previous is None or previous == instance.lesson_id:
+        return
+    if sender in answer_keys.KINDS:
+        lesson_progress.move_results(answer_keys.KINDS[sender], instance.pk, previous, instance.lesson_id)
+    elif sender is PronunciationExercise:
+        lesson_progress.move_pronunciation(instance.pk, previous, instance.lesson_id)
+
+
+def content_deleted(sender, instance, **kwargs):
+    lesson_content.content_changed(instance)
+    if sender in answer_keys.KINDS:
+        lesson_progress.move_results(answer_keys.KINDS[sender], instance.pk, instance.lesson_id, None)
+    elif sender is PronunciationExercise:
+        lesson_progress.move_pronunciation(instance.pk, instance.lesson_id, None)
+
+
+for _model in lesson_content.CONTENT_MODELS:
+    pre_save.connect(content_pre_save, sender=_model, dispatch_uid=f"content_{_model.__name__}_pre_save")
+    post_save.connect(content_saved, sender=_model, dispatch_uid=f"content_{_model.__name__}_saved")
+    post_delete.connect(content_deleted, sender=_model, dispatch_uid=f"content_{_model.__name__}_deleted")
+
+
+@receiver([post_save, post_delete], sender=MatchingPair)
+def matching_pair_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # None when the exercise itself is being deleted (its own signal covers it)
+    lesson_content.invalidate(
+        MatchingExercise.objects.filter(pk=instance.exercise_id).values_list("lesson_id", flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    lesson_content.invalidate(instance.pk)
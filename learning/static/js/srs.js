@@ -26,8 +26,14 @@
 // --- State ---
 let currentCard = null;
 let reverseMode = false;
+// Session mode: cards are fetched N at a time and grades are sent in one batch
+const SESSION_SIZE = 20;
+let sessionCards = [];
+let sessionReason = null;
+let pendingGrades = [];
 let srsState = {
   mode: "comfortable",
+  priority: "due",
   new_limit: 15,
   new_shown_today: 0,
   allowed_new_today: 0,
@@ -42,6 +48,8 @@ function updateModeButtons() {
     if (!btn) return;
     btn.classList.toggle("active", srsState.mode === m);
   });
+  const pr = document.getElementById("priority-btn");
+  if (pr) pr.textContent = srsState.priority === "retrievability" ? "Orden: menor recuerdo" : "Orden: vencimiento";
   const nc = document.getElementById("new-count");
   const nl = document.getElementById("new-limit");
   const dc = document.getElementById("due-count");
@@ -72,7 +80,18 @@ async function loadSrsState() {
   } catch (_) {}
 }
 
-window.setMode = async function(mode) {
+window.setMode = function(mode) {
+  return saveSrsSettings({ mode }, "No se pudo cambiar el modo.");
+};
+
+window.togglePriority = function() {
+  const priority = srsState.priority === "retrievability" ? "due" : "retrievability";
+  // Cards already fetched were ordered by the old priority
+  sessionCards = [];
+  return saveSrsSettings({ priority }, "No se pudo cambiar el orden.");
+};
+
+async function saveSrsSettings(payload, errorMsg) {
   try {
     const r = await fetch("/learning/api/srs/set-mode/", {
       method: "POST",
@@ -82,17 +101,17 @@ window.setMode = async function(mode) {
         "Accept": "application/json"
       },
       credentials: "same-origin",
-      body: JSON.stringify({ mode })
+      body: JSON.stringify(payload)
     });
     if (r.ok) {
       const data = await r.json();
       srsState = Object.assign(srsState, data);
       updateModeButtons();
     } else {
-      alert("No se pudo cambiar el modo.");
+      alert(errorMsg);
     }
   } catch (e) { console.error(e); }
-};
+}
 
 window.toggleReverse = function() {
   reverseMode = !reverseMode;
@@ -142,35 +161,66 @@ async function srsInit() {
   await srsNext();
 }
 
-async function srsNext() {
-  const front = document.getElementById("front");
-  const back = document.getElementById("back");
-  const notes = document.getElementById("notes");
-
+async function flushGrades(keepalive = false) {
+  if (!pendingGrades.length) return;
+  const reviews = pendingGrades;
+  pendingGrades = [];
   try {
-    const r = await fetch("/learning/api/srs/next/", {
+    const r = await fetch("/learning/api/srs/grade-batch/", {
       method: "POST",
-      headers: { "X-CSRFToken": getCSRFToken(), "Accept": "application/json" },
-      credentials: "same-origin"
+      headers: {
+        "Content-Type":"application/json",
+        "X-CSRFToken": getCSRFToken(),
+        "Accept": "application/json"
+      },
+      credentials: "same-origin",
+      keepalive,
+      body: JSON.stringify({ reviews })
     });
     if (!r.ok) {
-      if (front) front.textContent = `Error ${r.status}. ¿Sesión iniciada?`;
-      hideBack();
-      return;
+      console.warn("SRS batch grade status:", r.status);
+      if (r.status >= 500) pendingGrades = reviews.concat(pendingGrades);
+    } else if (!keepalive) {
+      toast(`${reviews.length} tarjeta(s) guardada(s)`, "good");
     }
-    const ct = r.headers.get("content-type") || "";
-    if (!ct.includes("application/json")) {
-      if (front) front.textContent = "Respuesta no válida. Recarga e inicia sesión de nuevo.";
-      hideBack();
-      return;
-    }
-    const data = await r.json();
+  } catch (e) {
+    console.error("SRS batch grade error:", e);
+    pendingGrades = reviews.concat(pendingGrades);
+  }
+}
+
+async function loadSession() {
+  await flushGrades();
+  const r = await fetch("/learning/api/srs/session/", {
+    method: "POST",
+    headers: {
+      "Content-Type":"application/json",
+      "X-CSRFToken": getCSRFToken(),
+      "Accept": "application/json"
+    },
+    credentials: "same-origin",
+    body: JSON.stringify({ size: SESSION_SIZE })
+  });
+  if (!r.ok) throw new Error(`HTTP ${r.status}`);
+  const ct = r.headers.get("content-type") || "";
+  if (!ct.includes("application/json")) throw new Error("invalid content-type");
+  const data = await r.json();
+  sessionCards = data.cards || [];
+  sessionReason = data.reason || null;
+  // Update counters once per session (new cards are counted as shown)
+  await loadSrsState();
+}
+
+async function srsNext() {
+  const front = document.getElementById("front");
+  const back = document.getElementById("back");
+  const notes = document.getElementById("notes");
 
-    // Update counters (por si mostramos nueva tarjeta)
-    await loadSrsState();
+  try {
+    if (!sessionCards.length) await loadSession();
 
-    if (!data.card) {
-      if (data.reason === "new_cap_reached") {
+    if (!sessionCards.length) {
+      if (sessionReason === "new_cap_reached") {
         if (front) front.textContent = "Límite diario de nuevas tarjetas alcanzado. Vuelve mañana o cambia el modo.";
       } else {
         if (front) front.textContent = "No hay tarjetas pendientes. Agrega palabras al Glosario y vuelve a sincronizar.";
@@ -182,7 +232,7 @@ async function srsNext() {
       return;
     }
 
-    currentCard = data.card;
+    currentCard = sessionCards.shift();
     if (front) front.textContent = reverseMode ? currentCard.back_gn : currentCard.front_es;
     if (back)  back.textContent  = reverseMode ? currentCard.front_es : (currentCard.back_gn || "(sin respuesta)");
     if (notes) {
@@ -218,39 +268,27 @@ function confetti() {
 
 async function srsGrade(score) {
   if (!currentCard) return;
-  try {
-    const resp = await fetch("/learning/api/srs/grade/", {
-      method: "POST",
-      headers: {
-        "Content-Type":"application/json",
-        "X-CSRFToken": getCSRFToken(),
-        "Accept": "application/json"
-      },
-      credentials: "same-origin",
-      body: JSON.stringify({ card_id: currentCard.id, rating: score })
-    });
-
-    let data = {};
-    try { data = await resp.json(); } catch(_) {}
-
-    if (score >= 5) confetti();
-
-    if (data && data.interval_days != null) {
-      const msg = `Próxima en ${data.interval_days} día(s)`;
-      toast(score >= 5 ? "¡Perfecto! " + msg : msg, score >= 5 ? "good" : "");
-    }
+  pendingGrades.push({ card_id: currentCard.id, rating: score, reviewed_at: new Date().toISOString() });
 
-    // Notificar mascota si está disponible
-    if (typeof window.updateMascotFromRating === "function") {
-      window.updateMascotFromRating(score);
-    }
+  if (score >= 5) {
+    confetti();
+    toast("¡Perfecto!", "good");
+  }
 
-  } catch (e) {
-    console.error("SRS grade error:", e);
+  // Notificar mascota si está disponible
+  if (typeof window.updateMascotFromRating === "function") {
+    window.updateMascotFromRating(score);
   }
+
   await srsNext();
 }
 
+// Send whatever is still pending when the tab is hidden or closed
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "hidden") flushGrades(true);
+});
+window.addEventListener("pagehide", () => flushGrades(true));
+
 function srsSkip() { srsNext(); }
 
 // --- Keyboard shortcuts ---
@@ -0,0 +1,99 @@
+# learning/tests/test_lesson_progress.py
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from learning.models import FillBlankExercise, Lesson, TranslationExercise, UserLessonProgress
+from learning.services import lesson_progress
+from learning.services.lesson_progress import (
+    DERIVED_FIELDS, STAT_FIELDS, ResultUpdate, _bulk_update, apply_deltas, save_results,
+)
+
+User = get_user_model()
+
+
+class ApplyDeltasTests(TestCase):
+    """Bulk apply_deltas leaves every touched row as a full recompute() would."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(f"learner{i}", password="x") for i in range(3)]
+        self.lessons = [Lesson.objects.create(title=f"Lesson {i}") for i in range(2)]
+        self.fill = [FillBlankExercise.objects.create(lesson=l, prompt_text="____", correct_answer="che") for l in self.lessons]
+        self.translation = TranslationExercise.objects.create(
+            lesson=self.lessons[1], prompt_text="I", acceptable_answers=["che"],
+        )
+
+    def _rows(self):
+        return {
+            (p.user_id, p.lesson_id): (p.written_sum, p.written_count, p.progress_percent, p.stats_synced_at is not None)
+            for p in UserLessonProgress.objects.all()
+        }
+
+    def test_matches_recompute(self):
+        first, second, third = self.users
+        apply_deltas(save_results([
+            ResultUpdate(first.id, "fillblank", self.fill[0].id, self.lessons[0].id, 50.0, False),
+            ResultUpdate(second.id, "fillblank", self.fill[0].id, self.lessons[0].id, 100.0, True),
+        ]))
+        # second's row goes stale (as after an exercise moved): the batch must rebuild it
+        lesson_progress.mark_stale([second.id], [self.lessons[0].id])
+        written = apply_deltas(save_results([
+            ResultUpdate(first.id, "fillblank", self.fill[0].id, self.lessons[0].id, 80.0, True),     # in sync: delta
+            ResultUpdate(first.id, "fillblank", self.fill[1].id, self.lessons[1].id, 70.0, False),    # missing
+            ResultUpdate(second.id, "fillblank", self.fill[0].id, self.lessons[0].id, 60.0, False),   # stale
+            ResultUpdate(third.id, "translation", self.translation.id, self.lessons[1].id, 100.0, True),  # not written
+        ]))
+        self.assertEqual(written, 4)
+        rows = self._rows()
+        self.assertEqual(rows[(first.id, self.lessons[0].id)][:3], (80.0, 1, 40.0))
+        for user_id, lesson_id in rows:
+            lesson_progress.recompute(user_id, lesson_id)
+        self.assertEqual(self._rows(), rows)
+
+    def test_unchanged_rows_not_written(self):
+        update = ResultUpdate(self.users[0].id, "fillblank", self.fill[0].id, self.lessons[0].id, 90.0, True)
+        apply_deltas(save_results([update]))
+        self.assertEqual(apply_deltas(save_results([update._replace(score=40.0)])), 0)
+        self.assertEqual(apply_deltas({}), 0)
+
+
+class BulkUpdateTests(TestCase):
+    """_bulk_update stores exactly what Model.objects.bulk_update does."""
+
+    FIELDS = STAT_FIELDS + DERIVED_FIELDS + ["stats_synced_at", "lesson"]
+    SYNCED = datetime(2026, 3, 4, 5, 6, 7, 891011, tzinfo=timezone.utc)
+
+    def _rows(self, prefix):
+        users = [User.objects.create_user(f"{prefix}{i}", password="x") for i in range(3)]
+        lesson = Lesson.objects.create(title=prefix)
+        other = Lesson.objects.create(title=f"{prefix} other")
+        rows = [UserLessonProgress.objects.create(user=user, lesson=lesson) for user in users]
+        for i, row in enumerate(rows):
+            row.written_sum, row.written_count = 0.1 * (i + 1) + 170.2, i + 2
+            row.pronunciation_stats = {"7": [81.5, 2], "ñe'ẽ": [i, None]} if i else {}
+            row.written_score, row.pronunciation_confidence = row.written_sum / row.written_count, 40.25
+            row.progress_percent, row.completed = 91.0 - i, i == 0
+            row.stats_synced_at = self.SYNCED if i != 1 else None
+            if i == 2:
+                row.lesson = other
+        return rows
+
+    def _stored(self, rows):
+        return [
+            tuple(value for name, value in sorted(values.items()) if name not in ("id", "user_id", "lesson_id"))
+            + (values["lesson_id"] == rows[0].lesson_id,)
+            for values in UserLessonProgress.objects.filter(pk__in=[r.pk for r in rows]).order_by("id").values(
+                *[f if f != "lesson" else "lesson_id" for f in self.FIELDS]
+            )
+        ]
+
+    def test_same_rows_as_bulk_update(self):
+        ours, django = self._rows("a"), self._rows("b")
+        _bulk_update(ours, self.FIELDS)
+        UserLessonProgress.objects.bulk_update(django, self.FIELDS)
+        self.assertEqual(self._stored(ours), self._stored(django))
+
+    def test_requires_primary_keys(self):
+        with self.assertRaises(ValueError):
+            _bulk_update([UserLessonProgress()], ["written_sum"])
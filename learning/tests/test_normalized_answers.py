@@ -0,0 +1,49 @@
+# learning/tests/test_normalized_answers.py
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from learning.models import FillBlankExercise, Lesson, MatchingExercise, MatchingPair, TranslationExercise
+from learning.services import answer_keys
+
+
+class NormalizedAnswerTests(TestCase):
+    """Writes that bypass save() still score against normalized answers."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.lesson = Lesson.objects.create(title="Lesson")
+
+    def _score(self, kind, exercise_id, answer):
+        return answer_keys.score(answer_keys.get(kind, exercise_id), {"answer": answer})[:2]
+
+    def test_bulk_created_rows(self):
+        fill, = FillBlankExercise.objects.bulk_create([
+            FillBlankExercise(lesson=self.lesson, prompt_text="____", correct_answer="Mba’e!"),
+        ])
+        translation, = TranslationExercise.objects.bulk_create([
+            TranslationExercise(lesson=self.lesson, prompt_text="I", acceptable_answers=["Che  ha'e"]),
+        ])
+        self.assertEqual(self._score("fillblank", fill.id, "mba'e"), (100.0, True))
+        self.assertEqual(self._score("translation", translation.id, "che haʼe"), (100.0, True))
+
+    def test_command_repairs_updated_rows(self):
+        fill = FillBlankExercise.objects.create(lesson=self.lesson, prompt_text="____", correct_answer="che")
+        matching = MatchingExercise.objects.create(lesson=self.lesson)
+        MatchingPair.objects.bulk_create([MatchingPair(exercise=matching, left_text="Nde", right_text="tú")])
+        FillBlankExercise.objects.filter(pk=fill.pk).update(correct_answer="Ñande")
+        out = StringIO()
+        call_command("normalize_exercises", "--dry-run", stdout=out)
+        self.assertIn("Stale rows: 2 in 1 lesson(s)", out.getvalue())
+        self.assertEqual(FillBlankExercise.objects.get(pk=fill.pk).correct_answer_normalized, "che")
+
+        call_command("normalize_exercises", stdout=StringIO())
+        self.assertEqual(FillBlankExercise.objects.get(pk=fill.pk).correct_answer_normalized, "ñande")
+        self.assertEqual(MatchingPair.objects.get().left_normalized, "nde")
+        self.assertEqual(self._score("fillblank", fill.id, "ñande"), (100.0, True))
+        out = StringIO()
+        call_command("normalize_exercises", stdout=out)
+        self.assertIn("Stale rows: 0", out.getvalue())
@@ -0,0 +1,90 @@
+# learning/tests/test_result_queue.py
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+
+from learning.models import AppliedResultSegment, FillBlankExercise, Lesson, UserExerciseResult
+from learning.services import result_queue
+from learning.services.lesson_progress import ResultUpdate
+
+User = get_user_model()
+
+
+class ResultQueueTests(TransactionTestCase):
+    """Write-behind queue: the worker outlives a failed flush, journal replay is idempotent."""
+
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir, ignore_errors=True)
+        self.user = User.objects.create_user("learner", password="x")
+        self.lesson = Lesson.objects.create(title="Lesson")
+        self.exercise = FillBlankExercise.objects.create(lesson=self.lesson, prompt_text="____", correct_answer="che")
+
+    def _update(self):
+        return ResultUpdate(self.user.id, "fillblank", self.exercise.id, self.lesson.id, 80.0, False)
+
+    def _queue(self, interval=0.05, **kwargs):
+        queue = result_queue.ResultQueue(journal_dir=self.journal_dir, interval=interval, **kwargs)
+        with mock.patch("atexit.register"):
+            queue.start()
+        self.addCleanup(queue.stop)
+        return queue
+
+    def _attempts(self):
+        row = UserExerciseResult.objects.filter(user=self.user).first()
+        return row.attempts if row else 0
+
+    def _wait_for(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition not reached")
+            time.sleep(0.02)
+
+    def test_worker_survives_failed_flush(self):
+        queue = self._queue()
+        take = result_queue.ResultQueue._take
+        failures = []
+
+        def flaky_take(self):
+            if not failures:
+                failures.append(1)
+                raise OSError("No space left on device")
+            return take(self)
+
+        with mock.patch.object(result_queue.ResultQueue, "_take", flaky_take), \
+                self.assertLogs("learning.services.result_queue", "ERROR"):
+            queue.put(self._update())
+            self._wait_for(lambda: self._attempts() == 1)
+        self.assertEqual(failures, [1])
+        self.assertTrue(queue._thread.is_alive())
+        queue.put(self._update())
+        self._wait_for(lambda: self._attempts() == 2)
+
+    def test_replay_skips_applied_segment(self):
+        queue = self._queue(interval=3600)              # the worker stays idle: flushed by hand below
+        queue.put(self._update())
+        queue.put(self._update())
+        # Crash between the commit and the segment's removal
+        with mock.patch.object(result_queue.os, "remove", side_effect=OSError("killed")), \
+                self.assertLogs("learning.services.result_queue", "ERROR"):
+            self.assertEqual(queue.flush(), 1)
+        self.assertEqual(self._attempts(), 2)
+        segments = [name for name in os.listdir(self.journal_dir) if name.endswith(".jsonl")]
+        self.assertEqual(len(segments), 2)                  # the applied one and the open one
+        self.assertEqual(AppliedResultSegment.objects.count(), 1)
+
+        # The process is gone: its lock is released and the journal replayed
+        queue._journal.close()
+        queue._journal = None
+        queue._lock_file.close()
+        queue._lock_file = None
+        self.assertEqual(result_queue.recover(self.journal_dir), 0)
+        self.assertEqual(self._attempts(), 2)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+        self.assertFalse(AppliedResultSegment.objects.exists())
@@ -0,0 +1,119 @@
+# learning/tests/test_scoring.py
+import random
+
+from django.test import SimpleTestCase
+
+from learning.services.scoring import PASS_RATIO, AnswerMatcher, best_ratio, levenshtein_ratio, reference_ratio
+
+LETTERS = "aeiouyãẽĩõũỹñgjkmnprstvh'"
+# Puso look-alikes, g + combining tilde (no precomposed g̃), capitals and spaces
+GUARANI_PIECES = ["'", "\u2019", "\u02bc", "g\u0303", "\u0303", "Ñ", "Ỹ", "Ã", " ", "  ", "mba'e", "ñe'ẽ", "porã"]
+
+
+def _sentence(rng, vocab):
+    return " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 6)))
+
+
+def _typo(rng, text, edits):
+    chars = list(text)
+    for _ in range(edits):
+        i = rng.randint(0, max(0, len(chars) - 1))
+        op = rng.randint(0, 2)
+        if op == 0:
+            chars.insert(i, rng.choice("aeiouñ'ỹ "))
+        elif chars and op == 1:
+            chars.pop(i)
+        elif chars:
+            chars[i] = rng.choice("aeiouñ'ỹ")
+    return " ".join("".join(chars).split())     # normalize_answer form
+
+
+def _outcome(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except ZeroDivisionError:
+        return ZeroDivisionError     # both sides blank after strip: the original matrix version raised too
+
+
+class LevenshteinTests(SimpleTestCase):
+    """The bit-parallel ratios equal the original full-matrix ones (scoring.reference_ratio)."""
+
+    def setUp(self):
+        self.rng = random.Random(21)
+
+    def _text(self, max_pieces=12):
+        pieces = list(LETTERS) + GUARANI_PIECES
+        return "".join(self.rng.choice(pieces) for _ in range(self.rng.randint(0, max_pieces)))
+
+    def _pairs(self):
+        fixed = ["", " ", "   ", "a", "A ", "mba'e", "mba\u2019e", " ñe'ẽ ", "ñe\u02bcẽ", "g\u0303uahẽ", "guahẽ"]
+        for a in fixed:
+            for b in fixed:
+                yield a, b
+        for _ in range(3000):
+            a = self._text()
+            yield a, (_typo(self.rng, a, self.rng.randint(0, 4)) if self.rng.random() < 0.5 else self._text())
+        for _ in range(50):
+            a = self._text(max_pieces=120)
+            yield a, _typo(self.rng, a, self.rng.randint(0, 15))
+
+    def test_ratio_matches_matrix(self):
+        for a, b in self._pairs():
+            self.assertEqual(_outcome(levenshtein_ratio, a, b), _outcome(reference_ratio, a, b), (a, b))
+
+    def test_cutoff_returns_ratio_or_zero(self):
+        for a, b in self._pairs():
+            expected = _outcome(reference_ratio, a, b)
+            for cutoff in (50.0, 75.0, 90.0, 99.5, 100.0):
+                want = expected if expected is ZeroDivisionError or expected >= cutoff else 0.0
+                self.assertEqual(_outcome(levenshtein_ratio, a, b, score_cutoff=cutoff), want, (a, b, cutoff))
+
+    def test_best_ratio_is_max_over_candidates(self):
+        for _ in range(500):
+            answer = self._text() or "a"
+            if not answer.strip():
+                continue
+            candidates = [self._text() for _ in range(self.rng.randint(0, 12))]
+            candidates = [c for c in candidates if c.strip()] + [_typo(self.rng, answer, 2)]
+            self.assertEqual(
+                best_ratio(answer, candidates),
+                max(reference_ratio(answer, c) for c in candidates),
+                (answer, candidates),
+            )
+
+
+class AnswerMatcherTests(SimpleTestCase):
+    """AnswerMatcher.best scores exactly like best_ratio over the plain list."""
+
+    def setUp(self):
+        self.rng = random.Random(22)
+        self.vocab = ["".join(self.rng.choice(LETTERS) for _ in range(self.rng.randint(1, 8))) for _ in range(300)]
+
+    def test_same_score_as_list(self):
+        for _ in range(400):
+            answers = [_sentence(self.rng, self.vocab) for _ in range(self.rng.randint(1, 40))]
+            matcher = AnswerMatcher(answers)
+            for _ in range(5):
+                if self.rng.random() < 0.8:
+                    submission = _typo(self.rng, self.rng.choice(answers), self.rng.randint(0, 6))
+                else:
+                    submission = _sentence(self.rng, self.vocab)
+                expected = 100.0 if submission in answers else best_ratio(submission, answers)
+                score, match = matcher.best(submission)
+                self.assertEqual(score, expected, (answers, submission))
+                if match is not None:
+                    self.assertEqual(levenshtein_ratio(submission, match), score)
+
+    def test_segment_index_finds_every_passing_answer(self):
+        answers = list({_sentence(self.rng, self.vocab) for _ in range(600)})
+        matcher = AnswerMatcher(answers)
+        for _ in range(150):
+            submission = _typo(self.rng, self.rng.choice(answers), self.rng.randint(1, 4))
+            passing = {a for a in answers if levenshtein_ratio(submission, a) >= PASS_RATIO}
+            found = {matcher._texts[i] for i in matcher._passing(submission)}
+            self.assertLessEqual(passing, found, submission)
+
+    def test_empty(self):
+        self.assertEqual(AnswerMatcher([]).best("mba'e"), (0.0, None))
+        self.assertEqual(AnswerMatcher(["", "che"]).best(""), (100.0, ""))
+        self.assertEqual(AnswerMatcher(["che"]).best(""), (0.0, None))
@@ -0,0 +1,132 @@
+# learning/tests/test_srs_grading.py
+import random
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+
+from learning.models import Flashcard, ReviewLog, SRSDeck, SRSThetaEvent, SRSUserState
+from learning.services import srs_counters, srs_theta
+from learning.services.srs_grading import grade_review
+
+User = get_user_model()
+
+
+class ConcurrentGradeTests(TransactionTestCase):
+    """Many parallel grades of one deck: no lost theta update, no counter drift."""
+
+    CARDS = 240
+    THREADS = 8
+    THETA = 0.3
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.user = User.objects.create_user("learner", password="x")
+        self.deck = SRSDeck.objects.create(user=self.user, name="deck")
+        Flashcard.objects.bulk_create([
+            Flashcard(user=self.user, deck=self.deck, front_text_es=f"es{i}", back_text_gn=f"gn{i}",
+                      ai_difficulty=rng.uniform(-1.5, 1.5))
+            for i in range(self.CARDS)
+        ])
+        self.state = SRSUserState.objects.create(user=self.user, deck=self.deck, theta=self.THETA)
+        srs_counters.reconcile(self.state)
+        self.difficulty = dict(Flashcard.objects.filter(deck=self.deck).values_list("id", "ai_difficulty"))
+        self.ratings = {card_id: rng.choice([1, 2, 3, 4, 5]) for card_id in self.difficulty}
+
+    def _grade(self, card_id):
+        # SQLite lets one writer in at a time: a grade that met a locked database is retried,
+        # unless it committed already (only its after-commit work failed)
+        while not ReviewLog.objects.filter(card_id=card_id).exists():
+            try:
+                card = Flashcard.objects.get(pk=card_id)
+                state = SRSUserState.objects.get(pk=self.state.pk)
+                grade_review(card, state, self.ratings[card_id])
+            except OperationalError:
+                time.sleep(0.002)
+
+    def _run(self, card_ids):
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for card_id in chunk:
+                    self._grade(card_id)
+            except Exception as exc:  # surfaced in the main thread
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(card_ids[i::self.THREADS],)) for i in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_grades(self):
+        self._run(list(self.difficulty))
+
+        logged = list(ReviewLog.objects.filter(user=self.user).order_by("id").values_list("card_id", flat=True))
+        self.assertEqual(len(logged), self.CARDS)
+
+        # theta: each grade commits its ReviewLog row and its theta event together,
+        # so ReviewLog id order is the commit order the sequential result follows
+        expected = srs_theta.replay(self.THETA, [(self.ratings[c] >= 4, self.difficulty[c]) for c in logged])
+        state = SRSUserState.objects.get(pk=self.state.pk)
+        srs_theta.refresh(state)
+        self.assertAlmostEqual(state.theta, expected, places=9)
+        srs_theta.fold(state.pk)
+        state.refresh_from_db()
+        self.assertAlmostEqual(state.theta, expected, places=9)
+
+        # Deck counters: every after-commit F() delta landed (none failed and flagged the deck)
+        self.assertIsNotNone(state.counters_synced_at)
+        fresh = srs_counters.count(self.user.id, self.deck.id)
+        self.assertEqual(
+            (state.new_count, state.review_count, state.suspended_count),
+            (fresh["new_count"], fresh["review_count"], fresh["suspended_count"]),
+        )
+        self.assertEqual(srs_counters.histogram(self.user.id, self.deck.id), fresh["due_histogram"])
+        self.assertEqual(fresh["new_count"] + fresh["review_count"], self.CARDS)
+
+
+class ThetaFoldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("learner", password="x")
+        self.deck = SRSDeck.objects.create(user=self.user, name="deck")
+        self.card = Flashcard.objects.create(user=self.user, deck=self.deck, front_text_es="es", back_text_gn="gn")
+        self.state = SRSUserState.objects.create(user=self.user, deck=self.deck, theta=0.2)
+        srs_counters.reconcile(self.state)
+
+    def test_event_committed_below_checkpoint_is_folded(self):
+        first = SRSThetaEvent.objects.create(state=self.state, correct=True, difficulty=0.5)
+        SRSThetaEvent.objects.create(state=self.state, correct=False, difficulty=-0.5)
+        srs_theta.fold(self.state.pk)
+        # PostgreSQL/MySQL: an event holding a lower id can commit after a higher one was folded
+        SRSThetaEvent.objects.create(id=first.pk, state=self.state, correct=True, difficulty=1.0)
+        expected = srs_theta.replay(0.2, [(True, 0.5), (False, -0.5), (True, 1.0)])
+
+        self.state.refresh_from_db()
+        self.assertEqual(srs_theta.refresh(self.state), 1)
+        self.assertAlmostEqual(self.state.theta, expected, places=12)
+        self.assertAlmostEqual(srs_theta.fold(self.state.pk), expected, places=12)
+        self.assertFalse(SRSThetaEvent.objects.filter(state=self.state).exists())
+
+    def test_failed_after_commit_work_does_not_fail_the_grade(self):
+        locked = OperationalError("database is locked")
+        with mock.patch.object(srs_counters, "record", side_effect=locked), \
+                mock.patch.object(srs_theta, "fold", side_effect=locked), \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            grade_review(self.card, self.state, 4)
+            srs_theta.fold_on_commit(self.state.pk)
+        self.assertEqual(len(callbacks), 2)
+        self.assertTrue(ReviewLog.objects.filter(card=self.card).exists())
+        # The counters are left to reconcile on the next read, the theta event to the next fold
+        self.state.refresh_from_db()
+        self.assertIsNone(self.state.counters_synced_at)
+        self.assertEqual(SRSThetaEvent.objects.filter(state=self.state).count(), 1)
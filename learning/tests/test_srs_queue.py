@@ -0,0 +1,67 @@
+# learning/tests/test_srs_queue.py
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from learning.models import Flashcard, SRSDeck
+from learning.services import srs_queue
+
+User = get_user_model()
+
+
+class QueueRaceTests(TestCase):
+    """Two writers patching one cached queue: neither change is lost."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user("learner", password="x")
+        self.deck = SRSDeck.objects.create(user=self.user, name="deck")
+        past = timezone.now() - timedelta(hours=1)
+        Flashcard.objects.bulk_create([
+            Flashcard(user=self.user, deck=self.deck, front_text_es=f"es{i}", back_text_gn=f"gn{i}",
+                      repetitions=1, interval_days=1, due_at=past)
+            for i in range(3)
+        ])
+        self.cards = list(Flashcard.objects.filter(deck=self.deck).order_by("id"))
+
+    def _due(self):
+        return [cid for cid, _ in srs_queue.session_card_ids(self.user.id, self.deck.id, 10, 0)]
+
+    def _reschedule(self, card):
+        # As grading does, minus the signal: the test drives the refreshes itself
+        card.due_at = timezone.now() + timedelta(days=3)
+        Flashcard.objects.filter(pk=card.pk).update(due_at=card.due_at)
+
+    def test_interleaved_refreshes(self):
+        first, second, third = self.cards
+        self.assertEqual(self._due(), [first.id, second.id, third.id])
+        self._reschedule(first)
+        self._reschedule(second)
+        place = srs_queue._place
+
+        def place_with_second_writer(queue, card_id, *args):
+            # second's refresh runs between first's read and write of the queue
+            if card_id == first.id:
+                with mock.patch.object(srs_queue, "_place", place):
+                    srs_queue.refresh_card(second)
+            place(queue, card_id, *args)
+
+        with mock.patch.object(srs_queue, "_place", place_with_second_writer):
+            srs_queue.refresh_card(first)
+        self.assertEqual(self._due(), [third.id])
+
+    def test_sequential_refreshes_patch_in_place(self):
+        first, second, third = self.cards
+        self._due()
+        self._reschedule(first)
+        srs_queue.refresh_card(first)
+        srs_queue.remove_card(third)
+        with mock.patch.object(srs_queue, "build_queue", side_effect=AssertionError("rebuilt")):
+            self.assertEqual(self._due(), [second.id])
+        srs_queue.invalidate(self.user.id, self.deck.id)     # third is still due in the database
+        self.assertEqual(self._due(), [second.id, third.id])
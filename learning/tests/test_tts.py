@@ -0,0 +1,154 @@
+# learning/tests/test_tts.py
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from learning.services.tts import Job, TTSBusy, TTSError, TTSPool
+
+# Stand-in for the espeak-ng executable: writes a short WAV to -w, or hangs on the text "slow"
+STUB_ENGINE = f"""#!{sys.executable}
+import sys, time, wave
+args = sys.argv[1:]
+if args[-1] == "slow":
+    time.sleep(5)
+with wave.open(args[args.index("-w") + 1], "wb") as w:
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(22050)
+    w.writeframes(bytes(200))
+"""
+
+
+class TTSPoolTests(SimpleTestCase):
+    """The worker pool against a stub engine: busy queue, timeouts and recycling."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.mkdtemp()
+        cls.exe = os.path.join(cls.tmp, "espeak-ng")
+        with open(cls.exe, "w") as f:
+            f.write(STUB_ENGINE)
+        os.chmod(cls.exe, os.stat(cls.exe).st_mode | stat.S_IXUSR)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def _pool(self, **kwargs):
+        config = {"library": None, "data_path": None, "exe": self.exe, "timeout": 60.0}
+        pool = TTSPool(config=config, **kwargs)
+        self.addCleanup(pool.stop)
+        return pool
+
+    def _job(self, text="mba'éichapa"):
+        return Job(os.path.join(self.tmp, f"{text}-{time.monotonic_ns()}.wav"), text, "gn")
+
+    def _wait_until(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition not reached")
+            time.sleep(0.01)
+
+    def test_job_writes_wav(self):
+        pool = self._pool(size=1, queue_size=0)
+        job = self._job()
+        pool.run(job)
+        self.assertTrue(os.path.getsize(job.wav_path) > 0)
+        self.assertEqual(pool._idle.qsize(), 1)
+
+    def test_busy_when_queue_full(self):
+        pool = self._pool(size=1, queue_size=0, timeout=2.0)
+        errors = []
+
+        def slow():
+            try:
+                pool.run(self._job("slow"))
+            except TTSError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=slow)
+        thread.start()
+        self._wait_until(lambda: pool._idle.qsize() == 0)
+        with self.assertRaises(TTSBusy):
+            pool.run(self._job())
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertNotIsInstance(errors[0], TTSBusy)
+
+    def test_waiting_for_worker_times_out_without_growing_pool(self):
+        pool = self._pool(size=1, queue_size=1, timeout=0.5)
+        worker = pool._idle.get()            # held elsewhere for the whole wait
+        with self.assertRaisesMessage(TTSError, "timed out waiting"):
+            pool.run(self._job())
+        self.assertEqual(pool._idle.qsize(), 0)
+        pool._idle.put(worker)
+        pool.run(self._job())
+        self.assertEqual(pool._idle.qsize(), 1)
+        self.assertEqual(pool.spawned, 1)
+
+    def test_job_timeout_replaces_worker(self):
+        pool = self._pool(size=1, queue_size=0, timeout=1.0)
+        worker = pool._idle.queue[0]
+        with self.assertRaisesMessage(TTSError, "TTS job timed out"):
+            pool.run(self._job("slow"))
+        self._wait_until(lambda: pool._idle.qsize() == 1)
+        self.assertFalse(worker.process.is_alive())
+        self.assertEqual(pool.spawned, 2)
+        pool.run(self._job())
+        self.assertEqual(pool._idle.qsize(), 1)
+
+    def test_worker_recycled_after_max_jobs(self):
+        pool = self._pool(size=1, queue_size=0, max_jobs=2)
+        first = pool._idle.queue[0]
+        pool.run(self._job())
+        self.assertIs(pool._idle.queue[0], first)
+        pool.run(self._job())
+        self._wait_until(lambda: pool._idle.qsize() == 1)
+        self.assertIsNot(pool._idle.queue[0], first)
+        self.assertFalse(first.process.is_alive())
+        self.assertEqual(pool.spawned, 2)
+        pool.run(self._job())
+        self.assertEqual(pool._idle.queue[0].jobs, 1)
+
+    def test_replacement_starts_off_the_request_thread(self):
+        pool = self._pool(size=1, queue_size=1, max_jobs=1)
+        spawn = TTSPool._spawn
+        started = threading.Event()
+
+        def slow_spawn(self):
+            started.wait(5)                     # held until the retiring job has returned
+            return spawn(self)
+
+        with mock.patch.object(TTSPool, "_spawn", slow_spawn):
+            began = time.monotonic()
+            pool.run(self._job())                # retires the worker (max_jobs=1)
+            self.assertLess(time.monotonic() - began, 2.0)
+            self.assertEqual(pool._idle.qsize(), 0)
+            started.set()
+            pool.run(self._job())                # waits for the replacement, not for a start of its own
+        self.assertEqual(pool.spawned, 2)
+
+    def test_failed_start_retried_in_background(self):
+        pool = self._pool(size=1, queue_size=0, max_jobs=1)
+        with mock.patch.object(TTSPool, "_spawn", lambda self: None):
+            pool.run(self._job())
+            self._wait_until(lambda: pool._idle.qsize() == 1)
+            self.assertIsNone(pool._idle.queue[0])
+            with self.assertRaisesMessage(TTSError, "no TTS worker could be started"):
+                pool.run(self._job())
+            self._wait_until(lambda: pool._idle.qsize() == 1)
+        self.assertIsNone(pool._idle.queue[0])
+        with self.assertRaisesMessage(TTSError, "no TTS worker could be started"):
+            pool.run(self._job())
+        self._wait_until(lambda: pool._idle.qsize() == 1 and pool._idle.queue[0] is not None)
+        pool.run(self._job())
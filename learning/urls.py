@@ -14,6 +14,8 @@ urlpatterns = [
     path("api/exercises/fillblank/", views.api_submit_fillblank, name="api_submit_fillblank"),
     path("api/exercises/mcq/", views.api_submit_mcq, name="api_submit_mcq"),
     path("api/exercises/matching/", views.api_submit_matching, name="api_submit_matching"),
+    path("api/lessons/<int:pk>/bundle/", views.api_lesson_bundle, name="api_lesson_bundle"),
+    path("api/lessons/<int:pk>/submit/", views.api_lesson_submit, name="api_lesson_submit"),
     path("api/pronunciation/attempt/", views.api_save_pronunciation_attempt, name="api_save_pronunciation_attempt"),
     path("api/azure/token/", views.api_azure_token, name="api_azure_token"),
 
@@ -22,6 +24,11 @@ urlpatterns = [
     path("api/srs/sync/", views.api_srs_sync, name="api_srs_sync"),
     path("api/srs/next/", views.api_srs_next, name="api_srs_next"),
     path("api/srs/grade/", views.api_srs_grade, name="api_srs_grade"),
+    path("api/srs/session/", views.api_srs_session, name="api_srs_session"),
+    path("api/srs/grade-batch/", views.api_srs_grade_batch, name="api_srs_grade_batch"),
+    path("api/srs/decks/", views.api_srs_decks, name="api_srs_decks"),
+    path("api/srs/decks/<int:deck_id>/subscribe/", views.api_srs_subscribe, name="api_srs_subscribe"),
+    path("api/srs/decks/<int:deck_id>/unsubscribe/", views.api_srs_unsubscribe, name="api_srs_unsubscribe"),
 
     path("api/glossary/bulk-add/", views.api_glossary_bulk_add, name="api_glossary_bulk_add"),
     path("api/glossary/<int:entry_id>/favorite/", views.api_glossary_toggle_favorite, name="api_glossary_toggle_favorite"),
@@ -29,6 +36,7 @@ urlpatterns = [
 
     # SRS state/mode
 path("api/srs/state/", views.api_srs_state, name="api_srs_state"),
+path("api/srs/forecast/", views.api_srs_forecast, name="api_srs_forecast"),
 path("api/srs/set-mode/", views.api_srs_set_mode, name="api_srs_set_mode"),
 
     path("exercises/", views.exercises_view, name="exercises"),
@@ -5,13 +5,12 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
-from django.contrib.contenttypes.models import ContentType
-from django.db.models import Avg, Q
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.generic import TemplateView
-from .models import DragDropExercise, ListeningExercise, TranslationExercise
+from .models import DragDropExercise
 from .serializers import DragDropSubmissionSerializer, ListeningSubmissionSerializer, TranslationSubmissionSerializer
 from django.views.decorators.http import require_http_methods
 from django.core.files.base import ContentFile
@@ -22,25 +21,27 @@ from rest_framework.response import Response
 from .forms import SignUpForm
 from .models import (
     Lesson, LessonSection,
-    FillBlankExercise, MultipleChoiceExercise, MatchingExercise, MatchingPair,
+    FillBlankExercise, MultipleChoiceExercise, MatchingPair,
     PronunciationExercise, GlossaryEntry, WordPhrase,
-    UserExerciseResult, PronunciationAttempt, UserLessonProgress,
-    SRSDeck, Flashcard, ReviewLog, SRSUserState,
+    PronunciationAttempt, UserLessonProgress,
+    SRSDeck, Flashcard, SRSUserState, SRSSubscription,
 )
 from .serializers import (
     FillBlankSubmissionSerializer, MCQSubmissionSerializer, MatchingSubmissionSerializer,
     PronunciationAttemptSerializer, TranslationRequestSerializer, GlossaryEntrySerializer,
     SRSGradeSerializer, BulkGlossaryListSerializer,
+    SRSSessionSerializer, SRSBatchGradeSerializer, SRSForecastSerializer, LessonSubmissionSerializer,
 )
 from .services.translation import translate_es_to_gn
 from .services.azure_speech import issue_azure_speech_token
-from .services.scoring import levenshtein_ratio
-from .services.ai_srs import grade_and_schedule
+from .services.srs_grading import grade_review, grade_reviews
+from .services.glossary_sync import sync_deck
+from .services import answer_keys, lesson_content, lesson_progress, lesson_submit, result_queue, shared_decks, srs_counters, srs_forecast, srs_queue, srs_retrievability, srs_theta, tts
 from .services.ai_openrouter import openrouter_ai
 
 # learning/views.py
-import os, hashlib, subprocess, shutil, re, json, logging
-from django.http import FileResponse, JsonResponse, HttpResponse
+import os, hashlib, re, json, logging
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -59,8 +60,7 @@ def tts_view(request):
     if len(text) > 240:
         text = text[:240]
 
-    exe = getattr(settings, "ESPEAK_NG_EXE", None) or shutil.which("espeak-ng") or shutil.which("espeak")
-    if not exe:
+    if not tts.available():
         return JsonResponse({"error": "espeak-ng not found"}, status=501)
 
     # Cache por lang+texto
@@ -70,18 +70,13 @@ def tts_view(request):
     wav_path = os.path.join(cache_dir, f"{lang}-{h}.wav")
 
     if not os.path.exists(wav_path):
-        cmd = [exe, "-v", lang, "-s", "165", "-p", "30", "-w", wav_path, text]
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError:
-            if lang.lower() != "gn":
-                try:
-                    subprocess.run([exe, "-v", "gn", "-s", "165", "-p", "30", "-w", wav_path, text],
-                                   check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                except Exception:
-                    return JsonResponse({"error": "TTS failed"}, status=500)
-            else:
-                return JsonResponse({"error": "TTS failed"}, status=500)
+            tts.synthesize(wav_path, text, lang, fallback_voice="gn" if lang.lower() != "gn" else None,
+                           speed=165, pitch=30)
+        except tts.TTSBusy:
+            return JsonResponse({"error": "TTS busy"}, status=503, headers={"Retry-After": "1"})
+        except tts.TTSError:
+            return JsonResponse({"error": "TTS failed"}, status=500)
 
     return FileResponse(open(wav_path, "rb"), content_type="audio/wav")
 
@@ -162,7 +157,7 @@ def api_ai_pronunciation_analysis(request):
         exercise_id = request.data.get("exercise_id")
         if exercise_id:
             exercise = get_object_or_404(PronunciationExercise, pk=exercise_id)
-            PronunciationAttempt.objects.create(
+            attempt = PronunciationAttempt.objects.create(
                 user=request.user,
                 exercise=exercise,
                 expected_text=expected_text,
@@ -171,7 +166,7 @@ def api_ai_pronunciation_analysis(request):
                 completeness_score=analysis["completeness_score"],
                 prosody_score=analysis["prosody_score"],
             )
-            _update_lesson_progress(request.user, exercise.lesson)
+            lesson_progress.record_pronunciation(request.user.id, exercise.lesson_id, exercise.id, attempt.accuracy_score)
 
         return Response(analysis, status=200)
     except Exception as e:
@@ -938,16 +933,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         due_reviews = 0
         allowed_new = 0
         try:
-            deck, _ = SRSDeck.objects.get_or_create(user=user, name="Mi Glosario")
-            state, _ = SRSUserState.objects.get_or_create(user=user, deck=deck)
+            state = _get_default_state(user)
             today = timezone.now().date()
             new_shown = state.new_shown_count if state.new_shown_on == today else 0
-            default_limit = {"beginner": 10, "comfortable": 15, "aggressive": 25}.get(state.mode or "comfortable", 15)
-            limit = state.new_limit or default_limit
+            limit = state.new_limit or _mode_default_limit(state.mode)
             allowed_new = max(0, limit - new_shown)
-            due_reviews = Flashcard.objects.filter(
-                user=user, deck=deck, suspended=False, repetitions__gt=0, due_at__lte=timezone.now()
-            ).count()
+            due_reviews = srs_counters.due_count(state)
         except Exception:
             pass
 
@@ -1163,13 +1154,9 @@ def api_add_enhanced_glossary_entry(request):
 def api_submit_fillblank(request):
     s = FillBlankSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(FillBlankExercise, pk=s.validated_data["exercise_id"])
-    user_answer = s.validated_data["answer"].strip()
-    correct = ex.correct_answer.strip()
-    score = 100.0 if user_answer.lower() == correct.lower() else levenshtein_ratio(user_answer, correct)
-    is_correct = score >= 90.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
+    key = _answer_key("fillblank", s.validated_data["exercise_id"])
+    score, is_correct, _ = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
     return Response({"score": score, "is_correct": is_correct}, status=200)
 
 
@@ -1178,12 +1165,9 @@ def api_submit_fillblank(request):
 def api_submit_mcq(request):
     s = MCQSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(MultipleChoiceExercise, pk=s.validated_data["exercise_id"])
-    selected = s.validated_data["selected_key"].strip().upper()
-    is_correct = selected == ex.correct_key.strip().upper()
-    score = 100.0 if is_correct else 0.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
+    key = _answer_key("mcq", s.validated_data["exercise_id"])
+    score, is_correct, _ = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
     return Response({"score": score, "is_correct": is_correct}, status=200)
 
 
@@ -1192,21 +1176,74 @@ def api_submit_mcq(request):
 def api_submit_matching(request):
     s = MatchingSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(MatchingExercise, pk=s.validated_data["exercise_id"])
-    submitted_pairs = s.validated_data["pairs"]
-    correct_map = {p.left_text.strip().lower(): p.right_text.strip().lower() for p in ex.pairs.all()}
-    total = len(correct_map) or 1
-    correct_count = 0
-    for item in submitted_pairs:
-        left = (item.get("left") or "").strip().lower()
-        right = (item.get("right") or "").strip().lower()
-        if correct_map.get(left) == right:
-            correct_count += 1
-    score = (correct_count / total) * 100.0
-    is_correct = score >= 100.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
-    return Response({"score": score, "correct": correct_count, "total": total}, status=200)
+    key = _answer_key("matching", s.validated_data["exercise_id"])
+    score, is_correct, extra = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
+    return Response({"score": score, **extra}, status=200)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    # "gzip" or "*" listed without q=0
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip().lower()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def api_lesson_bundle(request, pk):
+    """
+    The whole lesson (sections + all exercise types, no answers) as one
+    precompiled JSON document, cached per lesson version
+    (services/lesson_content.py). Strong ETag per content-coding: clients
+    keep it and revalidate with If-None-Match (304, either tag matches);
+    gzip is served pre-compressed.
+    """
+    bundle = lesson_content.bundle(pk)
+    if bundle is None:
+        raise Http404("Lesson not found")
+    gzipped = _accepts_gzip(request.headers.get("Accept-Encoding", ""))
+    etag = bundle.gzip_etag if gzipped else bundle.etag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    tags = {t.strip().removeprefix("W/") for t in request.headers.get("If-None-Match", "").split(",")}
+    if "*" in tags or bundle.etag in tags or bundle.gzip_etag in tags:
+        return HttpResponse(status=304, headers=headers)
+    if gzipped:
+        body, headers["Content-Encoding"] = bundle.gzipped, "gzip"
+    else:
+        body = bundle.body
+    return HttpResponse(body, content_type="application/json; charset=utf-8", headers=headers)
+
+
+@login_required
+@api_view(["POST"])
+def api_lesson_submit(request, pk):
+    """
+    Submit every answer of a lesson at once:
+      { "fillblank": [ {exercise_id, answer} ], "mcq": [ {exercise_id, selected_key} ],
+        "matching": [ {exercise_id, pairs} ], "dragdrop": [ {exercise_id, order} ],
+        "listening": [ {exercise_id, selected_key} ], "translation": [ {exercise_id, answer} ] }
+    (all optional). Scored in memory, results upserted in bulk, progress updated
+    once (see services/lesson_submit.py).
+    """
+    lesson = get_object_or_404(Lesson, pk=pk, is_published=True)
+    s = LessonSubmissionSerializer(data=request.data)
+    s.is_valid(raise_exception=True)
+    try:
+        result = lesson_submit.submit(request.user, lesson, s.validated_data)
+    except lesson_submit.UnknownExercises as e:
+        return Response({"detail": "unknown exercises", "exercise_ids": e.missing}, status=404)
+    return Response({"status": "ok", "lesson_id": lesson.id, **result}, status=200)
 
 
 # ------------- Pronunciation APIs ------------- #
@@ -1226,7 +1263,7 @@ def api_save_pronunciation_attempt(request):
         completeness_score=s.validated_data["completeness_score"],
         prosody_score=s.validated_data.get("prosody_score", 0.0),
     )
-    _update_lesson_progress(request.user, ex.lesson)
+    lesson_progress.record_pronunciation(request.user.id, ex.lesson_id, ex.id, s.validated_data["accuracy_score"])
     return Response({"status": "ok"}, status=201)
 
 
@@ -1243,54 +1280,27 @@ def api_azure_token(request):
 
 # ------------- Internal helpers ------------- #
 
-def _save_user_result(user, exercise_obj, score: float, is_correct: bool):
-    ct = ContentType.objects.get_for_model(type(exercise_obj))
-    obj, created = UserExerciseResult.objects.get_or_create(
-        user=user, content_type=ct, object_id=exercise_obj.id,
-        defaults={"score": score, "is_correct": is_correct, "attempts": 1},
-    )
-    if not created:
-        obj.score = max(obj.score, score)
-        obj.is_correct = obj.is_correct or is_correct
-        obj.attempts += 1
-        obj.save()
-
-
-def _update_lesson_progress(user, lesson):
-    ct_fb = ContentType.objects.get_for_model(FillBlankExercise)
-    ct_mcq = ContentType.objects.get_for_model(MultipleChoiceExercise)
-    ct_match = ContentType.objects.get_for_model(MatchingExercise)
-
-    fb_ids = list(FillBlankExercise.objects.filter(lesson=lesson).values_list("id", flat=True))
-    mcq_ids = list(MultipleChoiceExercise.objects.filter(lesson=lesson).values_list("id", flat=True))
-    match_ids = list(MatchingExercise.objects.filter(lesson=lesson).values_list("id", flat=True))
-
-    written_qs = UserExerciseResult.objects.filter(user=user).filter(
-        Q(content_type=ct_fb, object_id__in=fb_ids) |
-        Q(content_type=ct_mcq, object_id__in=mcq_ids) |
-        Q(content_type=ct_match, object_id__in=match_ids)
-    )
-    written_avg = written_qs.aggregate(avg=Avg("score"))["avg"] or 0.0
-
-    pronun_ex_ids = list(PronunciationExercise.objects.filter(lesson=lesson).values_list("id", flat=True))
-    if pronun_ex_ids:
-        best_per_ex = []
-        for ex_id in pronun_ex_ids:
-            avg_acc = PronunciationAttempt.objects.filter(user=user, exercise_id=ex_id).aggregate(avg=Avg("accuracy_score"))["avg"]
-            if avg_acc is not None:
-                best_per_ex.append(avg_acc)
-        pronun_avg = sum(best_per_ex) / len(best_per_ex) if best_per_ex else 0.0
-    else:
-        pronun_avg = 0.0
+def _answer_key(kind, exercise_id):
+    # Cached answer key of one exercise (services/answer_keys.py), 404 if it does not exist
+    key = answer_keys.get(kind, exercise_id)
+    if key is None:
+        raise Http404("Exercise not found")
+    return key
 
-    progress_percent = 0.5 * written_avg + 0.5 * pronun_avg
 
-    obj, _ = UserLessonProgress.objects.get_or_create(user=user, lesson=lesson)
-    obj.written_score = written_avg
-    obj.pronunciation_confidence = pronun_avg
-    obj.progress_percent = progress_percent
-    obj.completed = progress_percent >= 90.0
-    obj.save()
+def _save_user_result(user, exercise_obj, score: float, is_correct: bool):
+    if result_queue.enabled():
+        # Write-behind: queued, coalesced and stored in batches (services/result_queue.py)
+        result_queue.submit(lesson_progress.ResultUpdate(
+            user.id, answer_keys.KINDS[type(exercise_obj)], exercise_obj.pk, exercise_obj.lesson_id, score, is_correct,
+        ))
+        return
+    # Best result, then lesson progress moved by its delta (services/lesson_progress.py)
+    sum_delta, count_delta = lesson_progress.save_result(user, exercise_obj, score, is_correct)
+    if lesson_progress.is_written(exercise_obj):
+        lesson_progress.record_written(user.id, exercise_obj.lesson_id, sum_delta, count_delta)
+    else:
+        lesson_progress.ensure(user.id, exercise_obj.lesson_id)
 
 
 # ------------- SRS (AI scheduler + mode switcher) ------------- #
@@ -1303,6 +1313,36 @@ def _get_or_create_user_state(user, deck):
     state, _ = SRSUserState.objects.get_or_create(user=user, deck=deck)
     return state
 
+def _get_default_state(user):
+    # One-row read of the default deck's state (with its deck); creates both on first use
+    state = SRSUserState.objects.select_related("deck").filter(
+        user=user, deck__user=user, deck__name="Mi Glosario"
+    ).first()
+    if state is None:
+        state = _get_or_create_user_state(user, _get_or_create_default_deck(user))
+    return srs_counters.ensure(state)
+
+def _get_study_deck(request):
+    # The default glossary deck, or the deck named by deck_id: own or a subscribed shared one
+    raw = request.data.get("deck_id") if request.method == "POST" else request.query_params.get("deck_id")
+    if not raw:
+        return _get_or_create_default_deck(request.user)
+    try:
+        deck_id = int(raw)
+    except (TypeError, ValueError):
+        raise Http404("invalid deck_id")
+    decks = SRSDeck.objects.filter(Q(user=request.user) | Q(is_shared=True, subscriptions__user=request.user))
+    return get_object_or_404(decks.distinct(), pk=deck_id)
+
+def _get_request_state(request):
+    # _get_default_state, or the state of the deck named by deck_id
+    if not (request.data.get("deck_id") if request.method == "POST" else request.query_params.get("deck_id")):
+        return _get_default_state(request.user)
+    deck = _get_study_deck(request)
+    state = _get_or_create_user_state(request.user, deck)
+    state.deck = deck
+    return srs_counters.ensure(state)
+
 def _mode_default_limit(mode: str) -> int:
     return {"beginner": 10, "comfortable": 15, "aggressive": 25}.get(mode or "comfortable", 15)
 
@@ -1325,27 +1365,17 @@ def srs_study_view(request):
     _apply_daily_reset_to_state(state)
     return render(request, "learning/srs_study.html", {"deck": deck})
 
-def _sync_cards_from_glossary(user, deck):
-    existing = set(Flashcard.objects.filter(user=user, deck=deck).values_list("front_text_es", "back_text_gn"))
-    to_create = []
-    for e in GlossaryEntry.objects.filter(user=user):
-        key = (e.source_text_es.strip(), e.translated_text_gn.strip())
-        if key not in existing:
-            to_create.append(Flashcard(
-                user=user, deck=deck,
-                front_text_es=e.source_text_es.strip(),
-                back_text_gn=e.translated_text_gn.strip(),
-                notes=e.notes or "",
-                due_at=timezone.now(),
-            ))
-    if to_create:
-        Flashcard.objects.bulk_create(to_create)
+def _sync_cards_from_glossary(user, deck, force=False):
+    # No-op unless a GlossaryEntry changed since the last sync (see services/glossary_sync.py)
+    if deck.is_shared:
+        return 0  # shared decks get their cards from SharedNote, never from a glossary
+    return sync_deck(deck, force=force)
 
 @login_required
 @api_view(["POST"])
 def api_srs_sync(request):
     deck = _get_or_create_default_deck(request.user)
-    _sync_cards_from_glossary(request.user, deck)
+    _sync_cards_from_glossary(request.user, deck, force=True)
     state = _get_or_create_user_state(request.user, deck)
     _apply_daily_reset_to_state(state)
     return Response({"status": "ok"}, status=200)
@@ -1353,86 +1383,140 @@ def api_srs_sync(request):
 @login_required
 @api_view(["GET"])
 def api_srs_state(request):
-    deck = _get_or_create_default_deck(request.user)
-    state = _get_or_create_user_state(request.user, deck)
+    state = _get_request_state(request)
     _apply_daily_reset_to_state(state)
-    now = timezone.now()
-    due_reviews = Flashcard.objects.filter(
-        user=request.user, deck=deck, suspended=False,
-        repetitions__gt=0, due_at__lte=now
-    ).count()
-    new_available = Flashcard.objects.filter(
-        user=request.user, deck=deck, suspended=False,
-        repetitions=0
-    ).count()
+    return Response(_srs_state_payload(state), status=200)
+
+def _srs_state_payload(state):
+    # Pure read of the denormalized counters (services/srs_counters.py)
     allowed_new = max(0, (state.new_limit or _mode_default_limit(state.mode)) - state.new_shown_count)
-    return Response({
+    return {
         "mode": state.mode,
+        "priority": state.priority,
         "new_limit": state.new_limit,
         "new_shown_today": state.new_shown_count,
         "allowed_new_today": allowed_new,
-        "due_review_count": due_reviews,
-        "new_available_count": new_available,
-    }, status=200)
+        "due_review_count": srs_counters.due_count(state),
+        "new_available_count": state.new_count + (
+            shared_decks.unseen_count(state.user_id, state.deck) if state.deck.is_shared else 0
+        ),
+        "suspended_count": state.suspended_count,
+    }
+
+@login_required
+@api_view(["GET"])
+def api_srs_forecast(request):
+    """
+    Review workload for the next N days: ?days=30 ->
+      { "overdue", "review_cards", "new_cards", "days": [ {date, due, retention}, ... ] }
+    retention = mean predicted recall of the review cards that day if none is reviewed.
+    """
+    s = SRSForecastSerializer(data=request.query_params)
+    s.is_valid(raise_exception=True)
+    state = _get_request_state(request)
+    return Response(srs_forecast.forecast(state, s.validated_data["days"]), status=200)
 
 @login_required
 @api_view(["POST"])
 def api_srs_set_mode(request):
     mode = (request.data.get("mode") or "").lower().strip()
-    if mode not in {"beginner", "comfortable", "aggressive"}:
+    priority = (request.data.get("priority") or "").lower().strip()
+    if mode and mode not in {"beginner", "comfortable", "aggressive"}:
         return Response({"detail": "invalid mode"}, status=400)
-    deck = _get_or_create_default_deck(request.user)
-    state = _get_or_create_user_state(request.user, deck)
-    state.mode = mode
-    state.new_limit = _mode_default_limit(mode)
-    state.save(update_fields=["mode", "new_limit", "updated_at"])
+    if priority and priority not in dict(SRSUserState.PRIORITY_CHOICES):
+        return Response({"detail": "invalid priority"}, status=400)
+    if not mode and not priority:
+        return Response({"detail": "invalid mode"}, status=400)
+    state = _get_request_state(request)
+    fields = ["updated_at"]
+    if mode:
+        state.mode = mode
+        state.new_limit = _mode_default_limit(mode)
+        fields += ["mode", "new_limit"]
+    if priority:
+        state.priority = priority
+        fields.append("priority")
+    state.save(update_fields=fields)
     _apply_daily_reset_to_state(state)
-    return api_srs_state(request)
+    return Response(_srs_state_payload(state), status=200)
+
+def _srs_card_payload(card):
+    front, back, notes = card.texts()
+    return {
+        "id": card.id,
+        "front_es": front,
+        "back_gn": back,
+        "notes": notes,
+        "due_at": card.due_at.isoformat(),
+        "interval_days": card.interval_days,
+        "repetitions": card.repetitions,
+        "ease_factor": round(card.ease_factor, 2),
+        "ai_difficulty": round(card.ai_difficulty, 2),
+        "half_life_days": round(card.half_life_days, 2),
+    }
+
+def _srs_pick_cards(user, deck, state, size, allowed_new, now):
+    """
+    Up to `size` (card, kind) pairs: reviews first, ordered by state.priority
+    (oldest due_at, or lowest predicted recall), then new cards within allowed_new.
+    Stale cache entries trigger one rebuild from the database.
+    """
+    by_recall = state.priority == "retrievability"
+    if by_recall:
+        srs_theta.refresh(state)
+    if deck.is_shared and allowed_new > 0:
+        # Subscribed deck: create cards for just enough unseen notes to fill the new slots
+        srs_counters.ensure(state)
+        shared_decks.materialize(user.id, deck, min(size, allowed_new) - state.new_count, now)
+    cards = []
+    for _attempt in range(2):
+        if by_recall:
+            picked = [(cid, "review") for cid, _p in srs_retrievability.lowest(user.id, deck.id, state.theta, k=size, now=now)]
+            picked += srs_queue.session_card_ids(user.id, deck.id, size - len(picked), allowed_new, now, include_due=False)
+        else:
+            picked = srs_queue.session_card_ids(user.id, deck.id, size, allowed_new, now)
+        by_id = Flashcard.objects.filter(
+            user=user, deck=deck, suspended=False, pk__in=[cid for cid, _ in picked]
+        ).select_related("note").in_bulk()
+        cards = [
+            (by_id[cid], kind) for cid, kind in picked
+            if cid in by_id and (
+                (kind == "new" and by_id[cid].repetitions == 0) or
+                (kind == "review" and by_id[cid].repetitions > 0 and (by_recall or by_id[cid].due_at <= now))
+            )
+        ]
+        if len(cards) == len(picked):
+            break
+        srs_queue.build_queue(user.id, deck.id, now)
+        srs_retrievability.build_index(user.id, deck.id)
+    return cards
 
 @login_required
 @api_view(["POST"])
 def api_srs_next(request):
-    deck = _get_or_create_default_deck(request.user)
+    deck = _get_study_deck(request)
     _sync_cards_from_glossary(request.user, deck)
     state = _get_or_create_user_state(request.user, deck)
     _apply_daily_reset_to_state(state)
 
     now = timezone.now()
 
-    # 1) Prefer due review cards (repetitions > 0)
-    qs = Flashcard.objects.filter(
-        user=request.user, deck=deck, suspended=False,
-        repetitions__gt=0, due_at__lte=now
-    ).order_by("due_at")
-    card = qs.first()
-    if not card:
-        # 2) Otherwise allow new cards (repetitions == 0) within today's cap
-        allowed_new = max(0, (state.new_limit or _mode_default_limit(state.mode)) - state.new_shown_count)
+    # Reviews first (ordered by state.priority), then new cards within today's cap.
+    # Answered from the cached queue/index + one pk fetch.
+    allowed_new = max(0, (state.new_limit or _mode_default_limit(state.mode)) - state.new_shown_count)
+    picked = _srs_pick_cards(request.user, deck, state, 1, allowed_new, now)
+    if not picked:
         if allowed_new <= 0:
             return Response({"detail": "no_cards", "reason": "new_cap_reached"}, status=200)
-        card = Flashcard.objects.filter(
-            user=request.user, deck=deck, suspended=False, repetitions=0
-        ).order_by("created_at").first()
-        if not card:
-            return Response({"detail": "no_cards"}, status=200)
+        return Response({"detail": "no_cards"}, status=200)
+    card, kind = picked[0]
+    if kind == "new":
         # Count it as a shown new card for today
         state.new_shown_on = now.date()
         state.new_shown_count += 1
         state.save(update_fields=["new_shown_on", "new_shown_count", "updated_at"])
 
-    data = {
-        "id": card.id,
-        "front_es": card.front_text_es,
-        "back_gn": card.back_text_gn,
-        "notes": card.notes,
-        "due_at": card.due_at.isoformat(),
-        "interval_days": card.interval_days,
-        "repetitions": card.repetitions,
-        "ease_factor": round(card.ease_factor, 2),
-        "ai_difficulty": round(card.ai_difficulty, 2),
-        "half_life_days": round(card.half_life_days, 2),
-    }
-    return Response({"card": data}, status=200)
+    return Response({"card": _srs_card_payload(card)}, status=200)
 
 @login_required
 @api_view(["POST"])
@@ -1443,13 +1527,7 @@ def api_srs_grade(request):
     rating = s.validated_data["rating"]
 
     state = _get_or_create_user_state(request.user, card.deck)
-    interval, half_life, p0 = grade_and_schedule(card, state, rating)
-
-    ReviewLog.objects.create(
-        user=request.user, card=card, rating=rating,
-        interval_before=card.interval_days, interval_after=interval,
-        ef_before=card.ease_factor, ef_after=card.ease_factor,
-    )
+    interval, half_life, p0 = grade_review(card, state, rating)
 
     return Response({
         "status": "ok",
@@ -1459,6 +1537,91 @@ def api_srs_grade(request):
         "pred_mastery": round(p0, 2),
     }, status=200)
 
+@login_required
+@api_view(["POST"])
+def api_srs_session(request):
+    """
+    Next N cards in one call: { "size": 20 } -> { "cards": [...], "reason"? }
+    Reviews first (see _srs_pick_cards), then new cards within today's cap (counted as shown).
+    """
+    s = SRSSessionSerializer(data=request.data)
+    s.is_valid(raise_exception=True)
+    size = s.validated_data["size"]
+
+    deck = _get_study_deck(request)
+    _sync_cards_from_glossary(request.user, deck)
+    state = _get_or_create_user_state(request.user, deck)
+    _apply_daily_reset_to_state(state)
+
+    now = timezone.now()
+    allowed_new = max(0, (state.new_limit or _mode_default_limit(state.mode)) - state.new_shown_count)
+    cards = _srs_pick_cards(request.user, deck, state, size, allowed_new, now)
+
+    shown_new = sum(1 for _, kind in cards if kind == "new")
+    if shown_new:
+        state.new_shown_on = now.date()
+        state.new_shown_count += shown_new
+        state.save(update_fields=["new_shown_on", "new_shown_count", "updated_at"])
+
+    data = {"cards": [dict(_srs_card_payload(card), kind=kind) for card, kind in cards]}
+    if not cards and allowed_new <= 0:
+        data["reason"] = "new_cap_reached"
+    return Response(data, status=200)
+
+@login_required
+@api_view(["POST"])
+def api_srs_grade_batch(request):
+    """
+    Grade a whole session at once:
+      { "reviews": [ {card_id, rating, reviewed_at?}, ... ] }   (in grading order)
+    grade_and_schedule is applied sequentially in memory, then everything is
+    written in one transaction (see services/srs_grading.grade_reviews).
+    """
+    s = SRSBatchGradeSerializer(data=request.data)
+    s.is_valid(raise_exception=True)
+    reviews = s.validated_data["reviews"]
+
+    now = timezone.now()
+    cards = Flashcard.objects.filter(
+        user=request.user, pk__in={r["card_id"] for r in reviews}
+    ).in_bulk()
+    missing = sorted({r["card_id"] for r in reviews} - set(cards))
+    if missing:
+        return Response({"detail": "unknown cards", "card_ids": missing}, status=404)
+
+    results = grade_reviews(request.user.id, cards, reviews, now)
+
+    return Response({"status": "ok", "graded": len(results), "results": results}, status=200)
+
+@login_required
+@api_view(["GET"])
+def api_srs_decks(request):
+    """Shared decks: [ {id, name, description, note_count, subscribed}, ... ]"""
+    subscribed = set(SRSSubscription.objects.filter(user=request.user).values_list("deck_id", flat=True))
+    decks = SRSDeck.objects.filter(is_shared=True).order_by("name")
+    return Response({"decks": [
+        {
+            "id": d.id, "name": d.name, "description": d.description,
+            "note_count": d.note_count, "subscribed": d.id in subscribed,
+        }
+        for d in decks
+    ]}, status=200)
+
+@login_required
+@api_view(["POST"])
+def api_srs_subscribe(request, deck_id):
+    deck = get_object_or_404(SRSDeck, pk=deck_id, is_shared=True)
+    _sub, created = shared_decks.subscribe(request.user, deck)
+    return Response({"status": "ok", "deck_id": deck.id, "created": created}, status=201 if created else 200)
+
+@login_required
+@api_view(["POST"])
+def api_srs_unsubscribe(request, deck_id):
+    deck = get_object_or_404(SRSDeck, pk=deck_id, is_shared=True)
+    if not shared_decks.unsubscribe(request.user, deck):
+        return Response({"detail": "not subscribed"}, status=404)
+    return Response({"status": "ok"}, status=200)
+
 @login_required
 @api_view(["POST"])
 def api_glossary_bulk_add(request):
@@ -2218,28 +2381,19 @@ def lessons_overview(request):
 def api_submit_dragdrop(request):
     s = DragDropSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(DragDropExercise, pk=s.validated_data["exercise_id"])
-    submitted = [t.strip() for t in s.validated_data["order"]]
-    correct = [t.strip() for t in (ex.correct_tokens or [])]
-    total = max(1, len(correct))
-    correct_pos = sum(1 for i in range(min(len(submitted), len(correct))) if submitted[i].lower() == correct[i].lower())
-    score = (correct_pos / total) * 100.0
-    is_correct = score >= 95.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
-    return Response({"score": score, "correct_positions": correct_pos, "total": total}, status=200)
+    key = _answer_key("dragdrop", s.validated_data["exercise_id"])
+    score, is_correct, extra = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
+    return Response({"score": score, **extra}, status=200)
 
 @login_required
 @api_view(["POST"])
 def api_submit_listening(request):
     s = ListeningSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(ListeningExercise, pk=s.validated_data["exercise_id"])
-    selected = s.validated_data["selected_key"].strip().upper()
-    is_correct = (selected == ex.correct_key.strip().upper())
-    score = 100.0 if is_correct else 0.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
+    key = _answer_key("listening", s.validated_data["exercise_id"])
+    score, is_correct, _ = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
     return Response({"score": score, "is_correct": is_correct}, status=200)
 
 @login_required
@@ -2247,18 +2401,9 @@ def api_submit_listening(request):
 def api_submit_translation(request):
     s = TranslationSubmissionSerializer(data=request.data)
     s.is_valid(raise_exception=True)
-    ex = get_object_or_404(TranslationExercise, pk=s.validated_data["exercise_id"])
-    from .services.scoring import levenshtein_ratio
-    answer = s.validated_data["answer"].strip().lower()
-    answers = [a.strip().lower() for a in (ex.acceptable_answers or [])]
-    exact = any(answer == a for a in answers)
-    if exact:
-        score = 100.0; is_correct = True
-    else:
-        best = max((levenshtein_ratio(answer, a) for a in answers), default=0.0)
-        score = best; is_correct = best >= 90.0
-    _save_user_result(request.user, ex, score, is_correct)
-    _update_lesson_progress(request.user, ex.lesson)
+    key = _answer_key("translation", s.validated_data["exercise_id"])
+    score, is_correct, _ = answer_keys.score(key, s.validated_data)
+    _save_user_result(request.user, key.exercise(), score, is_correct)
     return Response({"score": score, "is_correct": is_correct}, status=200)
 
 @login_required
@@ -2279,9 +2424,6 @@ def api_glossary_upload_audio(request, pk):
     entry.audio_pronunciation.save(filename, f, save=True)
     return Response({"url": entry.audio_pronunciation.url}, status=200)
 
-def _pick_espeak_exe():
-    return getattr(settings, "ESPEAK_NG_EXE", None) or shutil.which("espeak-ng") or shutil.which("espeak")
-
 def _clean_text_for_tts(text: str, ensure_punct=True) -> str:
     t = re.sub(r"\s+", " ", text or "").strip()
     t = t.replace("“","\"").replace("”","\"").replace("’","'").replace("‘","'")
@@ -2299,8 +2441,7 @@ def tts_view(request):
     if len(text) > 300:
         text = text[:300]
 
-    exe = _pick_espeak_exe()
-    if not exe:
+    if not tts.available():
         return JsonResponse({"error": "espeak-ng not found"}, status=501)
 
     # Config/preset (si usas settings TTS_ESPEAK_CONFIG; si no, valores por defecto)
@@ -2322,33 +2463,15 @@ def tts_view(request):
     wav_path = os.path.join(cache_dir, f"{voice_tag}-{h}.wav")
 
     if not os.path.exists(wav_path):
-        cmd = [
-            exe,
-            "-v", voice_tag,
-            "-s", str(base.get("speed", 155)),
-            "-p", str(base.get("pitch", 45)),
-            "-a", str(base.get("amplitude", 160)),
-            "-g", str(base.get("gap", 6)),
-            "-w", wav_path,
-            cleaned,
-        ]
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError:
-            if voice_tag != voice:
-                try:
-                    subprocess.run([
-                        exe, "-v", voice,
-                        "-s", str(base.get("speed", 155)),
-                        "-p", str(base.get("pitch", 45)),
-                        "-a", str(base.get("amplitude", 160)),
-                        "-g", str(base.get("gap", 6)),
-                        "-w", wav_path,
-                        cleaned,
-                    ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                except Exception:
-                    return JsonResponse({"error": "TTS failed"}, status=500)
-            else:
-                return JsonResponse({"error": "TTS failed"}, status=500)
+            tts.synthesize(
+                wav_path, cleaned, voice_tag, fallback_voice=voice if voice_tag != voice else None,
+                speed=base.get("speed", 155), pitch=base.get("pitch", 45),
+                amplitude=base.get("amplitude", 160), gap=base.get("gap", 6),
+            )
+        except tts.TTSBusy:
+            return JsonResponse({"error": "TTS busy"}, status=503, headers={"Retry-After": "1"})
+        except tts.TTSError:
+            return JsonResponse({"error": "TTS failed"}, status=500)
 
     return FileResponse(open(wav_path, "rb"), content_type="audio/wav")
@@ -2,14 +2,11 @@
 import os
 import re
 import hashlib
-import subprocess
-import shutil
 from django.http import FileResponse, JsonResponse, HttpResponse
 from django.conf import settings
 from django.views.decorators.http import require_GET
 
-def _pick_espeak_exe():
-  return getattr(settings, "ESPEAK_NG_EXE", None) or shutil.which("espeak-ng") or shutil.which("espeak")
+from .services import tts
 
 def _clean_text_for_tts(text: str, ensure_punct=True) -> str:
   t = re.sub(r"\s+", " ", text or "").strip()
@@ -45,8 +42,7 @@ def tts_view(request):
   if len(text) > 300:
     text = text[:300]
 
-  exe = _pick_espeak_exe()
-  if not exe:
+  if not tts.available():
     return JsonResponse({"error": "espeak-ng not found"}, status=501)
 
   cfg = _cfg_for(lang, preset)
@@ -64,33 +60,15 @@ def tts_view(request):
   wav_path = os.path.join(cache_dir, f"{voice_tag}-{h}.wav")
 
   if not os.path.exists(wav_path):
-    cmd = [
-      exe,
-      "-v", voice_tag,
-      "-s", str(cfg.get("speed", 155)),
-      "-p", str(cfg.get("pitch", 45)),
-      "-a", str(cfg.get("amplitude", 160)),
-      "-g", str(cfg.get("gap", 6)),
-      "-w", wav_path,
-      cleaned,
-    ]
     try:
-      subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError:
-      if voice_tag != voice:
-        try:
-          subprocess.run([
-            exe, "-v", voice,
-            "-s", str(cfg.get("speed", 155)),
-            "-p", str(cfg.get("pitch", 45)),
-            "-a", str(cfg.get("amplitude", 160)),
-            "-g", str(cfg.get("gap", 6)),
-            "-w", wav_path,
-            cleaned,
-          ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except Exception:
-          return JsonResponse({"error": "TTS failed"}, status=500)
-      else:
-        return JsonResponse({"error": "TTS failed"}, status=500)
+      tts.synthesize(
+        wav_path, cleaned, voice_tag, fallback_voice=voice if voice_tag != voice else None,
+        speed=cfg.get("speed", 155), pitch=cfg.get("pitch", 45),
+        amplitude=cfg.get("amplitude", 160), gap=cfg.get("gap", 6),
+      )
+    except tts.TTSBusy:
+      return JsonResponse({"error": "TTS busy"}, status=503, headers={"Retry-After": "1"})
+    except tts.TTSError:
+      return JsonResponse({"error": "TTS failed"}, status=500)
 
   return FileResponse(open(wav_path, "rb"), content_type="audio/wav")
\ No newline at end of file